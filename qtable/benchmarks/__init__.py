@@ -0,0 +1,16 @@
+"""
+This package contains benchmarks of the QTable hot paths.
+
+Usage:
+    Run a benchmark from the 'qtable' directory as a module, e.g. 'python -m benchmarks.db_connections'. Benchmarks use
+    the regular settings, so point DATABASE_URL and CACHE_URL at the services being measured.
+"""
+import os
+
+import django
+
+
+def setup() -> None:
+    """Configure Django with the project settings unless another settings module is selected."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'qtable.settings')
+    django.setup()
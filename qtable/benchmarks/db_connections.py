@@ -0,0 +1,80 @@
+"""
+This module measures the per-request cost of opening database connections, with and without persistent connections.
+
+Functions:
+    - run(): Simulates requests that each run one query and returns their timings.
+    - main(): Runs the benchmark for each CONN_MAX_AGE value and prints a report.
+
+Usage:
+    python -m benchmarks.db_connections --requests 200
+
+Note:
+    Each simulated request sends the 'request_started' and 'request_finished' signals around a 'SELECT 1', which is what
+    Django does around a view: with CONN_MAX_AGE=0 the connection is closed at the end of every request, so the next one
+    pays the full connection setup (TCP, TLS and authentication against a remote PostgreSQL). The difference between
+    the two rows is the handshake cost that persistent connections or PgBouncer remove from every request.
+"""
+import argparse
+import statistics
+import time
+
+from . import setup
+
+
+def run(requests: int, conn_max_age: int) -> tuple[list[float], int]:
+    """
+    Simulate requests that each run one query, with a given connection lifetime.
+
+    :param requests: The number of requests to simulate.
+    :type requests: int
+    :param conn_max_age: The CONN_MAX_AGE value to use.
+    :type conn_max_age: int
+    :return: The duration of each request, in seconds, and the number of connections opened.
+    :rtype: tuple[list[float], int]
+    """
+    from django.core.signals import request_finished, request_started
+    from django.db import connection
+
+    connection.close()
+    connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+    opened = 0
+    timings = []
+    try:
+        for _ in range(requests):
+            start = time.perf_counter()
+            request_started.send(sender=None)
+            opened += connection.connection is None
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            request_finished.send(sender=None)
+            timings.append(time.perf_counter() - start)
+    finally:
+        connection.close()
+    return timings, opened
+
+
+def main() -> None:
+    """Run the benchmark for each CONN_MAX_AGE value and print a report."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='The number of requests per configuration.')
+    parser.add_argument('--conn-max-age', type=int, nargs='+', default=[0, 60], help='The CONN_MAX_AGE values.')
+    args = parser.parse_args()
+    setup()
+
+    from django.db import connection
+
+    print(f'{connection.vendor} {connection.settings_dict["HOST"] or connection.settings_dict["NAME"]}')
+    print(f'{"CONN_MAX_AGE":>12} {"connections":>11} {"mean ms":>8} {"p50 ms":>8} {"p95 ms":>8}')
+    for conn_max_age in args.conn_max_age:
+        timings, opened = run(args.requests, conn_max_age)
+        timings_ms = sorted(timing * 1000 for timing in timings)
+        p95 = timings_ms[int(len(timings_ms) * 0.95) - 1]
+        print(
+            f'{conn_max_age:>12} {opened:>11} {statistics.mean(timings_ms):>8.2f} '
+            f'{statistics.median(timings_ms):>8.2f} {p95:>8.2f}',
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,408 @@
+"""
+This module load-tests the QTable hot paths against a stubbed external API and compares the results with a baseline.
+
+Functions:
+    - seed(): Creates the benchmark users, quotes, favorites and sessions.
+    - start_server(): Starts QTable under uvicorn in a subprocess and waits until it answers successfully.
+    - scenarios(): Builds the request factories and the expected statuses of the benchmark scenarios.
+    - drive(): Runs a scenario with a number of concurrent clients and collects the latencies.
+    - summarize(): Computes the throughput and the latency percentiles of a scenario.
+    - compare(): Prints the change of every scenario against a saved baseline and returns the regressions.
+    - git_commit(): Returns the short hash of the checked-out commit, recorded in the baselines.
+    - main(): Parses the options, runs the benchmark and reports, saves or checks the results.
+
+Usage:
+    python -m benchmarks.load --users 50 --favorites 2000 --concurrency 16 --requests 500
+    python -m benchmarks.load --save            # record benchmarks/baselines/default.json
+    python -m benchmarks.load --check           # exit with 1 on a regression against it
+
+Note:
+    The server runs without DEBUG, like in production, so the static files are collected into the work directory
+    first. The scenarios are the anonymous and logged-in home page, the quote list pages, the favorites page and the
+    favorite toggle. The external API is replaced by 'StubUpstream', with the '--latency' and '--failure-rate' options.
+    Without '--database-url' the benchmark uses a fresh SQLite file, which serializes writes; point it at PostgreSQL for
+    numbers comparable with production. On SQLite, concurrent toggles also fail with 'database is locked', which counts
+    as errors. Likewise, without '--cache-url' the workers share a fresh file-based cache; point it at Redis to measure
+    the production setup. Baselines record the commit and the options they were measured with, and are only comparable
+    on the same machine and options. A failed request is always a regression, so '--save' refuses results with errors
+    and baselines are recorded against PostgreSQL.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess  # noqa: S404
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from pathlib import Path
+
+import httpx
+
+from . import setup
+from .stub_upstream import StubUpstream
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+BASELINES_DIR = Path(__file__).resolve().parent / 'baselines'
+CSRF_TOKEN = 'benchmarkbenchmarkbenchmarkbench'  # 32 characters, the length of a CSRF secret
+
+
+def seed(users: int, favorites: int, mirror: int) -> tuple[list[str], list[int]]:
+    """
+    Create the benchmark users, quotes of the day, mirrored quotes, favorites and logged-in sessions.
+
+    :param users: The number of users.
+    :type users: int
+    :param favorites: The total number of favorites, spread evenly over the users.
+    :type favorites: int
+    :param mirror: The number of quotes in the local quote mirror.
+    :type mirror: int
+    :return: The session keys of the users, and the IDs of the quotes of the day.
+    :rtype: tuple[list[str], list[int]]
+    """
+    from django.conf import settings
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    from django.contrib.auth.models import User
+    from django.contrib.sessions.backends.db import SessionStore
+    from django.utils import timezone
+
+    from qtable_app.favorites import reconcile_favorites_count
+    from qtable_app.models import Quote, QuoteOfDay
+
+    per_user = favorites // max(users, 1)
+    today = timezone.localdate()
+    User.objects.bulk_create(
+        [User(username=f'bench{index}', password='!') for index in range(users)],  # noqa: S106
+        ignore_conflicts=True,
+    )
+    QuoteOfDay.objects.bulk_create(
+        [
+            QuoteOfDay(
+                quote=f'Benchmark quote of the day number {index}.',
+                author=f'Author {index % 97}',
+                day=today - timedelta(days=index + 1),
+                date=timezone.now() - timedelta(days=index + 1),
+            )
+            for index in range(max(per_user * 2, 100))
+        ],
+        ignore_conflicts=True,
+    )
+    Quote.objects.bulk_create(
+        [
+            Quote(
+                external_id=f'bench{index:027d}',
+                content=f'Benchmark mirrored quote number {index}.',
+                author=f'Author {index % 97}',
+                date_modified=today,
+            )
+            for index in range(mirror)
+        ],
+        ignore_conflicts=True,
+    )
+    quote_ids = list(QuoteOfDay.objects.values_list('pk', flat=True))
+    bench_users = list(User.objects.filter(username__startswith='bench'))
+    Favorite = QuoteOfDay.users.through
+    Favorite.objects.bulk_create(
+        [
+            Favorite(user_id=user.pk, quoteofday_id=quote_id)
+            for user in bench_users
+            for quote_id in random.sample(quote_ids, min(per_user, len(quote_ids)))
+        ],
+        ignore_conflicts=True,
+    )
+    reconcile_favorites_count()  # the favorites were inserted on the through table, bypassing the counts
+    sessions = []
+    for user in bench_users:
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        sessions.append(session.session_key)
+    return sessions, quote_ids
+
+
+def start_server(env: dict, port: int, workers: int) -> subprocess.Popen:
+    """
+    Start QTable under uvicorn in a subprocess and wait until its login page answers with a 200.
+
+    :param env: The environment of the server process.
+    :type env: dict
+    :param port: The port to listen on.
+    :type port: int
+    :param workers: The number of uvicorn worker processes.
+    :type workers: int
+    :return: The server process.
+    :rtype: subprocess.Popen
+    :raises RuntimeError: If the server answers with an error, or does not answer within 30 seconds.
+    """
+    command = [
+        sys.executable, '-m', 'uvicorn', 'qtable.asgi:application',
+        '--port', str(port), '--workers', str(workers), '--no-access-log', '--log-level', 'warning',
+    ]
+    server = subprocess.Popen(command, cwd=PROJECT_DIR, env=env)  # noqa: S603
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            response = httpx.get(f'http://127.0.0.1:{port}/users/login/', timeout=1)
+        except httpx.TransportError:
+            time.sleep(0.2)
+            continue
+        if response.status_code == 200:
+            return server
+        server.terminate()
+        raise RuntimeError(f'QTable answered its login page with a {response.status_code}')
+    server.terminate()
+    raise RuntimeError('QTable did not start within 30 seconds')
+
+
+def scenarios(sessions: list[str], quote_ids: list[int], pages: int) -> dict:
+    """
+    Build the benchmark scenarios, each a function returning the method, path and cookies of a random request, and
+    the statuses of a successful response.
+
+    :param sessions: The session keys of the benchmark users.
+    :type sessions: list[str]
+    :param quote_ids: The IDs of the quotes of the day.
+    :type quote_ids: list[int]
+    :param pages: The number of quote list pages.
+    :type pages: int
+    :return: The request factories and their expected statuses, by scenario name.
+    :rtype: dict
+    """
+    def cookies() -> str:
+        return f'sessionid={random.choice(sessions)}; csrftoken={CSRF_TOKEN}'  # noqa: S311
+
+    pages_ok = frozenset({200, 304})
+    return {
+        'index_anonymous': (lambda: ('GET', '/', ''), pages_ok),
+        'index': (lambda: ('GET', '/', cookies()), pages_ok),
+        'quotes': (lambda: ('GET', f'/quotes/{random.randint(1, pages)}/', ''), pages_ok),  # noqa: S311
+        'favorites': (lambda: ('GET', '/favorites/', cookies()), pages_ok),
+        'toggle': (lambda: ('POST', f'/{random.choice(quote_ids)}/', cookies()), frozenset({200})),  # noqa: S311
+    }
+
+
+async def drive(
+    base_url: str,
+    factory: Callable,
+    expected: frozenset[int],
+    requests: int,
+    concurrency: int,
+) -> tuple[list[float], int, float]:
+    """
+    Send requests of a scenario from a number of concurrent clients.
+
+    A response with another status than the expected ones counts as an error, so that a redirect to the login page or
+    a server error is never measured as a success.
+
+    :param base_url: The base URL of the server.
+    :type base_url: str
+    :param factory: A function returning the method, path and cookies of a random request.
+    :type factory: Callable[[], tuple[str, str, str]]
+    :param expected: The statuses of a successful response.
+    :type expected: frozenset[int]
+    :param requests: The number of requests to send.
+    :type requests: int
+    :param concurrency: The number of concurrent clients.
+    :type concurrency: int
+    :return: The latency of every successful request in seconds, the number of errors and the wall time.
+    :rtype: tuple[list[float], int, float]
+    """
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+    no_cookies = CookieJar(DefaultCookiePolicy(allowed_domains=[]))
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, cookies=no_cookies, limits=limits, timeout=30) as client:
+
+        async def worker() -> None:
+            nonlocal errors
+            for _ in remaining:
+                method, path, cookie = factory()
+                headers = {'Cookie': cookie, 'X-CSRFToken': CSRF_TOKEN} if cookie else {}
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, headers=headers)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                if response.status_code not in expected:
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def summarize(latencies: list[float], errors: int, wall_time: float) -> dict:
+    """
+    Compute the throughput and the latency percentiles of a scenario.
+
+    :param latencies: The latencies of the successful requests, in seconds.
+    :type latencies: list[float]
+    :param errors: The number of failed requests.
+    :type errors: int
+    :param wall_time: The duration of the scenario, in seconds.
+    :type wall_time: float
+    :return: The requests per second, the p50, p95 and p99 latencies in milliseconds, and the number of errors.
+    :rtype: dict
+    """
+    if len(latencies) < 2:
+        return {'rps': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'errors': errors}
+    percentiles = statistics.quantiles([latency * 1000 for latency in latencies], n=100, method='inclusive')
+    return {
+        'rps': round(len(latencies) / wall_time, 1),
+        'p50': round(percentiles[49], 2),
+        'p95': round(percentiles[94], 2),
+        'p99': round(percentiles[98], 2),
+        'errors': errors,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Print the change of every scenario against a baseline and return the regressions.
+
+    A scenario regresses when any of its requests failed, or when its p95 latency grows, or its throughput drops, by
+    more than the tolerance. Errors are not subject to the tolerance: a baseline has none, so any error is a rise.
+
+    :param results: The results of this run, by scenario.
+    :type results: dict
+    :param baseline: The saved baseline document.
+    :type baseline: dict
+    :param tolerance: The allowed relative change, e.g. 0.2 for 20%.
+    :type tolerance: float
+    :return: A description of every regression.
+    :rtype: list[str]
+    """
+    print(f'\nAgainst the baseline of commit {baseline.get("commit")} ({baseline.get("created")}):')
+    regressions = []
+    for name, result in results.items():
+        previous = baseline['results'].get(name, {})
+        if result['errors']:
+            regressions.append(f'{name}: {result["errors"]} errors, against {previous.get("errors", 0)}')
+        if not previous.get('p95') or not previous.get('rps'):
+            continue
+        p95_change = result['p95'] / previous['p95'] - 1
+        rps_change = result['rps'] / previous['rps'] - 1
+        print(f'{name:>16} p95 {p95_change:+7.1%}  rps {rps_change:+7.1%}  errors {result["errors"]:>4}')
+        if p95_change > tolerance or rps_change < -tolerance:
+            regressions.append(f'{name}: p95 {p95_change:+.1%}, rps {rps_change:+.1%}')
+    return regressions
+
+
+def git_commit() -> str:
+    """
+    Return the short hash of the checked-out commit.
+
+    :return: The commit hash, suffixed with '-dirty' if the code has uncommitted changes, or 'unknown' outside a git
+        checkout.
+    :rtype: str
+    """
+    try:
+        output = subprocess.run(  # noqa: S603, S607
+            ['git', 'describe', '--always', '--abbrev=7', '--dirty', '--exclude=*'],
+            capture_output=True, text=True, check=True, cwd=PROJECT_DIR,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return output.stdout.strip()
+
+
+def main() -> None:  # noqa: WPS213
+    """Parse the options, run every scenario and report, save or check the results."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=50, help='The number of users to seed.')
+    parser.add_argument('--favorites', type=int, default=2000, help='The total number of favorites to seed.')
+    parser.add_argument('--mirror', type=int, default=500, help='The number of mirrored quotes to seed.')
+    parser.add_argument('--concurrency', type=int, default=16, help='The number of concurrent clients.')
+    parser.add_argument('--requests', type=int, default=500, help='The number of requests per scenario.')
+    parser.add_argument('--workers', type=int, default=1, help='The number of uvicorn workers.')
+    parser.add_argument('--port', type=int, default=8765, help='The port of the QTable server.')
+    parser.add_argument('--latency', type=float, default=50, help='The latency of the stub API, in milliseconds.')
+    parser.add_argument('--failure-rate', type=float, default=0, help='The share of stub API requests failing.')
+    parser.add_argument('--database-url', help='The database to use instead of a fresh SQLite file.')
+    parser.add_argument('--cache-url', help='The shared cache to use instead of a fresh file-based cache.')
+    parser.add_argument('--scenario', action='append', help='Run only the named scenarios.')
+    parser.add_argument('--baseline', default='default', help='The name of the baseline file.')
+    parser.add_argument('--save', action='store_true', help='Save the results as the baseline.')
+    parser.add_argument('--check', action='store_true', help='Exit with 1 if a scenario regressed.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='The allowed relative regression.')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='qtable-bench-')
+    stub = StubUpstream(latency=args.latency / 1000, failure_rate=args.failure_rate).start()
+    os.environ.update(
+        DATABASE_URL=args.database_url or f'sqlite:///{workdir}/bench.sqlite3',
+        CACHE_URL=args.cache_url or f'filecache://{workdir}/cache',
+        STATIC_ROOT=f'{workdir}/static',
+        QUOTE_SOURCE_BASE_URL=stub.url,
+        DJANGO_ALLOWED_HOSTS='127.0.0.1',
+        DJANGO_SETTINGS_MODULE='qtable.settings',
+    )
+    os.environ.setdefault('DEBUG', '')
+    setup()
+
+    from django.core.management import call_command
+    from django.db import connection
+
+    call_command('migrate', verbosity=0)
+    call_command('collectstatic', interactive=False, verbosity=0)
+    sessions, quote_ids = seed(args.users, args.favorites, args.mirror)
+    server = start_server(dict(os.environ), args.port, args.workers)
+    results = {}
+    try:
+        pages = max(args.mirror // 20, 1)
+        for name, (factory, expected) in scenarios(sessions, quote_ids, pages).items():
+            if args.scenario and name not in args.scenario:
+                continue
+            results[name] = summarize(*asyncio.run(drive(
+                f'http://127.0.0.1:{args.port}', factory, expected, args.requests, args.concurrency,
+            )))
+    finally:
+        server.terminate()
+        server.wait()
+        stub.stop()
+
+    print(f'{"scenario":>16} {"rps":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>6}')
+    for name, result in results.items():
+        print(
+            f'{name:>16} {result["rps"]:>8} {result["p50"]:>8} {result["p95"]:>8} {result["p99"]:>8} '
+            f'{result["errors"]:>6}',
+        )
+    baseline_path = BASELINES_DIR / f'{args.baseline}.json'
+    if args.save:
+        failed = [name for name, result in results.items() if result['errors']]
+        if failed:
+            print(f'\nNot saving a baseline with errors in: {", ".join(failed)}')
+            sys.exit(1)
+        BASELINES_DIR.mkdir(exist_ok=True)
+        document = {
+            'commit': git_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'options': {
+                key: value
+                for key, value in vars(args).items()
+                if key not in {'save', 'check', 'baseline', 'database_url', 'cache_url'}
+            },
+            'database': connection.vendor,
+            'results': results,
+        }
+        baseline_path.write_text(json.dumps(document, indent=2) + '\n')
+        print(f'\nSaved the baseline to {baseline_path}')
+    elif baseline_path.exists():
+        regressions = compare(results, json.loads(baseline_path.read_text()), args.tolerance)
+        if regressions and args.check:
+            print('\nRegressions:\n' + '\n'.join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+This module measures the template rendering time and the response size of the QTable pages.
+
+Functions:
+    - build_request(): Builds a request of a logged-in user, as the views receive it.
+    - build_pages(): Builds the template name and the context of every page, without the database or the quotes API.
+    - build_backend(): Creates a template backend with the project options, with or without the cached loader.
+    - run(): Loads and renders a page a number of times and returns the timings and the rendered HTML.
+    - main(): Runs the benchmark for every page and loader configuration and prints a report.
+
+Usage:
+    python -m benchmarks.render --iterations 500
+    python -m benchmarks.render --page favorites --quotes 20
+
+Note:
+    Every iteration goes through 'get_template()' and 'render()', as a view does, so the 'uncached' rows include
+    reading and compiling the template and its parent on every request, which is what the cached loader saves.
+    The contexts hold unsaved model instances, so nothing touches the database. The 'gzip' column is the size on the
+    wire with compression; the 'html' column is what the browser parses.
+"""
+import argparse
+import gzip
+import statistics
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+from . import setup
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+PAGES = ('index', 'quotes', 'favorites', 'search')
+
+
+def build_request(path: str) -> object:
+    """
+    Build a GET request of a logged-in user.
+
+    :param path: The path of the request.
+    :type path: str
+    :return: The request, with a 'user' attribute.
+    :rtype: HttpRequest
+    """
+    from django.contrib.auth.models import User
+    from django.test import RequestFactory
+
+    request = RequestFactory().get(path)
+    request.user = User(pk=1, username='benchmark')
+    return request
+
+
+def build_pages(quotes: int) -> dict[str, tuple[str, str, dict]]:
+    """
+    Build the path, the template name and the context of every page.
+
+    Half of the quotes of the day are favorites, so both star icons are rendered.
+
+    :param quotes: The number of quotes on the list, favorites and search pages.
+    :type quotes: int
+    :return: The path, the template name and the context of every page, by page name.
+    :rtype: dict[str, tuple[str, str, dict]]
+    """
+    from django.utils import timezone
+
+    from qtable_app.models import Quote, QuoteOfDay
+
+    now = timezone.now()
+    quotes_of_day = [
+        QuoteOfDay(
+            pk=index,
+            quote=f'Quote of the day {index}: a sentence of average length, as returned by the quotes API.',
+            author=f'Author {index}',
+            date=now - timedelta(days=index),
+            updated=now,
+        )
+        for index in range(1, quotes + 1)
+    ]
+    favorite_ids = frozenset(quote.pk for quote in quotes_of_day[::2])
+    mirror = [
+        Quote(
+            pk=index,
+            external_id=f'{index:024x}',
+            content=f'Quote {index}: a sentence of average length.',
+            author=f'Author {index}',
+            synced=now,
+        )
+        for index in range(1, quotes + 1)
+    ]
+    page = SimpleNamespace(has_other_pages=True, has_previous=True, has_next=True, previous_cursor='p', next_cursor='n')
+    return {
+        'index': ('/', 'qtable_app/index.html', {
+            'title': 'Quote of the Day',
+            'quote': quotes_of_day[0],
+            'favorite_ids': favorite_ids,
+        }),
+        'quotes': ('/quotes/2/', 'qtable_app/quotes_list.html', {
+            'title': 'Quotes List',
+            'quotes': {'results': mirror, 'page': 2, 'has_next': True},
+        }),
+        'favorites': ('/favorites/', 'qtable_app/favorites.html', {
+            'title': 'Favorites',
+            'object_list': quotes_of_day,
+            'page_obj': page,
+            'is_paginated': True,
+            'favorite_ids': favorite_ids,
+        }),
+        'search': ('/search/?q=sentence', 'qtable_app/search.html', {
+            'title': 'Search',
+            'quotes': quotes_of_day,
+            'q': 'sentence',
+            'author': '',
+            'favorite_ids': favorite_ids,
+        }),
+    }
+
+
+def build_backend(cached: bool) -> object:
+    """
+    Create a template backend with the options of the project, with or without the cached loader.
+
+    :param cached: Whether to wrap the loaders in the cached loader.
+    :type cached: bool
+    :return: The template backend.
+    :rtype: InstrumentedDjangoTemplates
+    """
+    from django.conf import settings
+
+    from qtable_app.instrumentation import InstrumentedDjangoTemplates
+
+    params = {key: value for key, value in settings.TEMPLATES[0].items() if key != 'BACKEND'}
+    loaders = [('django.template.loaders.cached.Loader', LOADERS)] if cached else LOADERS
+    return InstrumentedDjangoTemplates({
+        **params,
+        'NAME': 'cached' if cached else 'uncached',
+        'APP_DIRS': False,
+        'OPTIONS': {**params['OPTIONS'], 'loaders': loaders},
+    })
+
+
+def run(backend: object, page: tuple[str, str, dict], iterations: int) -> tuple[list[float], str]:
+    """
+    Load and render a page a number of times, after one warm-up rendering.
+
+    :param backend: The template backend.
+    :type backend: InstrumentedDjangoTemplates
+    :param page: The path, the template name and the context of the page.
+    :type page: tuple[str, str, dict]
+    :param iterations: The number of renderings to time.
+    :type iterations: int
+    :return: The duration of each rendering, in seconds, and the rendered HTML.
+    :rtype: tuple[list[float], str]
+    """
+    path, template_name, context = page
+    request = build_request(path)
+    html = backend.get_template(template_name).render(context, request)
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        html = backend.get_template(template_name).render(context, request)
+        timings.append(time.perf_counter() - start)
+    return timings, html
+
+
+def main() -> None:
+    """Run the benchmark for every page and loader configuration and print a report."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=500, help='The number of renderings per page.')
+    parser.add_argument('--quotes', type=int, default=20, help='The number of quotes per page.')
+    parser.add_argument('--page', action='append', choices=PAGES, help='Render only the named pages.')
+    args = parser.parse_args()
+    setup()
+
+    pages = build_pages(args.quotes)
+    backends = {'cached': build_backend(cached=True), 'uncached': build_backend(cached=False)}
+    print(f'{"page":<10} {"loader":<9} {"mean ms":>8} {"p50 ms":>8} {"p95 ms":>8} {"html B":>8} {"gzip B":>8}')
+    for name in args.page or PAGES:
+        for loader, backend in backends.items():
+            timings, html = run(backend, pages[name], args.iterations)
+            timings_ms = sorted(timing * 1000 for timing in timings)
+            p95 = timings_ms[int(len(timings_ms) * 0.95) - 1]
+            content = html.encode()
+            print(
+                f'{name:<10} {loader:<9} {statistics.mean(timings_ms):>8.3f} {statistics.median(timings_ms):>8.3f} '
+                f'{p95:>8.3f} {len(content):>8} {len(gzip.compress(content)):>8}',
+            )
+
+
+if __name__ == '__main__':
+    main()
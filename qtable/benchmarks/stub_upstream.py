@@ -0,0 +1,170 @@
+"""
+This module provides a local stand-in for the external quotes API ('https://api.quotable.io/'), for benchmarks.
+
+Classes:
+    - StubUpstream: A threaded HTTP server answering the endpoints QTable uses, with configurable latency and failures.
+
+Usage:
+    Run it alone with 'python -m benchmarks.stub_upstream --port 8001 --latency 50 --failure-rate 0.1' and start QTable
+    with QUOTE_SOURCE_BASE_URL=http://127.0.0.1:8001, or let 'benchmarks.load' start it.
+
+Note:
+    The stub serves '/quotes/random' (with an optional 'limit') and '/quotes' (paginated by 'page' and 'limit', 20
+    quotes per page by default, with the 'totalPages' field), generated deterministically from a corpus size, so runs
+    are comparable.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PAGE_SIZE = 20
+
+
+class StubUpstream:
+    """A threaded HTTP server imitating the external quotes API."""
+
+    def __init__(self, port: int = 0, latency: float = 0.0, failure_rate: float = 0.0, corpus: int = 2000) -> None:
+        """
+        Initialize the server, bound to a local port.
+
+        :param port: The port to listen on; 0 picks a free port. Defaults to 0.
+        :type port: int
+        :param latency: The delay added to every response, in seconds. Defaults to 0.
+        :type latency: float
+        :param failure_rate: The share of requests answered with a 503, between 0 and 1. Defaults to 0.
+        :type failure_rate: float
+        :param corpus: The number of quotes the stub pretends to have. Defaults to 2000.
+        :type corpus: int
+        """
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.corpus = corpus
+        self.requests = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self.handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        Return the base URL of the server.
+
+        :return: The base URL, without a trailing slash.
+        :rtype: str
+        """
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'StubUpstream':
+        """
+        Serve requests in a background thread.
+
+        :return: The server itself.
+        :rtype: StubUpstream
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, name='stub-upstream', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving requests and release the port."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def quote(self, index: int) -> dict:
+        """
+        Build the quote at a position of the corpus.
+
+        :param index: The position of the quote.
+        :type index: int
+        :return: The quote, in the upstream format.
+        :rtype: dict
+        """
+        return {
+            '_id': f'stub{index:028d}',
+            'content': f'Stub quote number {index}, long enough to look like a real one in the rendered page.',
+            'author': f'Author {index % 97}',
+            'tags': ['stub'],
+            'dateModified': '2024-01-01',
+        }
+
+    def respond(self, path: str, query: dict) -> tuple[int, object]:
+        """
+        Build the response to a request.
+
+        :param path: The path of the request.
+        :type path: str
+        :param query: The parsed query string.
+        :type query: dict
+        :return: The status code and the JSON body.
+        :rtype: tuple[int, object]
+        """
+        if random.random() < self.failure_rate:  # noqa: S311
+            return 503, {'statusCode': 503, 'statusMessage': 'Service Unavailable'}
+        if path == '/quotes/random':
+            limit = int(query.get('limit', ['1'])[0])
+            return 200, [self.quote(random.randrange(self.corpus)) for _ in range(limit)]  # noqa: S311
+        if path == '/quotes':
+            page = int(query.get('page', ['1'])[0])
+            limit = int(query.get('limit', [str(PAGE_SIZE)])[0])
+            total_pages = -(-self.corpus // limit)
+            start = (page - 1) * limit
+            results = [self.quote(index) for index in range(start, min(start + limit, self.corpus))]
+            return 200, {'page': page, 'totalPages': total_pages, 'totalCount': self.corpus, 'results': results}
+        return 404, {'statusCode': 404, 'statusMessage': 'Not Found'}
+
+    def handler_class(self) -> type:
+        """
+        Build the request handler class bound to this server.
+
+        :return: The request handler class.
+        :rtype: type
+        """
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Answers a single request of the stub server."""
+
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self) -> None:  # noqa: N802
+                """Answer a GET request after the configured latency."""
+                stub.requests += 1
+                time.sleep(stub.latency)
+                url = urlsplit(self.path)
+                status, data = stub.respond(url.path.rstrip('/'), parse_qs(url.query))
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:  # noqa: A002
+                """Keep the benchmark output free of access logs."""
+
+        return Handler
+
+
+def main() -> None:
+    """Run the stub server in the foreground."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8001, help='The port to listen on.')
+    parser.add_argument('--latency', type=float, default=0, help='The delay of every response, in milliseconds.')
+    parser.add_argument('--failure-rate', type=float, default=0, help='The share of requests failing with a 503.')
+    parser.add_argument('--corpus', type=int, default=2000, help='The number of quotes.')
+    args = parser.parse_args()
+    stub = StubUpstream(args.port, args.latency / 1000, args.failure_rate, args.corpus)
+    print(f'Serving a stub quotes API at {stub.url}')
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
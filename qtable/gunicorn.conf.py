@@ -0,0 +1,22 @@
+"""
+Gunicorn configuration for serving the ASGI application with uvicorn workers.
+
+Every worker runs an event loop, so a single process can hold hundreds of requests that are waiting on the external
+quotes API instead of blocking one sync worker per request.
+
+Environment variables:
+    - PORT: The port to bind to. Defaults to 8000.
+    - WEB_CONCURRENCY: The number of worker processes. Defaults to the number of CPUs.
+    - GUNICORN_TIMEOUT: Seconds a worker may stay silent before it is restarted. Defaults to 30.
+    - GUNICORN_KEEPALIVE: Seconds an idle client connection is kept open. Defaults to 5.
+"""
+import multiprocessing
+import os
+
+bind = f'0.0.0.0:{os.environ.get("PORT", "8000")}'
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = timeout
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+accesslog = '-'
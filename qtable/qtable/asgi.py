@@ -2,6 +2,7 @@
 ASGI config for qtable project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+QTable must be served through it: the async views and the long-lived event streams at /events/ rely on the event loop.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
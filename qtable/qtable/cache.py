@@ -0,0 +1,284 @@
+"""
+This module provides a two-tier cache backend: a small in-process cache (L1) in front of a shared cache (L2).
+
+Classes:
+    - TieredCache: A read-through cache backend that combines two configured cache aliases.
+
+Functions:
+    - is_process_local(): Tests whether a cache lives in the memory of the current process.
+
+Usage:
+    Settings configure the two tiers as regular cache aliases and point the 'default' alias at this backend:
+
+        CACHES = {
+            'default': {'BACKEND': 'qtable.cache.TieredCache', 'OPTIONS': {'L1': 'local', 'L2': 'shared'}},
+            'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'TIMEOUT': 5},
+            'shared': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://...'},
+        }
+
+Note:
+    Reads try L1 first, then L2, and copy L2 hits into L1. Writes and deletes go to both tiers, but only to the L1 of
+    the current process, so another worker may serve a stale value until its L1 entry expires. The L1 timeout is
+    therefore kept short, and it caps the timeout of every value copied into L1. Operations that must be atomic across
+    workers ('add', 'incr', 'decr') are delegated to L2 alone, so the cache locks built on 'add' keep working.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+_missing = object()
+
+
+def is_process_local(cache: BaseCache) -> bool:
+    """
+    Test whether a cache lives in the memory of the current process, so that other workers cannot see its changes.
+
+    :param cache: The cache backend.
+    :type cache: BaseCache
+    :return: True for a local-memory cache, or a tiered cache whose shared tier is one.
+    :rtype: bool
+    """
+    if isinstance(cache, TieredCache):
+        return is_process_local(cache.l2)
+    return isinstance(cache, LocMemCache)
+
+
+class TieredCache(BaseCache):
+    """A read-through cache backend with an in-process tier in front of a shared tier."""
+
+    def __init__(self, location: str, params: dict) -> None:
+        """
+        Initialize the backend from its cache settings.
+
+        :param location: The 'LOCATION' setting, unused.
+        :type location: str
+        :param params: The cache settings, whose 'OPTIONS' name the 'L1' and 'L2' cache aliases.
+        :type params: dict
+        """
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l1_alias = options.get('L1', 'local')
+        self._l2_alias = options.get('L2', 'shared')
+
+    @property
+    def l1(self) -> BaseCache:
+        """
+        Return the in-process cache of the current thread.
+
+        :return: The L1 cache.
+        :rtype: BaseCache
+        """
+        return caches[self._l1_alias]
+
+    @property
+    def l2(self) -> BaseCache:
+        """
+        Return the shared cache of the current thread.
+
+        :return: The L2 cache.
+        :rtype: BaseCache
+        """
+        return caches[self._l2_alias]
+
+    def l1_timeout(self, timeout: float | None = DEFAULT_TIMEOUT) -> float | None:
+        """
+        Return the timeout of a value copied into L1, which never exceeds the L1 default timeout.
+
+        :param timeout: The timeout requested for the value. Defaults to the L2 default timeout.
+        :type timeout: float | None
+        :return: The L1 timeout, in seconds.
+        :rtype: float | None
+        """
+        l1_default = self.l1.default_timeout
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.l2.default_timeout
+        if timeout is None:
+            return l1_default
+        return min(timeout, l1_default) if l1_default is not None else timeout
+
+    def get(self, key: str, default: object = None, version: int | None = None) -> object:
+        """
+        Return a value from L1, or from L2 while copying it into L1.
+
+        :param key: The cache key.
+        :type key: str
+        :param default: The value returned on a miss. Defaults to None.
+        :type default: object
+        :param version: The key version. Defaults to the version of each tier.
+        :type version: int | None
+        :return: The cached value, or the default.
+        :rtype: object
+        """
+        value = self.l1.get(key, _missing, version=version)
+        if value is _missing:
+            value = self.l2.get(key, _missing, version=version)
+            if value is _missing:
+                return default
+            self.l1.set(key, value, self.l1_timeout(), version=version)
+        return value
+
+    def get_many(self, keys: list, version: int | None = None) -> dict:
+        """
+        Return many values, reading only the L1 misses from L2.
+
+        :param keys: The cache keys.
+        :type keys: list
+        :param version: The key version. Defaults to the version of each tier.
+        :type version: int | None
+        :return: The values found, by key.
+        :rtype: dict
+        """
+        found = self.l1.get_many(keys, version=version)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            fetched = self.l2.get_many(missing, version=version)
+            if fetched:
+                self.l1.set_many(fetched, self.l1_timeout(), version=version)
+            found.update(fetched)
+        return found
+
+    def set(self, key: str, value: object, timeout: float | None = DEFAULT_TIMEOUT, version: int | None = None) -> None:
+        """
+        Store a value in both tiers.
+
+        :param key: The cache key.
+        :type key: str
+        :param value: The value to store.
+        :type value: object
+        :param timeout: The number of seconds to keep the value. Defaults to the L2 default timeout.
+        :type timeout: float | None
+        :param version: The key version. Defaults to the version of each tier.
+        :type version: int | None
+        """
+        self.l2.set(key, value, timeout, version=version)
+        self.l1.set(key, value, self.l1_timeout(timeout), version=version)
+
+    def set_many(self, data: dict, timeout: float | None = DEFAULT_TIMEOUT, version: int | None = None) -> list:
+        """
+        Store many values in both tiers.
+
+        :param data: The values to store, by key.
+        :type data: dict
+        :param timeout: The number of seconds to keep the values. Defaults to the L2 default timeout.
+        :type timeout: float | None
+        :param version: The key version. Defaults to the version of each tier.
+        :type version: int | None
+        :return: The keys that L2 failed to store.
+        :rtype: list
+        """
+        failed = self.l2.set_many(data, timeout, version=version)
+        self.l1.set_many(data, self.l1_timeout(timeout), version=version)
+        return failed
+
+    def add(self, key: str, value: object, timeout: float | None = DEFAULT_TIMEOUT, version: int | None = None) -> bool:
+        """
+        Store a value in L2 only if the key is missing there, which makes it usable as a cross-worker lock.
+
+        :param key: The cache key.
+        :type key: str
+        :param value: The value to store.
+        :type value: object
+        :param timeout: The number of seconds to keep the value. Defaults to the L2 default timeout.
+        :type timeout: float | None
+        :param version: The key version. Defaults to the version of each tier.
+        :type version: int | None
+        :return: True if the value was stored.
+        :rtype: bool
+        """
+        added = self.l2.add(key, value, timeout, version=version)
+        self.l1.delete(key, version=version)
+        return added
+
+    def touch(self, key: str, timeout: float | None = DEFAULT_TIMEOUT, version: int | None = None) -> bool:
+        """
+        Update the timeout of a value in L2, dropping its L1 copy.
+
+        :param key: The cache key.
+        :type key: str
+        :param timeout: The new number of seconds to keep the value. Defaults to the L2 default timeout.
+        :type timeout: float | None
+        :param version: The key version. Defaults to the version of each tier.
+        :type version: int | None
+        :return: True if the key exists.
+        :rtype: bool
+        """
+        self.l1.delete(key, version=version)
+        return self.l2.touch(key, timeout, version=version)
+
+    def incr(self, key: str, delta: int = 1, version: int | None = None) -> int:
+        """
+        Increment a value atomically in L2, dropping its L1 copy.
+
+        :param key: The cache key.
+        :type key: str
+        :param delta: The amount to add. Defaults to 1.
+        :type delta: int
+        :param version: The key version. Defaults to the version of each tier.
+        :type version: int | None
+        :return: The new value.
+        :rtype: int
+        :raises ValueError: If the key does not exist.
+        """
+        self.l1.delete(key, version=version)
+        return self.l2.incr(key, delta, version=version)
+
+    def decr(self, key: str, delta: int = 1, version: int | None = None) -> int:
+        """
+        Decrement a value atomically in L2, dropping its L1 copy.
+
+        :param key: The cache key.
+        :type key: str
+        :param delta: The amount to subtract. Defaults to 1.
+        :type delta: int
+        :param version: The key version. Defaults to the version of each tier.
+        :type version: int | None
+        :return: The new value.
+        :rtype: int
+        :raises ValueError: If the key does not exist.
+        """
+        self.l1.delete(key, version=version)
+        return self.l2.decr(key, delta, version=version)
+
+    def has_key(self, key: str, version: int | None = None) -> bool:
+        """
+        Check whether a key exists in either tier.
+
+        :param key: The cache key.
+        :type key: str
+        :param version: The key version. Defaults to the version of each tier.
+        :type version: int | None
+        :return: True if the key exists.
+        :rtype: bool
+        """
+        return self.l1.has_key(key, version=version) or self.l2.has_key(key, version=version)
+
+    def delete(self, key: str, version: int | None = None) -> bool:
+        """
+        Delete a key from both tiers.
+
+        :param key: The cache key.
+        :type key: str
+        :param version: The key version. Defaults to the version of each tier.
+        :type version: int | None
+        :return: True if the key existed in L2.
+        :rtype: bool
+        """
+        self.l1.delete(key, version=version)
+        return self.l2.delete(key, version=version)
+
+    def delete_many(self, keys: list, version: int | None = None) -> None:
+        """
+        Delete many keys from both tiers.
+
+        :param keys: The cache keys.
+        :type keys: list
+        :param version: The key version. Defaults to the version of each tier.
+        :type version: int | None
+        """
+        self.l1.delete_many(keys, version=version)
+        self.l2.delete_many(keys, version=version)
+
+    def clear(self) -> None:
+        """Remove every value from both tiers."""
+        self.l1.clear()
+        self.l2.clear()
@@ -1,6 +1,28 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_save, pre_delete
 
 
 class QtableAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'qtable_app'
+
+    def ready(self) -> None:
+        """Connect the signal handlers and start the quote of the day scheduler if it is enabled."""
+        from django.contrib.auth.models import User  # noqa: WPS433
+
+        from .events import quote_saved  # noqa: WPS433
+        from .favorites import favorites_changed, favorites_count_changed, user_deleted  # noqa: WPS433
+        from .instrumentation import install_db_wrapper  # noqa: WPS433
+        from .models import QuoteOfDay  # noqa: WPS433
+
+        m2m_changed.connect(favorites_changed, sender=QuoteOfDay.users.through)
+        m2m_changed.connect(favorites_count_changed, sender=QuoteOfDay.users.through)
+        pre_delete.connect(user_deleted, sender=User)
+        post_save.connect(quote_saved, sender=QuoteOfDay)
+        connection_created.connect(install_db_wrapper)
+        if settings.QUOTE_OF_DAY_SCHEDULER:
+            from .scheduler import start_scheduler  # noqa: WPS433
+
+            start_scheduler()
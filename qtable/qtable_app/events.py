@@ -0,0 +1,307 @@
+"""
+This module pushes live events to the browsers of QTable through a lightweight publish/subscribe broker.
+
+Classes:
+    - Subscription: The bounded queue of events of one open event stream.
+    - Broker: Delivers published events to the subscriptions of a process, optionally through PostgreSQL.
+
+Functions:
+    - user_channel(): Returns the channel of the events of a user.
+    - format_event(): Formats an event as a Server-Sent Events message.
+    - publish(): Publishes an event once the current transaction commits.
+    - quote_payload(): Returns the data of a 'quote_changed' event.
+    - quote_saved(): Publishes a 'quote_changed' event when the quote of the current day is created.
+
+Events:
+    - quote_changed: Sent on the QUOTES channel when the quote of the day changes, with the 'id', 'day', 'quote' and
+        'author' of the new quote ('day' only if the quote is not known yet).
+    - favorite_changed: Sent on the channel of a user when they change a favorite, with the 'id', the 'favorite' state
+        and the 'count' of the quote, or with the 'added' and 'removed' counts of a bulk change.
+
+Settings:
+    - EVENTS_PG_NOTIFY: Fan the events out across workers and processes with PostgreSQL LISTEN/NOTIFY.
+    - EVENTS_QUEUE_SIZE: The number of events buffered for a slow client before the oldest are dropped.
+
+Usage:
+    Code that changes state calls 'publish(channel, event, data)' from sync code, inside or outside a transaction.
+    EventStreamView subscribes with 'broker.subscribe(QUOTES, user_channel(user.pk))' and sends every event it gets as
+    a Server-Sent Events message, until the client disconnects.
+
+Note:
+    By default the broker only reaches the event streams of the process that publishes, which is enough with a single
+    worker. With EVENTS_PG_NOTIFY, 'publish()' sends the event with 'pg_notify()' in the current transaction, and every
+    worker holds one connection listening on the 'qtable_events' channel, opened by its first event stream, that
+    delivers the notifications to its own subscriptions. Events published by management commands then reach the
+    browsers too. Notifications sent while a listener reconnects are lost; events are hints to refresh, not a log.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from functools import partial
+from weakref import WeakKeyDictionary
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from .models import QuoteOfDay
+
+logger = logging.getLogger(__name__)
+
+QUOTES = 'quotes'
+PG_CHANNEL = 'qtable_events'
+RECONNECT_DELAY = 5
+
+
+def user_channel(user_id: int) -> str:
+    """
+    Return the channel of the events of a user.
+
+    :param user_id: The primary key of the user.
+    :type user_id: int
+    :return: The channel name.
+    :rtype: str
+    """
+    return f'user:{user_id}'
+
+
+def format_event(event: str, data: dict) -> str:
+    """
+    Format an event as a Server-Sent Events message.
+
+    :param event: The event name.
+    :type event: str
+    :param data: The event data, serialized as JSON on a single line.
+    :type data: dict
+    :return: The message, terminated by a blank line.
+    :rtype: str
+    """
+    return f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+
+class Subscription:
+    """The queue of events of one event stream, bound to the event loop that reads it."""
+
+    def __init__(self, channels: tuple[str, ...], loop: asyncio.AbstractEventLoop, size: int) -> None:
+        """
+        Initialize the subscription.
+
+        :param channels: The channels subscribed to.
+        :type channels: tuple[str, ...]
+        :param loop: The event loop of the event stream.
+        :type loop: asyncio.AbstractEventLoop
+        :param size: The number of events buffered before the oldest are dropped.
+        :type size: int
+        """
+        self.channels = channels
+        self.loop = loop
+        self.queue = asyncio.Queue(size)
+
+    def put(self, message: str) -> None:
+        """
+        Queue a message from any thread, dropping the oldest one if the client is not keeping up.
+
+        :param message: The formatted event.
+        :type message: str
+        """
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message: str) -> None:
+        """
+        Queue a message, in the event loop of the subscription.
+
+        :param message: The formatted event.
+        :type message: str
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> str | None:
+        """
+        Wait for the next message.
+
+        :param timeout: The maximum number of seconds to wait.
+        :type timeout: float
+        :return: The formatted event, or None if none arrived in time.
+        :rtype: str | None
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    """Deliver events to the subscriptions of the process, directly or through PostgreSQL notifications."""
+
+    def __init__(self) -> None:
+        """Initialize an empty broker."""
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+        self._listeners = WeakKeyDictionary()
+
+    def subscribe(self, *channels: str) -> Subscription:
+        """
+        Subscribe to channels from the running event loop, starting its PostgreSQL listener if it is enabled.
+
+        :param channels: The channels to subscribe to.
+        :type channels: str
+        :return: The subscription, to pass to 'unsubscribe()' when the stream ends.
+        :rtype: Subscription
+        """
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(channels, loop, settings.EVENTS_QUEUE_SIZE)
+        with self._lock:
+            for channel in channels:
+                self._subscriptions[channel].add(subscription)
+        if settings.EVENTS_PG_NOTIFY:
+            listener = self._listeners.get(loop)
+            if listener is None or listener.done():
+                self._listeners[loop] = loop.create_task(self.listen())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Remove a subscription from all its channels.
+
+        :param subscription: The subscription.
+        :type subscription: Subscription
+        """
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions[channel]
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[channel]
+
+    def deliver(self, channel: str, event: str, data: dict) -> None:
+        """
+        Send an event to the subscriptions of a channel in this process, from any thread.
+
+        :param channel: The channel.
+        :type channel: str
+        :param event: The event name.
+        :type event: str
+        :param data: The event data.
+        :type data: dict
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        if subscriptions:
+            message = format_event(event, data)
+            for subscription in subscriptions:
+                subscription.put(message)
+
+    async def listen(self) -> None:
+        """Deliver the PostgreSQL notifications of the 'qtable_events' channel, reconnecting after a failure."""
+        loop = asyncio.get_running_loop()
+        while True:  # noqa: WPS457
+            pg_connection = None
+            try:
+                pg_connection = await loop.run_in_executor(None, self.connect)
+                ready = asyncio.Event()
+                fileno = pg_connection.fileno()
+                loop.add_reader(fileno, ready.set)
+                try:
+                    while True:  # noqa: WPS457
+                        await ready.wait()
+                        ready.clear()
+                        pg_connection.poll()
+                        while pg_connection.notifies:
+                            self.receive(pg_connection.notifies.pop(0).payload)
+                finally:
+                    loop.remove_reader(fileno)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Listening to PostgreSQL notifications failed')
+            finally:
+                if pg_connection is not None:
+                    pg_connection.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def connect(self) -> object:
+        """
+        Open a dedicated connection to the default database and listen on the 'qtable_events' channel.
+
+        :return: The psycopg2 connection, in autocommit mode.
+        :rtype: psycopg2.extensions.connection
+        """
+        database = connections['default']
+        pg_connection = database.Database.connect(**database.get_connection_params())
+        pg_connection.autocommit = True
+        with pg_connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {PG_CHANNEL}')
+        return pg_connection
+
+    def receive(self, payload: str) -> None:
+        """
+        Deliver a notification to the subscriptions of this process.
+
+        :param payload: The notification payload, a JSON object with the 'channel', 'event' and 'data' keys.
+        :type payload: str
+        """
+        try:
+            message = json.loads(payload)
+            self.deliver(message['channel'], message['event'], message['data'])
+        except (ValueError, KeyError, TypeError):
+            logger.warning('Ignoring a malformed notification: %r', payload)
+
+
+broker = Broker()
+
+
+def publish(channel: str, event: str, data: dict) -> None:
+    """
+    Publish an event to a channel once the current transaction commits, or at once outside a transaction.
+
+    With EVENTS_PG_NOTIFY the event is sent with 'pg_notify()', which PostgreSQL itself delays until the commit.
+
+    :param channel: The channel.
+    :type channel: str
+    :param event: The event name.
+    :type event: str
+    :param data: The event data, serializable as JSON.
+    :type data: dict
+    """
+    if settings.EVENTS_PG_NOTIFY:
+        payload = json.dumps({'channel': channel, 'event': event, 'data': data}, cls=DjangoJSONEncoder)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [PG_CHANNEL, payload])
+    else:
+        transaction.on_commit(partial(broker.deliver, channel, event, data))
+
+
+def quote_payload(quote: QuoteOfDay) -> dict:
+    """
+    Return the data of a 'quote_changed' event.
+
+    :param quote: The quote of the day.
+    :type quote: QuoteOfDay
+    :return: The 'id', 'day', 'quote' and 'author' of the quote.
+    :rtype: dict
+    """
+    return {'id': quote.pk, 'day': quote.day, 'quote': quote.quote, 'author': quote.author}
+
+
+def quote_saved(sender: type, instance: QuoteOfDay, created: bool, **kwargs) -> None:
+    """
+    Publish a 'quote_changed' event when the quote of the current day is created.
+
+    Quotes prefetched for the following days are announced by the event streams themselves when their day starts.
+
+    :param sender: The QuoteOfDay model.
+    :type sender: type
+    :param instance: The saved quote.
+    :type instance: QuoteOfDay
+    :param created: Whether the quote was created.
+    :type created: bool
+    :param kwargs: Other signal arguments.
+    :type kwargs: dict
+    """
+    if created and instance.day == timezone.localdate():
+        publish(QUOTES, 'quote_changed', quote_payload(instance))
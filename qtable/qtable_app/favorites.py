@@ -0,0 +1,335 @@
+"""
+This module provides the set of favorite quote IDs of a user, cached so templates can test membership in O(1), and
+keeps the favorite count of every quote up to date.
+
+Functions:
+    - cache_key(): Returns the cache key of the favorite IDs of a user.
+    - get_favorite_ids(): Returns the favorite quote IDs of a user.
+    - aget_favorite_ids(): Returns the favorite quote IDs of a user, asynchronously.
+    - invalidate_favorite_ids(): Drops the cached favorite IDs of the given users.
+    - set_favorite(): Adds or removes a favorite, or toggles it, with one existence check and one write, and publishes
+        a 'favorite_changed' event to the other tabs of the user.
+    - aset_favorite(): Adds or removes a favorite, or toggles it, asynchronously.
+    - bulk_set_favorites(): Adds and removes many favorites of a user in a single transaction.
+    - change_favorites_count(): Adds a delta to the favorite count of quotes with an 'F()' expression.
+    - reconcile_favorites_count(): Recounts the favorites of the quotes whose favorite count has drifted.
+    - favorites_changed(): Invalidates the cached favorite IDs whenever the 'QuoteOfDay.users' relation changes.
+    - favorites_count_changed(): Updates the favorite counts when the relation is changed through its managers.
+    - user_deleted(): Decrements the favorite counts of the quotes of a user who is being deleted.
+
+Usage:
+    Views put 'favorite_ids' in the template context, and templates test '{% if quote|is_favorite:favorite_ids %}'
+    instead of '{% if quote in favorites %}', which evaluated the whole favorites queryset for every quote.
+
+Note:
+    The IDs are read from the 'QuoteOfDay.users' through table with a single 'values_list' query, so no quote rows are
+    loaded. The cache entry is dropped by the 'm2m_changed' signal, so every add, remove or clear keeps it accurate in
+    the shared cache; the in-process tier of other workers, or their own local-memory cache, may keep an old copy, so
+    the entries only live for FAVORITES_CACHE_TIMEOUT seconds, which bounds how long another worker can serve it.
+    'QuoteOfDay.favorites_count' is changed in the same transaction as the through table: the functions of this module
+    lock the quote rows first, so concurrent toggles cannot count a favorite twice, and the relation managers (e.g. in
+    the admin) are covered by the 'm2m_changed' signal. Rows deleted by other means, like raw SQL, are fixed by the
+    'reconcile_favorites_count' management command.
+"""
+from collections.abc import Iterable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import Http404
+
+from .events import publish, user_channel
+from .models import QuoteOfDay, published
+
+BATCH_SIZE = 1000
+
+Favorite = QuoteOfDay.users.through
+
+
+def cache_key(user_id: int) -> str:
+    """
+    Return the cache key of the favorite IDs of a user.
+
+    :param user_id: The primary key of the user.
+    :type user_id: int
+    :return: The cache key.
+    :rtype: str
+    """
+    return f'favorites:{user_id}'
+
+
+def get_favorite_ids(user: User) -> frozenset[int]:
+    """
+    Return the IDs of the favorite quotes of a user, from the cache or with one query.
+
+    :param user: The user whose favorites are returned.
+    :type user: User
+    :return: The favorite quote IDs; empty for anonymous users.
+    :rtype: frozenset[int]
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    favorite_ids = cache.get(cache_key(user.pk))
+    if favorite_ids is None:
+        favorite_ids = frozenset(Favorite.objects.filter(user_id=user.pk).values_list('quoteofday_id', flat=True))
+        cache.set(cache_key(user.pk), favorite_ids, settings.FAVORITES_CACHE_TIMEOUT)
+    return favorite_ids
+
+
+async def aget_favorite_ids(user: User) -> frozenset[int]:
+    """
+    Return the IDs of the favorite quotes of a user, from the cache or with one query, asynchronously.
+
+    :param user: The user whose favorites are returned.
+    :type user: User
+    :return: The favorite quote IDs; empty for anonymous users.
+    :rtype: frozenset[int]
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    favorite_ids = await cache.aget(cache_key(user.pk))
+    if favorite_ids is None:
+        favorite_ids = frozenset([
+            quote_id async for quote_id in Favorite.objects.filter(
+                user_id=user.pk,
+            ).values_list('quoteofday_id', flat=True)
+        ])
+        await cache.aset(cache_key(user.pk), favorite_ids, settings.FAVORITES_CACHE_TIMEOUT)
+    return favorite_ids
+
+
+def invalidate_favorite_ids(*user_ids: int) -> None:
+    """
+    Drop the cached favorite IDs of the given users.
+
+    :param user_ids: The primary keys of the users.
+    :type user_ids: int
+    """
+    cache.delete_many([cache_key(user_id) for user_id in user_ids])
+
+
+def set_favorite(user_id: int, quote_id: int, state: bool | None = None) -> tuple[bool, int]:
+    """
+    Set the favorite state of a quote for a user directly on the through table.
+
+    The quote row is locked and its favorite count read, then the existing favorite is checked once and inserted or
+    deleted, and the count is updated with an 'F()' expression. The lock serializes concurrent requests for the same
+    quote (e.g. a double click), so they never fail, create duplicates or miscount; passing an explicit 'state' makes
+    the call idempotent.
+
+    :param user_id: The primary key of the user.
+    :type user_id: int
+    :param quote_id: The primary key of the quote of the day.
+    :type quote_id: int
+    :param state: The requested state, or None to toggle the current one. Defaults to None.
+    :type state: bool | None, optional
+    :return: The new favorite state and the number of users who favorited the quote.
+    :rtype: tuple[bool, int]
+    :raises Http404: If the quote does not exist, or its day has not come yet.
+    """
+    with transaction.atomic():
+        count = QuoteOfDay.objects.select_for_update().filter(published(), pk=quote_id).values_list(
+            'favorites_count', flat=True,
+        ).first()
+        if count is None:
+            raise Http404('Quote not found')
+        favorite = Favorite.objects.filter(user_id=user_id, quoteofday_id=quote_id)
+        exists = favorite.exists()
+        state = not exists if state is None else state
+        delta = 0
+        if exists and not state:
+            favorite.delete()
+            delta = -1
+        elif state and not exists:
+            Favorite.objects.create(user_id=user_id, quoteofday_id=quote_id)
+            delta = 1
+        change_favorites_count([quote_id], delta)
+        publish(user_channel(user_id), 'favorite_changed', {'id': quote_id, 'favorite': state, 'count': count + delta})
+    invalidate_favorite_ids(user_id)
+    return state, count + delta
+
+
+async def aset_favorite(user_id: int, quote_id: int, state: bool | None = None) -> tuple[bool, int]:
+    """
+    Set the favorite state of a quote for a user, asynchronously.
+
+    The transaction runs in the thread of the async ORM, as the async ORM has no transactions.
+
+    :param user_id: The primary key of the user.
+    :type user_id: int
+    :param quote_id: The primary key of the quote of the day.
+    :type quote_id: int
+    :param state: The requested state, or None to toggle the current one. Defaults to None.
+    :type state: bool | None, optional
+    :return: The new favorite state and the number of users who favorited the quote.
+    :rtype: tuple[bool, int]
+    :raises Http404: If the quote does not exist, or its day has not come yet.
+    """
+    return await sync_to_async(set_favorite)(user_id, quote_id, state)
+
+
+def bulk_set_favorites(user_id: int, add_ids: set[int], remove_ids: set[int]) -> dict:
+    """
+    Add and remove many favorites of a user in a single transaction.
+
+    The affected quote rows are locked in primary key order, then the new favorites are inserted with 'bulk_create' on
+    the through table and the removed ones deleted with a single query, and the favorite counts are updated with two
+    'F()' updates. IDs of quotes that do not exist, or whose day has not come yet, are skipped and reported; an ID
+    both added and removed ends up removed.
+
+    :param user_id: The primary key of the user.
+    :type user_id: int
+    :param add_ids: The primary keys of the quotes to add.
+    :type add_ids: set[int]
+    :param remove_ids: The primary keys of the quotes to remove.
+    :type remove_ids: set[int]
+    :return: A dictionary with the 'added' and 'removed' counts and the sorted 'unknown' IDs.
+    :rtype: dict
+    """
+    with transaction.atomic():
+        known_ids = set(
+            QuoteOfDay.objects.select_for_update().filter(
+                published(),
+                pk__in=add_ids | remove_ids,
+            ).order_by('pk').values_list('pk', flat=True),
+        )
+        current_ids = set(
+            Favorite.objects.filter(
+                user_id=user_id,
+                quoteofday_id__in=known_ids,
+            ).values_list('quoteofday_id', flat=True),
+        )
+        added_ids = (add_ids & known_ids) - remove_ids - current_ids
+        removed_ids = remove_ids & current_ids
+        Favorite.objects.bulk_create(
+            [Favorite(user_id=user_id, quoteofday_id=quote_id) for quote_id in added_ids],
+            batch_size=BATCH_SIZE,
+        )
+        if removed_ids:
+            Favorite.objects.filter(user_id=user_id, quoteofday_id__in=removed_ids).delete()
+        change_favorites_count(added_ids, 1)
+        change_favorites_count(removed_ids, -1)
+        if added_ids or removed_ids:
+            publish(user_channel(user_id), 'favorite_changed', {'added': len(added_ids), 'removed': len(removed_ids)})
+    invalidate_favorite_ids(user_id)
+    return {'added': len(added_ids), 'removed': len(removed_ids), 'unknown': sorted(add_ids - known_ids)}
+
+
+def change_favorites_count(quote_ids: Iterable[int], delta: int) -> None:
+    """
+    Add a delta to the favorite count of quotes, atomically in the database.
+
+    :param quote_ids: The primary keys of the quotes.
+    :type quote_ids: Iterable[int]
+    :param delta: The number to add, negative for removed favorites.
+    :type delta: int
+    """
+    quote_ids = list(quote_ids)
+    if quote_ids and delta:
+        QuoteOfDay.objects.filter(pk__in=quote_ids).update(favorites_count=F('favorites_count') + delta)
+
+
+def reconcile_favorites_count(batch_size: int = BATCH_SIZE) -> int:
+    """
+    Recount the favorites of the quotes whose favorite count differs from the through table.
+
+    :param batch_size: The number of quotes updated per query. Defaults to BATCH_SIZE.
+    :type batch_size: int
+    :return: The number of quotes whose count was fixed.
+    :rtype: int
+    """
+    counts = Favorite.objects.filter(
+        quoteofday_id=OuterRef('pk'),
+    ).order_by().values('quoteofday_id').annotate(count=Count('pk')).values('count')
+    actual = Coalesce(Subquery(counts), 0)
+    drifted_ids = list(
+        QuoteOfDay.objects.annotate(actual=actual).exclude(favorites_count=F('actual')).values_list('pk', flat=True),
+    )
+    for start in range(0, len(drifted_ids), batch_size):
+        with transaction.atomic():
+            QuoteOfDay.objects.filter(pk__in=drifted_ids[start:start + batch_size]).update(favorites_count=actual)
+    return len(drifted_ids)
+
+
+def favorites_changed(sender, instance, action: str, reverse: bool, pk_set: set | None, **kwargs) -> None:
+    """
+    Invalidate the cached favorite IDs of the users affected by a change of the 'QuoteOfDay.users' relation.
+
+    :param sender: The through model of the relation.
+    :type sender: type
+    :param instance: The user or quote whose relation changed.
+    :type instance: User | QuoteOfDay
+    :param action: The kind of change, e.g. 'post_add'.
+    :type action: str
+    :param reverse: True if the change was made from the user side ('user.favorites').
+    :type reverse: bool
+    :param pk_set: The primary keys added or removed, or None for a clear.
+    :type pk_set: set | None
+    :param kwargs: Other signal arguments.
+    :type kwargs: dict
+    """
+    if reverse:
+        if action in {'post_add', 'post_remove', 'post_clear'}:
+            invalidate_favorite_ids(instance.pk)
+    elif action in {'post_add', 'post_remove'}:
+        invalidate_favorite_ids(*pk_set)
+    elif action == 'pre_clear':
+        invalidate_favorite_ids(*Favorite.objects.filter(quoteofday_id=instance.pk).values_list('user_id', flat=True))
+
+
+def favorites_count_changed(sender, instance, action: str, reverse: bool, pk_set: set | None, **kwargs) -> None:
+    """
+    Update the favorite counts when the 'QuoteOfDay.users' relation is changed through its managers.
+
+    Django reports only the rows really added in 'post_add', but the requested ones in 'pre_remove', so removals and
+    clears count the existing rows before they are deleted, in the transaction of the change.
+
+    :param sender: The through model of the relation.
+    :type sender: type
+    :param instance: The user or quote whose relation changed.
+    :type instance: User | QuoteOfDay
+    :param action: The kind of change, e.g. 'post_add'.
+    :type action: str
+    :param reverse: True if the change was made from the user side ('user.favorites').
+    :type reverse: bool
+    :param pk_set: The primary keys added or removed, or None for a clear.
+    :type pk_set: set | None
+    :param kwargs: Other signal arguments.
+    :type kwargs: dict
+    """
+    if action == 'post_add':
+        if reverse:
+            change_favorites_count(pk_set, 1)
+        else:
+            change_favorites_count([instance.pk], len(pk_set))
+    elif action in {'pre_remove', 'pre_clear'}:
+        if reverse:
+            favorites = Favorite.objects.filter(user_id=instance.pk)
+            if action == 'pre_remove':
+                favorites = favorites.filter(quoteofday_id__in=pk_set)
+            change_favorites_count(favorites.values_list('quoteofday_id', flat=True), -1)
+        else:
+            favorites = Favorite.objects.filter(quoteofday_id=instance.pk)
+            if action == 'pre_remove':
+                favorites = favorites.filter(user_id__in=pk_set)
+            change_favorites_count([instance.pk], -favorites.count())
+
+
+def user_deleted(sender: type, instance: User, **kwargs) -> None:
+    """
+    Decrement the favorite counts of the quotes of a user who is being deleted, before the cascade removes the rows.
+
+    :param sender: The user model.
+    :type sender: type
+    :param instance: The user being deleted.
+    :type instance: User
+    :param kwargs: Other signal arguments.
+    :type kwargs: dict
+    """
+    QuoteOfDay.objects.filter(
+        pk__in=Favorite.objects.filter(user_id=instance.pk).values('quoteofday_id'),
+    ).update(favorites_count=F('favorites_count') - 1)
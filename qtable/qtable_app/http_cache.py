@@ -0,0 +1,180 @@
+"""
+This module provides HTTP caching helpers for the quote pages: validators, conditional requests and cache headers.
+
+Functions:
+    - make_etag(): Builds a strong ETag from the parts that determine a page.
+    - not_modified(): Returns a 304 (or 412) response when the request's conditional headers match the page.
+    - patch_conditional_headers(): Sets ETag, Last-Modified, Cache-Control and Vary on a response.
+    - aget_quotes_version(): Returns the version (last sync time) of the local quote mirror.
+    - bump_quotes_version(): Records a new version of the local quote mirror after a sync.
+    - page_cache_key(): Returns the cache key of a rendered page for anonymous users.
+    - acached_page(): Serves a page to anonymous users from the cache, rendering and storing it on a miss.
+
+Usage:
+    A view computes its ETag from the quote version and the user's favorite state, returns 'not_modified()' when it is
+    not None, and otherwise renders the template; in both cases it passes the response to
+    'patch_conditional_headers()'. The rendering itself goes through 'acached_page()' with the same ETag, so anonymous
+    users share a single rendered copy of each page version.
+
+Note:
+    Anonymous responses are 'public' with a bounded max-age, so a CDN or reverse proxy can serve them, while
+    authenticated responses are 'private, no-cache', so browsers revalidate them and get a 304 instead of a re-render.
+    Every response varies on Cookie, because the page differs between anonymous and logged-in users.
+    The page cache is keyed by the path and the ETag, which already covers the quote version, so a new quote of the day
+    or a new mirror sync switches to a new key and the old entries simply expire. A sync is seen by every worker within
+    QUOTES_VERSION_TIMEOUT seconds, even one whose cache the 'sync_quotes' command cannot reach. Anonymous pages
+    contain no CSRF token or other per-user data, which is what makes sharing them safe.
+"""
+import hashlib
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import Quote
+
+PUBLIC_MAX_AGE = 60 * 60  # one hour
+QUOTES_VERSION_KEY = 'quotes:version'
+QUOTES_VERSION_TIMEOUT = 60  # one minute
+PAGE_CACHE_PREFIX = 'page'
+
+
+def make_etag(*parts: object) -> str:
+    """
+    Build a strong ETag from the parts that determine the content of a page.
+
+    :param parts: The values the page depends on, e.g. the quote ID, its version and the favorite state.
+    :type parts: object
+    :return: The quoted ETag.
+    :rtype: str
+    """
+    digest = hashlib.sha256(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def not_modified(request: HttpRequest, etag: str, last_modified: datetime | None) -> HttpResponse | None:
+    """
+    Evaluate the conditional headers of a request against the current validators of the page.
+
+    :param request: The HTTP request object.
+    :type request: HttpRequest
+    :param etag: The current ETag of the page.
+    :type etag: str
+    :param last_modified: The last modification time of the page, or None if unknown.
+    :type last_modified: datetime | None
+    :return: A 304 or 412 response if the conditions say so, otherwise None.
+    :rtype: HttpResponse | None
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def patch_conditional_headers(
+    request: HttpRequest,
+    response: HttpResponse,
+    etag: str,
+    last_modified: datetime | None,
+    max_age: int = PUBLIC_MAX_AGE,
+) -> HttpResponse:
+    """
+    Set the validators and the caching policy of a page response.
+
+    :param request: The HTTP request object.
+    :type request: HttpRequest
+    :param response: The rendered or 304 response.
+    :type response: HttpResponse
+    :param etag: The ETag of the page.
+    :type etag: str
+    :param last_modified: The last modification time of the page, or None if unknown.
+    :type last_modified: datetime | None
+    :param max_age: The max-age of anonymous responses, in seconds. Defaults to PUBLIC_MAX_AGE.
+    :type max_age: int
+    :return: The same response.
+    :rtype: HttpResponse
+    """
+    response.headers.setdefault('ETag', etag)
+    if last_modified:
+        response.headers.setdefault('Last-Modified', http_date(last_modified.timestamp()))
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, max_age=min(max_age, PUBLIC_MAX_AGE))
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+async def aget_quotes_version() -> datetime | None:
+    """
+    Return the version of the local quote mirror, i.e. the time of its last write.
+
+    The version is cached for QUOTES_VERSION_TIMEOUT seconds only, since the mirror is also written by other processes
+    (the 'sync_quotes' command, the admin) whose 'bump_quotes_version()' may not reach the cache of this worker.
+
+    :return: The version, or None if the mirror is empty.
+    :rtype: datetime | None
+    """
+    version = await cache.aget(QUOTES_VERSION_KEY)
+    if version is None:
+        version = (await Quote.objects.aaggregate(latest=Max('synced')))['latest']
+        if version is not None:
+            await cache.aset(QUOTES_VERSION_KEY, version, QUOTES_VERSION_TIMEOUT)
+    return version
+
+
+def bump_quotes_version() -> None:
+    """Record the current state of the local quote mirror as its new version."""
+    cache.set(QUOTES_VERSION_KEY, Quote.objects.aggregate(latest=Max('synced'))['latest'], QUOTES_VERSION_TIMEOUT)
+
+
+def page_cache_key(path: str, etag: str) -> str:
+    """
+    Return the cache key of a rendered page for anonymous users.
+
+    :param path: The path of the page.
+    :type path: str
+    :param etag: The current ETag of the page.
+    :type etag: str
+    :return: The cache key.
+    :rtype: str
+    """
+    digest = hashlib.sha256(path.encode()).hexdigest()[:32]
+    version = etag.strip('"')
+    return f'{PAGE_CACHE_PREFIX}:{digest}:{version}'
+
+
+async def acached_page(
+    request: HttpRequest,
+    etag: str,
+    timeout: int,
+    render_page: Callable[[], Awaitable[HttpResponse]],
+) -> HttpResponse:
+    """
+    Serve a page to anonymous users from the cache, rendering and storing it on a miss.
+
+    Authenticated users always get a fresh render, because their pages show their favorites and a CSRF token.
+
+    :param request: The HTTP request object.
+    :type request: HttpRequest
+    :param etag: The current ETag of the page, which identifies its version.
+    :type etag: str
+    :param timeout: The number of seconds to keep the rendered page.
+    :type timeout: int
+    :param render_page: A coroutine function building the context and rendering the page.
+    :type render_page: Callable[[], Awaitable[HttpResponse]]
+    :return: The rendered page.
+    :rtype: HttpResponse
+    """
+    if request.user.is_authenticated:
+        return await render_page()
+    key = page_cache_key(request.path, etag)
+    content = await cache.aget(key)
+    if content is not None:
+        return HttpResponse(content)
+    response = await render_page()
+    if response.status_code == 200:
+        await cache.aset(key, response.content, timeout)
+    return response
@@ -0,0 +1,299 @@
+"""
+This module records what each request costs: database queries, outbound HTTP calls, upstream fetches and rendering.
+
+Classes:
+    - QueryBudgetExceeded: Raised when a view runs more database queries than its budget allows, in strict mode.
+    - RequestMetrics: The counts and durations recorded during a single request.
+    - MetricsRegistry: Aggregates the request metrics of the process and renders them in the Prometheus text format.
+    - InstrumentedTemplate: A Django template whose rendering is timed.
+    - InstrumentedDjangoTemplates: A Django template backend returning instrumented templates.
+
+Functions:
+    - start_request(): Starts recording the metrics of a request in the current context.
+    - finish_request(): Stops recording the metrics of a request and returns them.
+    - track(): Times a block of code under a metric name of the current request.
+    - db_wrapper(): A database execute wrapper that times every query.
+    - install_db_wrapper(): Installs 'db_wrapper' on a new database connection.
+
+Attributes:
+    - registry: The process-wide MetricsRegistry.
+
+Usage:
+    InstrumentationMiddleware calls 'start_request()' and 'finish_request()' around every request and feeds the result
+    to 'registry'. The database wrapper is installed by the 'connection_created' signal, the quote source client wraps
+    its HTTP calls in 'track("http")', 'BaseQuoteView.get_response()' wraps itself in 'track("upstream")', and the
+    template backend wraps rendering in 'track("render")'. MetricsView serves 'registry.render()' at '/metrics/'.
+
+Note:
+    The metrics of a request live in a context variable, which asgiref copies into the threads running sync code, so
+    queries run by the async ORM are counted too. Each worker process has its own registry; Prometheus should scrape
+    every worker, or the totals should be read as per-worker samples.
+"""
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+
+from django.http import HttpRequest
+from django.template.backends.django import DjangoTemplates, Template
+
+_current = ContextVar('qtable_request_metrics', default=None)
+
+METRICS = ('db', 'http', 'upstream', 'render')
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a view runs more database queries than its 'query_budget' allows."""
+
+
+class RequestMetrics:
+    """The counts and durations of the costly operations of a single request."""
+
+    def __init__(self) -> None:
+        """Initialize empty metrics."""
+        self.counts = dict.fromkeys(METRICS, 0)
+        self.durations = dict.fromkeys(METRICS, 0.0)
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.view_name = None
+        self.query_budget = None
+
+    def add(self, name: str, duration: float) -> None:
+        """
+        Record one operation.
+
+        :param name: The metric name, one of METRICS.
+        :type name: str
+        :param duration: The duration of the operation, in seconds.
+        :type duration: float
+        """
+        self.counts[name] += 1
+        self.durations[name] += duration
+
+    def server_timing(self) -> str:
+        """
+        Format the metrics as the value of a 'Server-Timing' header.
+
+        :return: The header value, with durations in milliseconds.
+        :rtype: str
+        """
+        entries = [
+            f'{name};dur={self.durations[name] * 1000:.1f};desc="{self.counts[name]}"'
+            for name in METRICS
+            if self.counts[name]
+        ]
+        entries.append(f'total;dur={self.total * 1000:.1f}')
+        return ', '.join(entries)
+
+
+class MetricsRegistry:
+    """A thread-safe aggregate of the request metrics of the process."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._lock = threading.Lock()
+        self._requests = defaultdict(int)
+        self._buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+        self._durations = defaultdict(float)
+        self._operations = defaultdict(int)
+        self._operation_durations = defaultdict(float)
+
+    def observe(self, request: HttpRequest, status: int, metrics: RequestMetrics) -> None:
+        """
+        Add the metrics of a finished request.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :param status: The status code of the response.
+        :type status: int
+        :param metrics: The metrics of the request.
+        :type metrics: RequestMetrics
+        """
+        view = metrics.view_name or 'unresolved'
+        with self._lock:
+            self._requests[view, request.method, status] += 1
+            self._durations[view] += metrics.total
+            buckets = self._buckets[view]
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if metrics.total <= bound:
+                    buckets[index] += 1
+            for name in METRICS:
+                self._operations[view, name] += metrics.counts[name]
+                self._operation_durations[view, name] += metrics.durations[name]
+
+    def render(self) -> str:
+        """
+        Render the aggregated metrics in the Prometheus text exposition format.
+
+        :return: The metrics document.
+        :rtype: str
+        """
+        with self._lock:
+            lines = [
+                '# HELP qtable_requests_total Requests handled, by view, method and status.',
+                '# TYPE qtable_requests_total counter',
+            ]
+            counts = defaultdict(int)
+            for (view, method, status), count in sorted(self._requests.items()):
+                counts[view] += count
+                lines.append(f'qtable_requests_total{{view="{view}",method="{method}",status="{status}"}} {count}')
+            lines.extend((
+                '# HELP qtable_request_duration_seconds Time spent handling requests, by view.',
+                '# TYPE qtable_request_duration_seconds histogram',
+            ))
+            for view, buckets in sorted(self._buckets.items()):
+                for bound, count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'qtable_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {count}')
+                lines.append(f'qtable_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {counts[view]}')
+                lines.append(f'qtable_request_duration_seconds_sum{{view="{view}"}} {self._durations[view]:.6f}')
+                lines.append(f'qtable_request_duration_seconds_count{{view="{view}"}} {counts[view]}')
+            lines.extend((
+                '# HELP qtable_operations_total Costly operations (db, http, upstream, render), by view.',
+                '# TYPE qtable_operations_total counter',
+            ))
+            for (view, name), count in sorted(self._operations.items()):
+                lines.append(f'qtable_operations_total{{view="{view}",operation="{name}"}} {count}')
+            lines.extend((
+                '# HELP qtable_operation_duration_seconds_total Time spent in costly operations, by view.',
+                '# TYPE qtable_operation_duration_seconds_total counter',
+            ))
+            for (view, name), duration in sorted(self._operation_durations.items()):
+                lines.append(
+                    f'qtable_operation_duration_seconds_total{{view="{view}",operation="{name}"}} {duration:.6f}',
+                )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def start_request() -> tuple[RequestMetrics, Token]:
+    """
+    Start recording the metrics of a request in the current context.
+
+    :return: The new metrics, and the token that restores the previous context in 'finish_request()'.
+    :rtype: tuple[RequestMetrics, Token]
+    """
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(metrics: RequestMetrics, token: Token) -> RequestMetrics:
+    """
+    Stop recording the metrics of a request.
+
+    :param metrics: The metrics returned by 'start_request()'.
+    :type metrics: RequestMetrics
+    :param token: The token returned by 'start_request()'.
+    :type token: Token
+    :return: The metrics, with the total duration of the request.
+    :rtype: RequestMetrics
+    """
+    metrics.total = time.perf_counter() - metrics.started
+    _current.reset(token)
+    return metrics
+
+
+@contextmanager
+def track(name: str) -> Iterator[None]:
+    """
+    Time a block of code under a metric name of the current request, if one is being recorded.
+
+    :param name: The metric name, one of METRICS.
+    :type name: str
+    :return: A context manager timing its block.
+    :rtype: Iterator[None]
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - start)
+
+
+def db_wrapper(execute: Callable, sql: str, params: tuple, many: bool, context: dict) -> object:
+    """
+    Time a database query as part of the current request.
+
+    :param execute: The next execute function in the wrapper chain.
+    :type execute: Callable
+    :param sql: The SQL statement.
+    :type sql: str
+    :param params: The parameters of the statement.
+    :type params: tuple
+    :param many: Whether the statement is run with 'executemany()'.
+    :type many: bool
+    :param context: The connection and the cursor.
+    :type context: dict
+    :return: The result of the query.
+    :rtype: object
+    """
+    with track('db'):
+        return execute(sql, params, many, context)
+
+
+def install_db_wrapper(sender: type, connection, **kwargs) -> None:
+    """
+    Install 'db_wrapper' on a new database connection, once per connection object.
+
+    :param sender: The database wrapper class.
+    :type sender: type
+    :param connection: The database connection that was opened.
+    :type connection: BaseDatabaseWrapper
+    :param kwargs: Additional keyword arguments of the signal.
+    :type kwargs: dict
+    """
+    if db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_wrapper)
+
+
+class InstrumentedTemplate(Template):
+    """A Django template whose rendering is recorded as the 'render' metric."""
+
+    def render(self, context: dict = None, request: HttpRequest = None) -> str:
+        """
+        Render the template and time it.
+
+        :param context: The template context. Defaults to None.
+        :type context: dict, optional
+        :param request: The HTTP request object. Defaults to None.
+        :type request: HttpRequest, optional
+        :return: The rendered template.
+        :rtype: str
+        """
+        with track('render'):
+            return super().render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, returning templates whose rendering is timed."""
+
+    def from_string(self, template_code: str) -> InstrumentedTemplate:
+        """
+        Compile a template from a string.
+
+        :param template_code: The template source.
+        :type template_code: str
+        :return: The instrumented template.
+        :rtype: InstrumentedTemplate
+        """
+        return InstrumentedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name: str) -> InstrumentedTemplate:
+        """
+        Load a template by name.
+
+        :param template_name: The name of the template.
+        :type template_name: str
+        :return: The instrumented template.
+        :rtype: InstrumentedTemplate
+        :raises TemplateDoesNotExist: If the template cannot be found.
+        """
+        return InstrumentedTemplate(super().get_template(template_name).template, self)
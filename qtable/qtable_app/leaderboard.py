@@ -0,0 +1,82 @@
+"""
+This module ranks the quotes of the day by the number of users who favorited them, all-time and per month.
+
+Functions:
+    - cache_key(): Returns the cache key of a leaderboard.
+    - month_range(): Returns the bounds of a calendar month as aware datetimes.
+    - get_leaderboard(): Returns the most favorited quotes, all-time or of a month, from the cache or with one query.
+
+Usage:
+    LeaderboardView calls 'get_leaderboard()' for '/popular/' and 'get_leaderboard(date(2024, 1, 1))' for
+    '/popular/2024/1/'. The rows are plain dictionaries, so they are cheap to cache and to render.
+
+Note:
+    The ranking reads the denormalized 'QuoteOfDay.favorites_count' instead of counting the through table with a
+    GROUP BY. The all-time list is a scan of the 'qtable_app_quote_popular_idx' index stopped after the first rows,
+    and a month is a range of the 'qtable_app_quote_date_id_idx' index, at most one quote per day, sorted in memory.
+    Leaderboards are cached for LEADERBOARD_CACHE_TIMEOUT seconds and are not invalidated, so a new favorite shows up
+    after at most that delay. Quotes prefetched for the coming days are left out until their day.
+"""
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import QuoteOfDay, published
+
+SIZE = 20
+FIELDS = ('id', 'quote', 'author', 'date', 'favorites_count')
+
+
+def cache_key(month: date | None = None) -> str:
+    """
+    Return the cache key of a leaderboard.
+
+    :param month: Any day of the month of the leaderboard, or None for the all-time leaderboard. Defaults to None.
+    :type month: date | None, optional
+    :return: The cache key.
+    :rtype: str
+    """
+    return f'leaderboard:{month:%Y-%m}' if month else 'leaderboard:all'
+
+
+def month_range(month: date) -> tuple[datetime, datetime]:
+    """
+    Return the bounds of a calendar month in the current time zone.
+
+    :param month: Any day of the month.
+    :type month: date
+    :return: The start of the month and the start of the next month.
+    :rtype: tuple[datetime, datetime]
+    """
+    first = month.replace(day=1)
+    if first.month == 12:
+        following = first.replace(year=first.year + 1, month=1)
+    else:
+        following = first.replace(month=first.month + 1)
+    return (
+        timezone.make_aware(datetime.combine(first, time.min)),
+        timezone.make_aware(datetime.combine(following, time.min)),
+    )
+
+
+def get_leaderboard(month: date | None = None) -> list[dict]:
+    """
+    Return the most favorited quotes of the day, from the cache or with a single query.
+
+    :param month: Any day of the month to rank, or None to rank all quotes. Defaults to None.
+    :type month: date | None, optional
+    :return: The SIZE first quotes, as dictionaries of FIELDS, most favorited first.
+    :rtype: list[dict]
+    """
+    key = cache_key(month)
+    leaderboard = cache.get(key)
+    if leaderboard is None:
+        quotes = QuoteOfDay.objects.filter(published(), favorites_count__gt=0)
+        if month:
+            start, end = month_range(month)
+            quotes = quotes.filter(date__gte=start, date__lt=end)
+        leaderboard = list(quotes.order_by('-favorites_count', '-id').values(*FIELDS)[:SIZE])
+        cache.set(key, leaderboard, settings.LEADERBOARD_CACHE_TIMEOUT)
+    return leaderboard
@@ -0,0 +1,50 @@
+"""
+This module defines the 'prefetch_quote_of_day' management command, which creates upcoming quotes of the day.
+
+Classes:
+    - Command: Creates the quotes of today and of the following days, and warms their cache entries.
+
+Options:
+    - --days: The number of days after today to prefetch. Defaults to the QUOTE_OF_DAY_PREFETCH_DAYS setting.
+
+Usage:
+    Run 'python manage.py prefetch_quote_of_day' shortly before midnight (e.g. from cron), or enable the in-process
+    scheduler with the QUOTE_OF_DAY_SCHEDULER setting. Prefetching several days ahead means an upstream outage around
+    the rollover never reaches the home page.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from qtable_app.quote_of_day import prefetch_quotes_of_day
+
+
+class Command(BaseCommand):
+    """Create the quotes of the coming days ahead of time."""
+
+    help = 'Create the upcoming quotes of the day and warm the cache.'
+
+    def add_arguments(self, parser) -> None:
+        """
+        Register the command line options.
+
+        :param parser: The argument parser of the command.
+        :type parser: CommandParser
+        """
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.QUOTE_OF_DAY_PREFETCH_DAYS,
+            help='The number of days after today to prefetch.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        """
+        Prefetch the quotes of the coming days.
+
+        :param args: Positional arguments.
+        :type args: tuple
+        :param options: The parsed command line options.
+        :type options: dict
+        """
+        created = prefetch_quotes_of_day(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Prefetched {len(created)} quotes of the day.'))
@@ -0,0 +1,31 @@
+"""
+This module defines the 'reconcile_favorites_count' management command, which repairs the denormalized favorite counts.
+
+Classes:
+    - Command: Recounts the favorites of every quote whose 'favorites_count' differs from the favorites it has.
+
+Usage:
+    Run 'python manage.py reconcile_favorites_count' after bulk changes made outside of the application (raw SQL,
+    data imports), or periodically (e.g. daily from cron) as a safety net. It is cheap when nothing has drifted.
+"""
+from django.core.management.base import BaseCommand
+
+from qtable_app.favorites import reconcile_favorites_count
+
+
+class Command(BaseCommand):
+    """Recount the favorites of the quotes whose favorite count has drifted."""
+
+    help = 'Fix the favorite counts of the quotes of the day that differ from their favorites.'
+
+    def handle(self, *args, **options) -> None:
+        """
+        Recount the drifted favorite counts.
+
+        :param args: Positional arguments.
+        :type args: tuple
+        :param options: The parsed command line options.
+        :type options: dict
+        """
+        fixed = reconcile_favorites_count()
+        self.stdout.write(self.style.SUCCESS(f'Fixed the favorite count of {fixed} quotes.'))
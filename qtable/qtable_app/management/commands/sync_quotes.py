@@ -0,0 +1,94 @@
+"""
+This module defines the 'sync_quotes' management command, which mirrors the upstream quote corpus into the database.
+
+Classes:
+    - Command: Pulls quotes from 'https://api.quotable.io/quotes' page by page and upserts them into the Quote model.
+
+Options:
+    - --full: Walks every upstream page instead of stopping at the first page with no newer quotes.
+
+Usage:
+    Run 'python manage.py sync_quotes' periodically (e.g. from cron) to refresh the local mirror incrementally.
+    The first run, or a run with '--full', pulls the whole corpus.
+
+Note:
+    Upstream pages are requested in descending 'dateModified' order, so an incremental run can stop as soon as it
+    reaches quotes older than the newest one already stored. Pages are requested with the largest 'limit' the API
+    accepts, so a full run takes a fraction of the round-trips of the default page size. Every run bumps the mirror
+    version, which invalidates the ETags of the quote list pages.
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from qtable_app.http_cache import bump_quotes_version
+from qtable_app.models import Quote
+from qtable_app.quote_source import MAX_LIMITS, QUOTES, QuoteRequest, get_client
+
+
+class Command(BaseCommand):
+    """Mirror the upstream quote corpus into the local Quote model."""
+
+    help = 'Pull the upstream quote corpus into the local database.'
+    page_size = MAX_LIMITS[QUOTES]
+    update_fields = ('content', 'author', 'tags', 'date_modified', 'synced')
+
+    def add_arguments(self, parser) -> None:
+        """
+        Register the command line options.
+
+        :param parser: The argument parser of the command.
+        :type parser: CommandParser
+        """
+        parser.add_argument('--full', action='store_true', help='Pull every page, not only the changed ones.')
+
+    def handle(self, *args, **options) -> None:
+        """
+        Fetch upstream pages and upsert their quotes until the corpus is exhausted or no newer quotes are left.
+
+        :param args: Positional arguments.
+        :type args: tuple
+        :param options: The parsed command line options.
+        :type options: dict
+        """
+        since = None if options['full'] else Quote.objects.aggregate(latest=Max('date_modified'))['latest']
+        page, total_pages, synced = 1, 1, 0
+        client = get_client()
+        while page <= total_pages:
+            quote_request = QuoteRequest(QUOTES, page=page, limit=self.page_size, sort_by='dateModified', order='desc')
+            data = client.get_json(quote_request.endpoint, quote_request.params)
+            total_pages = data.get('totalPages', 0)
+            quotes = [self.to_quote(result) for result in data.get('results', [])]
+            if since:
+                quotes = [quote for quote in quotes if quote.date_modified >= since]
+            if not quotes:
+                break
+            Quote.objects.bulk_create(
+                quotes,
+                update_conflicts=True,
+                unique_fields=['external_id'],
+                update_fields=self.update_fields,
+            )
+            synced += len(quotes)
+            page += 1
+        bump_quotes_version()
+        self.stdout.write(self.style.SUCCESS(f'Synced {synced} quotes.'))
+
+    @staticmethod
+    def to_quote(result: dict) -> Quote:
+        """
+        Build an unsaved Quote from an upstream result.
+
+        :param result: A single quote from the 'results' list of an upstream page.
+        :type result: dict
+        :return: The unsaved Quote instance.
+        :rtype: Quote
+        """
+        return Quote(
+            external_id=result['_id'],
+            content=result.get('content', ''),
+            author=result.get('author', ''),
+            tags=result.get('tags', []),
+            date_modified=date.fromisoformat(result['dateModified']),
+        )
@@ -0,0 +1,230 @@
+"""
+This module contains the middleware of the 'qtable_app' application.
+
+Classes:
+    - InstrumentationMiddleware: Records the costs of every request, reports them in a 'Server-Timing' header and
+        enforces the query budgets of the views.
+    - StaticFilesMiddleware: Serves the collected static files with WhiteNoise, in both sync and async mode.
+
+Usage:
+    Add 'qtable_app.middleware.InstrumentationMiddleware' at the top of MIDDLEWARE, so the queries run by the session
+    and authentication middleware are counted too. A view declares its budget with a 'query_budget' class attribute.
+    Add 'qtable_app.middleware.StaticFilesMiddleware' right after SecurityMiddleware, so static files are answered
+    before the session and authentication middleware run.
+
+Note:
+    The middlewares work in both sync and async mode, so async views are not run in a thread because of them.
+    A view exceeding its budget is logged, or raises QueryBudgetExceeded when the QUERY_BUDGETS_STRICT setting is set,
+    which makes any test or CI run that requests the view fail.
+"""
+import logging
+from collections.abc import Callable
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.responders import StaticFile
+
+from .instrumentation import QueryBudgetExceeded, RequestMetrics, finish_request, registry, start_request
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentationMiddleware:
+    """Record the database, HTTP and rendering costs of every request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        """
+        Initialize the middleware.
+
+        :param get_response: The next middleware or the view.
+        :type get_response: Callable
+        """
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        """
+        Handle a request and record its metrics.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :return: The response, with a 'Server-Timing' header.
+        :rtype: HttpResponse
+        """
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = start_request()
+        request.metrics = metrics
+        try:
+            response = self.get_response(request)
+        finally:
+            finish_request(metrics, token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """
+        Handle a request asynchronously and record its metrics.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :return: The response, with a 'Server-Timing' header.
+        :rtype: HttpResponse
+        """
+        metrics, token = start_request()
+        request.metrics = metrics
+        try:
+            response = await self.get_response(request)
+        finally:
+            finish_request(metrics, token)
+        return self.finish(request, response, metrics)
+
+    def process_view(self, request: HttpRequest, view_func: Callable, view_args: tuple, view_kwargs: dict) -> None:
+        """
+        Remember the name and the query budget of the view handling the request.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :param view_func: The view function.
+        :type view_func: Callable
+        :param view_args: Positional arguments of the view.
+        :type view_args: tuple
+        :param view_kwargs: Keyword arguments of the view.
+        :type view_kwargs: dict
+        """
+        request.metrics.view_name = request.resolver_match.view_name
+        request.metrics.query_budget = getattr(getattr(view_func, 'view_class', view_func), 'query_budget', None)
+
+    def finish(self, request: HttpRequest, response: HttpResponse, metrics: RequestMetrics) -> HttpResponse:
+        """
+        Report the metrics of a request and check the query budget of its view.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :param response: The response of the view.
+        :type response: HttpResponse
+        :param metrics: The metrics of the request.
+        :type metrics: RequestMetrics
+        :return: The response, with a 'Server-Timing' header.
+        :rtype: HttpResponse
+        :raises QueryBudgetExceeded: If the view exceeded its query budget and QUERY_BUDGETS_STRICT is set.
+        """
+        registry.observe(request, response.status_code, metrics)
+        response.headers['Server-Timing'] = metrics.server_timing()
+        budget = metrics.query_budget
+        if budget is not None and metrics.counts['db'] > budget:
+            message = f'{metrics.view_name} ran {metrics.counts["db"]} queries, over its budget of {budget}'
+            if settings.QUERY_BUDGETS_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    Serve static files from STATIC_ROOT, with far-future cache headers for the hashed ones.
+
+    WhiteNoise's own middleware is sync only: under ASGI, Django would run every request after it, async views
+    included, through a thread. This subclass passes non-static requests straight to the next middleware in async
+    mode, and only reads the static file itself in a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        """
+        Initialize the middleware and index the files of STATIC_ROOT.
+
+        :param get_response: The next middleware or the view.
+        :type get_response: Callable
+        """
+        super().__init__(get_response)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        """
+        Serve the static file at the path of the request, or pass the request on.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :return: The static file, or the response of the next middleware.
+        :rtype: HttpResponse
+        """
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """
+        Serve the static file at the path of the request, or pass the request on, asynchronously.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :return: The static file, or the response of the next middleware.
+        :rtype: HttpResponse
+        """
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+        self.label(request)
+        return await sync_to_async(self.read, thread_sensitive=False)(static_file, request)
+
+    def serve(self, static_file: StaticFile, request: HttpRequest) -> HttpResponse:
+        """
+        Build the streamed response of a static file, in sync mode.
+
+        :param static_file: The static file.
+        :type static_file: StaticFile
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :return: The response, streaming the file or the variant negotiated from 'Accept-Encoding'.
+        :rtype: HttpResponse
+        """
+        self.label(request)
+        return super().serve(static_file, request)
+
+    def read(self, static_file: StaticFile, request: HttpRequest) -> HttpResponse:
+        """
+        Build the response of a static file with its content in memory.
+
+        Static files are small, and a response with a body avoids streaming a file object through sync iterators
+        under ASGI.
+
+        :param static_file: The static file.
+        :type static_file: StaticFile
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :return: The response, with the file or the variant negotiated from 'Accept-Encoding' as its body.
+        :rtype: HttpResponse
+        """
+        response = static_file.get_response(request.method, request.META)
+        content = b''
+        if response.file is not None:
+            with response.file:
+                content = response.file.read()
+        http_response = HttpResponse(content, status=int(response.status))
+        del http_response['Content-Type']
+        for header, value in response.headers:
+            http_response[header] = value
+        return http_response
+
+    @staticmethod
+    def label(request: HttpRequest) -> None:
+        """
+        Record static files under a single name in the request metrics, instead of as unresolved requests.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        """
+        if hasattr(request, 'metrics'):
+            request.metrics.view_name = 'static'
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-17 22:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qtable_app', '0002_quoteofday_updated_quoteofday_users'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Quote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.CharField(max_length=32, unique=True)),
+                ('content', models.TextField()),
+                ('author', models.CharField(max_length=255)),
+                ('tags', models.JSONField(default=list)),
+                ('date_modified', models.DateField(db_index=True)),
+                ('synced', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-17 22:15
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qtable_app', '0003_quote'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quoteofday',
+            name='date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.1 on 2026-10-17 22:20
+
+from django.db import migrations, models, transaction
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def backfill_day(apps, schema_editor):
+    """Fill 'day' from 'date' in batches; on duplicate days only the earliest row gets it."""
+    QuoteOfDay = apps.get_model('qtable_app', 'QuoteOfDay')
+    seen = set()
+    last_pk = 0
+    while True:
+        batch = list(QuoteOfDay.objects.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            break
+        changed = []
+        for quote in batch:
+            day = timezone.localtime(quote.date).date()
+            if day not in seen:
+                seen.add(day)
+                quote.day = day
+                changed.append(quote)
+        with transaction.atomic():
+            QuoteOfDay.objects.bulk_update(changed, ['day'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('qtable_app', '0004_quoteofday_date_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quoteofday',
+            name='day',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(backfill_day, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='quoteofday',
+            name='day',
+            field=models.DateField(null=True, unique=True),
+        ),
+    ]
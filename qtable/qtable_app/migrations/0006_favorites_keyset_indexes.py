@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-17 22:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qtable_app', '0005_quoteofday_day'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quoteofday',
+            index=models.Index(fields=['date', 'id'], name='qtable_app_quote_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.1 on 2026-10-17 22:20
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+FORWARD_SQL = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm;',
+    """
+    CREATE FUNCTION qtable_app_quoteofday_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.quote, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.author, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER qtable_app_quoteofday_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF quote, author ON qtable_app_quoteofday
+    FOR EACH ROW EXECUTE FUNCTION qtable_app_quoteofday_search_vector();
+    """,
+    'UPDATE qtable_app_quoteofday SET quote = quote;',
+    'CREATE INDEX qtable_app_quote_search_idx ON qtable_app_quoteofday USING gin (search_vector);',
+    'CREATE INDEX qtable_app_quote_author_trgm_idx ON qtable_app_quoteofday USING gin (author gin_trgm_ops);',
+)
+
+BACKWARD_SQL = (
+    'DROP INDEX IF EXISTS qtable_app_quote_author_trgm_idx;',
+    'DROP INDEX IF EXISTS qtable_app_quote_search_idx;',
+    'DROP TRIGGER IF EXISTS qtable_app_quoteofday_search_vector_trigger ON qtable_app_quoteofday;',
+    'DROP FUNCTION IF EXISTS qtable_app_quoteofday_search_vector();',
+)
+
+
+def run_on_postgresql(statements):
+    """Return a RunPython function executing the statements on PostgreSQL only; other backends fall back to LIKE."""
+
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for statement in statements:
+                schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qtable_app', '0006_favorites_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quoteofday',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(run_on_postgresql(FORWARD_SQL), run_on_postgresql(BACKWARD_SQL)),
+    ]
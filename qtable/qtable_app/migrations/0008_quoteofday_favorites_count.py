@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-17 22:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_favorites_count(apps, schema_editor):
+    """Count the favorites of every quote from the through table, in a single UPDATE."""
+    QuoteOfDay = apps.get_model('qtable_app', 'QuoteOfDay')
+    Favorite = QuoteOfDay.users.through
+    counts = Favorite.objects.filter(
+        quoteofday_id=OuterRef('pk'),
+    ).order_by().values('quoteofday_id').annotate(count=Count('pk')).values('count')
+    QuoteOfDay.objects.update(favorites_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qtable_app', '0007_quoteofday_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quoteofday',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_favorites_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='quoteofday',
+            index=models.Index(fields=['-favorites_count', '-id'], name='qtable_app_quote_popular_idx'),
+        ),
+    ]
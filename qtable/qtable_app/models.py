@@ -1,17 +1,32 @@
 """
-This module defines the QuoteOfDay model and its associated fields for storing daily quotes within the application.
+This module defines the models for storing daily quotes and the local mirror of the upstream quote corpus.
 
-Model:
+Models:
     - QuoteOfDay: Represents a daily quote with fields for quote content, author, creation date, last updated date,
         and user favorites.
+    - Quote: Represents a quote mirrored from the upstream API ('https://api.quotable.io/quotes'), so the quotes list
+        can be served from the database instead of the external API.
 
 Fields and Relationships:
     - quote: Represents the content of the daily quote.
     - author: Represents the author of the daily quote.
-    - date: Represents the creation date of the daily quote.
+    - date: Represents the date the daily quote is shown, which is the creation date unless it was prefetched.
+    - day: Represents the calendar day of the daily quote; unique and indexed, so the daily lookup is an index probe.
     - updated: Represents the last updated date of the daily quote.
     - users: Establishes a many-to-many relationship with the built-in User model, allowing users to mark quotes as
         favorites.
+    - search_vector: Represents the weighted full-text document of the daily quote (content, then author), kept up to
+        date by a PostgreSQL trigger and indexed with GIN.
+    - favorites_count: Represents the number of users who favorited the daily quote, maintained with 'F()' updates by
+        the favorite paths and indexed for the popularity leaderboard.
+    - external_id: Represents the upstream identifier of a mirrored quote, used to upsert it on every sync.
+    - content: Represents the content of a mirrored quote.
+    - tags: Represents the list of upstream tags of a mirrored quote.
+    - date_modified: Represents the upstream modification date of a mirrored quote, used for incremental refresh.
+    - synced: Represents the date a mirrored quote was last written by the sync command.
+
+Functions:
+    - published(): Returns the filter of the quotes of the day whose day has come.
 
 Usage:
     The module provides the QuoteOfDay model for storing daily quotes and facilitating user interactions such as marking
@@ -23,7 +38,20 @@ Note:
     daily quotes and user preferences effectively.
 """
 from django.contrib.auth.models import User
-from django.db.models import CharField, DateTimeField, ManyToManyField, Model, TextField
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import (
+    CharField,
+    DateField,
+    DateTimeField,
+    Index,
+    JSONField,
+    ManyToManyField,
+    Model,
+    PositiveIntegerField,
+    Q,
+    TextField,
+)
+from django.utils import timezone
 
 
 class QuoteOfDay(Model):
@@ -31,6 +59,38 @@ class QuoteOfDay(Model):
 
     quote = TextField()
     author = CharField(max_length=100)
-    date = DateTimeField(auto_now_add=True)
+    date = DateTimeField(default=timezone.now)
+    day = DateField(null=True, unique=True)
     updated = DateTimeField(auto_now=True)
     users = ManyToManyField(User, 'favorites')
+    search_vector = SearchVectorField(null=True, editable=False)
+    favorites_count = PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            Index(fields=['date', 'id'], name='qtable_app_quote_date_id_idx'),
+            Index(fields=['-favorites_count', '-id'], name='qtable_app_quote_popular_idx'),
+        ]
+
+
+def published() -> Q:
+    """
+    Return the filter of the quotes of the day whose day has come, excluding the ones prefetched for the coming days.
+
+    Legacy quotes created before the 'day' column have no day and are always published.
+
+    :return: The filter, for 'QuoteOfDay.objects.filter()'.
+    :rtype: Q
+    """
+    return Q(day__lte=timezone.localdate()) | Q(day__isnull=True)
+
+
+class Quote(Model):
+    """Represents a quote mirrored from the upstream quote corpus by the 'sync_quotes' management command."""
+
+    external_id = CharField(max_length=32, unique=True)
+    content = TextField()
+    author = CharField(max_length=255)
+    tags = JSONField(default=list)
+    date_modified = DateField(db_index=True)
+    synced = DateTimeField(auto_now=True)
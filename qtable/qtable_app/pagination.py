@@ -0,0 +1,188 @@
+"""
+This module provides keyset (cursor) pagination, so deep pages cost no more than the first one.
+
+Classes:
+    - CursorPage: A page of results with opaque cursors to the next and previous pages.
+    - KeysetPaginator: Paginates a queryset in descending order of a field and the primary key.
+
+Usage:
+    Build a paginator with the queryset and the page size, then call 'paginator.page(cursor)' with the 'cursor' GET
+    parameter. Templates link to '?cursor={{ page_obj.next_cursor }}' and '?cursor={{ page_obj.previous_cursor }}'.
+
+Note:
+    Unlike Django's Paginator there is no COUNT query and no OFFSET: each page is a single query starting at the
+    (field, pk) pair of the last row seen, which an index on (field, pk) answers with a range scan. That holds when
+    the queryset filters on the paginated table only. With a filter through a join, like the favorites of a user, the
+    database either walks the (field, pk) index and probes the join for each row until the page is full, so a page
+    costs its size divided by the share of rows that match, or joins and sorts every matching row: the cost follows
+    the density of the filter rather than the depth of the page. Cursors are signed, so they are opaque to clients
+    and cannot be tampered with; an invalid cursor falls back to the first page.
+"""
+from django.core import signing
+from django.db.models import Model, Q, QuerySet
+
+
+class CursorPage:
+    """A page of results with opaque cursors to its neighbours."""
+
+    def __init__(self, object_list: list, next_cursor: str | None, previous_cursor: str | None) -> None:
+        """
+        Initialize the page.
+
+        :param object_list: The objects of the page, in display order.
+        :type object_list: list
+        :param next_cursor: The cursor of the next page, or None if this is the last page.
+        :type next_cursor: str | None
+        :param previous_cursor: The cursor of the previous page, or None if this is the first page.
+        :type previous_cursor: str | None
+        """
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        """
+        Iterate over the objects of the page.
+
+        :return: An iterator over the objects.
+        :rtype: Iterator
+        """
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        """
+        Return the number of objects on the page.
+
+        :return: The number of objects.
+        :rtype: int
+        """
+        return len(self.object_list)
+
+    @property
+    def has_next(self) -> bool:
+        """
+        Check whether there is a next page.
+
+        :return: True if there is a next page.
+        :rtype: bool
+        """
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        """
+        Check whether there is a previous page.
+
+        :return: True if there is a previous page.
+        :rtype: bool
+        """
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self) -> bool:
+        """
+        Check whether there is a next or a previous page.
+
+        :return: True if there is another page.
+        :rtype: bool
+        """
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """Paginate a queryset in descending (field, pk) order using signed cursors."""
+
+    salt = 'qtable_app.pagination'
+
+    def __init__(self, queryset: QuerySet, per_page: int, field: str = 'date') -> None:
+        """
+        Initialize the paginator.
+
+        :param queryset: The queryset to paginate; its ordering is replaced.
+        :type queryset: QuerySet
+        :param per_page: The number of objects per page.
+        :type per_page: int
+        :param field: The field to order by, with the primary key as a tiebreaker. Defaults to 'date'.
+        :type field: str
+        """
+        self.queryset = queryset
+        self.per_page = per_page
+        self.field = field
+
+    def page(self, cursor: str | None = None) -> CursorPage:
+        """
+        Return the page a cursor points to.
+
+        :param cursor: A cursor from a previous page, or None for the first page.
+        :type cursor: str | None
+        :return: The page.
+        :rtype: CursorPage
+        """
+        position = self.decode(cursor)
+        if position is None:
+            rows = list(self.queryset.order_by(f'-{self.field}', '-pk')[:self.per_page + 1])
+            return self.forward_page(rows, has_previous=False)
+        value, pk, direction = position
+        if direction == 'next':
+            after = Q(**{f'{self.field}__lte': value}) & ~Q(**{self.field: value, 'pk__gte': pk})
+            rows = list(self.queryset.filter(after).order_by(f'-{self.field}', '-pk')[:self.per_page + 1])
+            return self.forward_page(rows, has_previous=True)
+        before = Q(**{f'{self.field}__gte': value}) & ~Q(**{self.field: value, 'pk__lte': pk})
+        rows = list(self.queryset.filter(before).order_by(self.field, 'pk')[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return CursorPage(
+            rows,
+            self.encode(rows[-1], 'next') if rows else None,
+            self.encode(rows[0], 'previous') if has_previous else None,
+        )
+
+    def forward_page(self, rows: list, has_previous: bool) -> CursorPage:
+        """
+        Build a page from rows read in display order, with one extra row that signals a next page.
+
+        :param rows: The rows read, at most one more than the page size.
+        :type rows: list
+        :param has_previous: Whether a previous page exists.
+        :type has_previous: bool
+        :return: The page.
+        :rtype: CursorPage
+        """
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            rows,
+            self.encode(rows[-1], 'next') if has_next else None,
+            self.encode(rows[0], 'previous') if has_previous and rows else None,
+        )
+
+    def encode(self, row: Model, direction: str) -> str:
+        """
+        Build the signed cursor of a row.
+
+        :param row: The row the next or previous page starts after.
+        :type row: Model
+        :param direction: Either 'next' or 'previous'.
+        :type direction: str
+        :return: The opaque cursor.
+        :rtype: str
+        """
+        value = self.queryset.model._meta.get_field(self.field).value_to_string(row)
+        return signing.dumps([value, row.pk, direction], salt=self.salt, compress=True)
+
+    def decode(self, cursor: str | None) -> tuple | None:
+        """
+        Read the position stored in a cursor.
+
+        :param cursor: The cursor to read.
+        :type cursor: str | None
+        :return: The field value, the primary key and the direction, or None if the cursor is missing or invalid.
+        :rtype: tuple | None
+        """
+        if not cursor:
+            return None
+        try:
+            value, pk, direction = signing.loads(cursor, salt=self.salt)
+        except (signing.BadSignature, TypeError, ValueError):
+            return None
+        return self.queryset.model._meta.get_field(self.field).to_python(value), pk, direction
@@ -0,0 +1,226 @@
+"""
+This module resolves the quote of the day exactly once per day and serves it from Django's cache framework.
+
+Functions:
+    - cache_key(): Returns the cache key of the quote of a given day.
+    - seconds_until_rollover(): Returns the number of seconds until the end of a given day.
+    - aget_quote_of_day(): Returns the quote of the current day, creating it from the external API if needed.
+    - prefetch_quotes_of_day(): Creates the quotes of the coming days ahead of time and warms their cache entries.
+    - fetch_random_quotes(): Fetches a batch of random quotes from the external API, or from the local quote mirror
+        while the API is unavailable.
+
+Usage:
+    IndexView calls 'await aget_quote_of_day(fetch)', where 'fetch' is a coroutine returning a quote from the external
+    API. In the steady state the quote is a cache hit and the home page does no database query for it.
+    The 'prefetch_quote_of_day' management command and the optional scheduler call 'prefetch_quotes_of_day(days)', so
+    the quote of a new day already exists and is cached before the rollover.
+
+Note:
+    Resolution is coalesced at two levels. Inside a process, concurrent requests for the same day await a single task.
+    Across workers, the process holding the 'quote-of-day:<day>:lock' cache lock fetches the quote upstream, while the
+    others poll the cache and the database until it appears. The unique 'QuoteOfDay.day' column guarantees a single
+    row per day even when the cache backend, and therefore the lock, is not shared between workers.
+"""
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from datetime import date, datetime, time, timedelta
+from weakref import WeakKeyDictionary
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Quote, QuoteOfDay
+from .quote_source import MAX_LIMITS, RANDOM_QUOTES, QuoteRequest, QuoteSourceError, get_client
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = 30
+POLL_INTERVAL = 0.1
+
+_inflight = WeakKeyDictionary()
+
+
+def cache_key(day: date) -> str:
+    """
+    Return the cache key of the quote of a day.
+
+    :param day: The day of the quote.
+    :type day: date
+    :return: The cache key.
+    :rtype: str
+    """
+    return f'quote-of-day:{day.isoformat()}'
+
+
+def lock_key(day: date) -> str:
+    """
+    Return the cache key of the lock held while the quote of a day is created.
+
+    :param day: The day of the quote.
+    :type day: date
+    :return: The cache key.
+    :rtype: str
+    """
+    return f'{cache_key(day)}:lock'
+
+
+def seconds_until_rollover(day: date) -> int:
+    """
+    Return the number of seconds until the end of a day in the current time zone.
+
+    :param day: The day whose end is computed.
+    :type day: date
+    :return: The number of seconds, at least 1.
+    :rtype: int
+    """
+    rollover = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    return max(int((rollover - timezone.now()).total_seconds()), 1)
+
+
+async def aget_quote_of_day(fetch: Callable[[], Awaitable[dict]]) -> QuoteOfDay:
+    """
+    Return the quote of the current day from the cache, resolving it once if it is missing.
+
+    :param fetch: A coroutine function returning a quote from the external API as a dict with 'content' and 'author'.
+    :type fetch: Callable[[], Awaitable[dict]]
+    :return: The quote of the day.
+    :rtype: QuoteOfDay
+    """
+    day = timezone.localdate()
+    quote = await cache.aget(cache_key(day))
+    if quote is not None:
+        return quote
+    tasks = _inflight.setdefault(asyncio.get_running_loop(), {})
+    if day not in tasks:
+        tasks[day] = asyncio.create_task(_resolve(day, fetch))
+        tasks[day].add_done_callback(lambda _: tasks.pop(day, None))
+    return await asyncio.shield(tasks[day])
+
+
+async def _resolve(day: date, fetch: Callable[[], Awaitable[dict]]) -> QuoteOfDay:
+    """
+    Load the quote of a day from the database, or create it while holding the cross-worker lock.
+
+    :param day: The day of the quote.
+    :type day: date
+    :param fetch: A coroutine function returning a quote from the external API.
+    :type fetch: Callable[[], Awaitable[dict]]
+    :return: The quote of the day.
+    :rtype: QuoteOfDay
+    """
+    while True:  # noqa: WPS457
+        quote = await _lookup(day)
+        if quote is not None:
+            return quote
+        if await cache.aadd(lock_key(day), 1, LOCK_TIMEOUT):
+            try:
+                return await _create(day, fetch)
+            finally:
+                await cache.adelete(lock_key(day))
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def _lookup(day: date) -> QuoteOfDay | None:
+    """
+    Look the quote of a day up in the cache, then in the database, caching a database hit.
+
+    :param day: The day of the quote.
+    :type day: date
+    :return: The quote of the day, or None if it does not exist yet.
+    :rtype: QuoteOfDay | None
+    """
+    quote = await cache.aget(cache_key(day))
+    if quote is None:
+        quote = await QuoteOfDay.objects.filter(day=day).afirst()
+        if quote is not None:
+            await cache.aset(cache_key(day), quote, seconds_until_rollover(day))
+    return quote
+
+
+async def _create(day: date, fetch: Callable[[], Awaitable[dict]]) -> QuoteOfDay:
+    """
+    Create the quote of a day from the external API, unless another worker created it first.
+
+    :param day: The day of the quote.
+    :type day: date
+    :param fetch: A coroutine function returning a quote from the external API.
+    :type fetch: Callable[[], Awaitable[dict]]
+    :return: The quote of the day.
+    :rtype: QuoteOfDay
+    """
+    quote = await QuoteOfDay.objects.filter(day=day).afirst()
+    if quote is None:
+        response = await fetch()
+        quote, created = await QuoteOfDay.objects.aget_or_create(
+            day=day,
+            defaults={'quote': response.get('content'), 'author': response.get('author')},
+        )
+        if created:
+            logger.info('Created the quote of the day for %s', day)
+    await cache.aset(cache_key(day), quote, seconds_until_rollover(day))
+    return quote
+
+
+def prefetch_quotes_of_day(days: int) -> list[QuoteOfDay]:
+    """
+    Make sure the quotes of today and of the following days exist, and cache each one until its day is over.
+
+    The missing quotes are fetched in a single batch. Days whose lock is held by another worker are skipped.
+
+    :param days: The number of days after today to prefetch.
+    :type days: int
+    :return: The quotes created by this call.
+    :rtype: list[QuoteOfDay]
+    """
+    today = timezone.localdate()
+    wanted = [today + timedelta(days=offset) for offset in range(days + 1)]
+    existing = {quote.day: quote for quote in QuoteOfDay.objects.filter(day__in=wanted)}
+    for day, quote in existing.items():
+        cache.set(cache_key(day), quote, seconds_until_rollover(day))
+    locked = [day for day in wanted if day not in existing and cache.add(lock_key(day), 1, LOCK_TIMEOUT)]
+    created = []
+    try:
+        for day, response in zip(locked, fetch_random_quotes(len(locked))):
+            quote, is_new = QuoteOfDay.objects.get_or_create(
+                day=day,
+                defaults={
+                    'quote': response.get('content'),
+                    'author': response.get('author'),
+                    'date': timezone.make_aware(datetime.combine(day, time.min)),
+                },
+            )
+            cache.set(cache_key(day), quote, seconds_until_rollover(day))
+            if is_new:
+                created.append(quote)
+                logger.info('Prefetched the quote of the day for %s', day)
+    finally:
+        cache.delete_many([lock_key(day) for day in locked])
+    return created
+
+
+def fetch_random_quotes(limit: int) -> list[dict]:
+    """
+    Fetch random quotes from the external API, falling back to the local quote mirror if it is unavailable.
+
+    The quotes are requested in batches of the largest size the external API accepts.
+
+    :param limit: The number of quotes to fetch.
+    :type limit: int
+    :return: The quotes, as dicts with the 'content' and 'author' keys.
+    :rtype: list[dict]
+    """
+    if not limit:
+        return []
+    try:
+        quotes = []
+        while len(quotes) < limit:
+            quote_request = QuoteRequest(RANDOM_QUOTES, limit=min(limit - len(quotes), MAX_LIMITS[RANDOM_QUOTES]))
+            batch = get_client().get_json(quote_request.endpoint, quote_request.params)
+            if not batch:
+                break
+            quotes += batch
+        return quotes
+    except QuoteSourceError:
+        logger.warning('Quote source is unavailable, prefetching from the local quote mirror')
+        return list(Quote.objects.order_by('?').values('content', 'author')[:limit])
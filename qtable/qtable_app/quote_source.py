@@ -0,0 +1,858 @@
+"""
+This module provides the shared HTTP client used to fetch quotes from the external API ('https://api.quotable.io/').
+
+Classes:
+    - QuoteSourceError: Raised when the external API is unavailable or answers with an error, and no stale copy of
+        the response is cached.
+    - QuoteRequest: A request to the external API, with typed query parameters, a canonical URL and a
+        cache key.
+    - CircuitBreaker: Tracks consecutive upstream failures and short-circuits requests while the API is down.
+    - QuoteSourceClient: Wraps process-wide pooled 'httpx.Client' and 'httpx.AsyncClient' instances with timeouts,
+        bounded retries with jitter, the circuit breaker, a response cache and a stale-response fallback, and runs
+        the async requests and background refreshes on an event loop of its own.
+
+Functions:
+    - canonical_url(): Returns the URL of a request with its query parameters sorted and the empty ones dropped.
+    - get_client(): Returns the process-wide QuoteSourceClient, creating it from the settings on first use and closing
+        it when the process exits.
+
+Settings:
+    - QUOTE_SOURCE_BASE_URL: The origin of the external API, which benchmarks point at a local stand-in.
+    - QUOTE_SOURCE_CONNECT_TIMEOUT / QUOTE_SOURCE_READ_TIMEOUT: Connect and read timeouts, in seconds.
+    - QUOTE_SOURCE_MAX_CONNECTIONS / QUOTE_SOURCE_MAX_KEEPALIVE: Size of the connection pool.
+    - QUOTE_SOURCE_RETRIES / QUOTE_SOURCE_BACKOFF: Number of retries and base backoff delay, in seconds. Retries stop
+        once the next one would start later than the read timeout after the first attempt.
+    - QUOTE_SOURCE_BREAKER_THRESHOLD / QUOTE_SOURCE_BREAKER_RESET: Failures that open the circuit, and seconds after
+        which a trial request is let through.
+    - QUOTE_SOURCE_STALE_TTL: How long, in seconds, the last good response of every URL is kept as a fallback.
+    - QUOTE_SOURCE_CACHE_TTL / QUOTE_SOURCE_REVALIDATE_TTL: How long, in seconds, a cached response is served as fresh,
+        and for how long after that it is still served while being refreshed in the background.
+
+Usage:
+    Callers describe what they need as a QuoteRequest, e.g. 'QuoteRequest(QUOTES, page=2, limit=50)', and pass its
+    'endpoint' and 'params' to 'get_client().get_json()' (or 'await get_client().aget_json()') instead of calling
+    'httpx.get(url)', so every request reuses pooled keep-alive connections and degrades to the last good response
+    while upstream fails. Responses that change rarely, like the pages of the quote list, go through
+    'aget_cached_json()' instead, and 'prefetch()' warms the cache with a page the user is likely to open next.
+    Every HTTP attempt is recorded as an 'http' operation of the current request. Views catch QuoteSourceError, which
+    is only raised when there is nothing to fall back to.
+
+Note:
+    An 'httpx.AsyncClient' is bound to the event loop it was created in, and the loop of a request does not always
+    outlive it: asgiref runs async views in a new loop per request under a WSGI server or the test client. The client
+    therefore owns a loop, run forever by a daemon thread, with the only async client of the process on it. Requests
+    await their fetches on it across threads, and background refreshes run there as tasks that survive the request.
+    Upstream errors that are not retried (4xx responses, invalid JSON) count as failures of the circuit breaker and
+    fall back to the stale response like network errors do.
+    Every good response is cached with the time it was fetched, which gives the response cache (fresh, then
+    stale-while-revalidate) and the stale-if-error fallback a single entry per URL. Background refreshes are
+    coalesced per URL and run outside of the request that triggered them.
+    Cache keys are built from the canonical URL, so requests asking for the same document with differently ordered
+    parameters, or spelling out an upstream default like 'page=1', share a single cache entry.
+    The counters are updated under a lock, since requests of several threads and of the loop of the client run at
+    once. The pool usage reported by 'stats()' is counted by the client around every request rather than read from
+    the private state of httpx, which has no public API for it.
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import contextlib
+import contextvars
+import hashlib
+import logging
+import random
+import threading
+import time
+from collections.abc import Coroutine, Iterable, Iterator
+
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+
+from .instrumentation import track
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+
+QUOTES = '/quotes'
+RANDOM_QUOTES = '/quotes/random'
+ENDPOINT_DEFAULTS = {
+    QUOTES: {'page': 1, 'limit': 20},
+    RANDOM_QUOTES: {'limit': 1},
+}
+MAX_LIMITS = {QUOTES: 150, RANDOM_QUOTES: 50}
+SORT_FIELDS = frozenset(('dateAdded', 'dateModified', 'author', 'content'))
+ORDERS = frozenset(('asc', 'desc'))
+CLOSE_TIMEOUT = 5
+
+
+class QuoteSourceError(Exception):
+    """Raised when the external API fails or answers with an error, and there is no stale response to fall back to."""
+
+
+def canonical_url(url: str, params: dict = None) -> str:
+    """
+    Build the canonical form of a request URL, with the query parameters sorted by name and the empty ones dropped.
+
+    :param url: The requested URL, without a query string.
+    :type url: str
+    :param params: The query parameters of the request. Defaults to None.
+    :type params: dict, optional
+    :return: The canonical URL.
+    :rtype: str
+    """
+    query = sorted((name, str(value)) for name, value in (params or {}).items() if value is not None)
+    return str(httpx.URL(url, params=query))
+
+
+class QuoteRequest:
+    """A request to the external API, built from typed query parameters and never modified once built."""
+
+    fields = ('path', 'page', 'limit', 'author', 'tags', 'sort_by', 'order')
+
+    def __init__(
+        self,
+        path: str,
+        page: int = None,
+        limit: int = None,
+        author: str = None,
+        tags: Iterable[str] = (),
+        sort_by: str = None,
+        order: str = None,
+    ) -> None:
+        """
+        Initialize and validate the request.
+
+        :param path: The endpoint, QUOTES or RANDOM_QUOTES.
+        :type path: str
+        :param page: The page number, for QUOTES. Defaults to the first page.
+        :type page: int, optional
+        :param limit: The number of quotes per page, or of random quotes. Defaults to the upstream default.
+        :type limit: int, optional
+        :param author: The name or slug of the author, or several separated by '|'. Defaults to None.
+        :type author: str, optional
+        :param tags: Tags the quotes must all have. Defaults to none.
+        :type tags: Iterable[str]
+        :param sort_by: The field to sort by, one of SORT_FIELDS, for QUOTES. Defaults to None.
+        :type sort_by: str, optional
+        :param order: The sort order, 'asc' or 'desc', for QUOTES. Defaults to None.
+        :type order: str, optional
+        :raises ValueError: If the endpoint is unknown or a parameter is out of range.
+        """
+        if path not in ENDPOINT_DEFAULTS:
+            raise ValueError(f'Unknown quote source endpoint: {path}')
+        if page is not None and (path != QUOTES or page < 1):
+            raise ValueError(f'Invalid page for {path}: {page}')
+        if limit is not None and not 1 <= limit <= MAX_LIMITS[path]:
+            raise ValueError(f'The limit of {path} must be between 1 and {MAX_LIMITS[path]}, not {limit}')
+        if sort_by is not None and (path != QUOTES or sort_by not in SORT_FIELDS):
+            raise ValueError(f'Invalid sort field for {path}: {sort_by}')
+        if order is not None and (path != QUOTES or order not in ORDERS):
+            raise ValueError(f'Invalid sort order for {path}: {order}')
+        self.path = path
+        self.page = page
+        self.limit = limit
+        self.author = (author.strip() or None) if author else None
+        self.tags = tuple(sorted({tag.strip() for tag in tags if tag.strip()}))
+        self.sort_by = sort_by
+        self.order = order
+
+    def __repr__(self) -> str:
+        """
+        Return a representation of the request.
+
+        :return: The representation, with the canonical URL.
+        :rtype: str
+        """
+        return f'<QuoteRequest {self.url}>'
+
+    @property
+    def endpoint(self) -> str:
+        """
+        Return the URL of the endpoint, on the configured origin of the external API.
+
+        :return: The URL, without a query string.
+        :rtype: str
+        """
+        return f'{settings.QUOTE_SOURCE_BASE_URL}{self.path}'
+
+    @property
+    def params(self) -> dict:
+        """
+        Return the query parameters sent upstream, leaving out the unset ones and the upstream defaults.
+
+        :return: The query parameters, sorted by name.
+        :rtype: dict
+        """
+        params = {
+            'author': self.author,
+            'limit': self.limit,
+            'order': self.order,
+            'page': self.page,
+            'sortBy': self.sort_by,
+            'tags': ','.join(self.tags) or None,
+        }
+        defaults = ENDPOINT_DEFAULTS[self.path]
+        return {name: value for name, value in params.items() if value is not None and value != defaults.get(name)}
+
+    @property
+    def url(self) -> str:
+        """
+        Return the canonical URL of the request.
+
+        :return: The URL, with the query string.
+        :rtype: str
+        """
+        return canonical_url(self.endpoint, self.params)
+
+    @property
+    def cacheable(self) -> bool:
+        """
+        Check whether the response may be served from the response cache, which random quotes may not.
+
+        :return: True if the response is the same for every request.
+        :rtype: bool
+        """
+        return self.path != RANDOM_QUOTES
+
+    @property
+    def cache_key(self) -> str:
+        """
+        Return the cache key of the response.
+
+        :return: The cache key, shared by every request for the same document.
+        :rtype: str
+        """
+        return QuoteSourceClient.stale_key(self.endpoint, self.params)
+
+    def replace(self, **changes) -> 'QuoteRequest':
+        """
+        Return a copy of the request with some parameters changed.
+
+        :param changes: The parameters to change, as keyword arguments of the constructor.
+        :type changes: dict
+        :return: The new request.
+        :rtype: QuoteRequest
+        """
+        return QuoteRequest(**{name: getattr(self, name) for name in self.fields} | changes)
+
+    def next_page(self) -> 'QuoteRequest':
+        """
+        Return the request of the next page.
+
+        :return: The new request.
+        :rtype: QuoteRequest
+        """
+        return self.replace(page=(self.page or 1) + 1)
+
+
+class CircuitBreaker:
+    """A thread-safe circuit breaker that opens after a number of consecutive failures."""
+
+    closed = 'closed'
+    open = 'open'
+    half_open = 'half-open'
+
+    def __init__(self, threshold: int, reset_timeout: float) -> None:
+        """
+        Initialize the breaker in the closed state.
+
+        :param threshold: The number of consecutive failures that opens the circuit.
+        :type threshold: int
+        :param reset_timeout: The number of seconds after which an open circuit lets a trial request through.
+        :type reset_timeout: float
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        Return the current state of the breaker.
+
+        :return: One of 'closed', 'open' or 'half-open'.
+        :rtype: str
+        """
+        if self.opened_at is None:
+            return self.closed
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.half_open
+        return self.open
+
+    def allow(self) -> bool:
+        """
+        Check whether a request may be sent upstream.
+
+        A half-open breaker lets a single trial request through and re-arms the timeout for the others.
+
+        :return: True if the request may be sent.
+        :rtype: bool
+        """
+        with self._lock:
+            state = self.state
+            if state == self.half_open:
+                self.opened_at = time.monotonic()
+            return state != self.open
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful request."""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        """Count a failed request and open the circuit once the threshold is reached."""
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        """
+        Read the state and the failure count of the breaker together.
+
+        :return: A dictionary with the 'state' and the 'failures' count.
+        :rtype: dict
+        """
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures}
+
+
+class QuoteSourceClient:
+    """A pooled client for the external quote API with retries, a circuit breaker and a stale-response fallback."""
+
+    stale_key_prefix = 'quote-source:response'
+
+    def __init__(
+        self,
+        timeout: httpx.Timeout,
+        limits: httpx.Limits,
+        retries: int,
+        backoff: float,
+        breaker: CircuitBreaker,
+        stale_ttl: int,
+        cache_ttl: int = 0,
+        revalidate_ttl: int = 0,
+        transport: httpx.BaseTransport | httpx.AsyncBaseTransport = None,
+    ) -> None:
+        """
+        Initialize the client; the underlying HTTP clients are created lazily.
+
+        :param timeout: The timeouts applied to every request.
+        :type timeout: httpx.Timeout
+        :param limits: The connection pool limits.
+        :type limits: httpx.Limits
+        :param retries: The number of retries after a failed attempt.
+        :type retries: int
+        :param backoff: The base delay of the exponential backoff, in seconds.
+        :type backoff: float
+        :param breaker: The circuit breaker shared by the sync and async clients.
+        :type breaker: CircuitBreaker
+        :param stale_ttl: How long the last good response of a URL is kept, in seconds.
+        :type stale_ttl: int
+        :param cache_ttl: How long a cached response is fresh, in seconds. Defaults to 0.
+        :type cache_ttl: int
+        :param revalidate_ttl: How long a response is served after it expired while it is refreshed, in seconds.
+            Defaults to 0.
+        :type revalidate_ttl: int
+        :param transport: The transport of both HTTP clients, e.g. an 'httpx.MockTransport' in tests. Defaults to the
+            network.
+        :type transport: httpx.BaseTransport | httpx.AsyncBaseTransport, optional
+        """
+        self.timeout = timeout
+        self.limits = limits
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker
+        self.stale_ttl = max(stale_ttl, cache_ttl + revalidate_ttl)
+        self.cache_ttl = cache_ttl
+        self.revalidate_ttl = revalidate_ttl
+        self.transport = transport
+        self.counters = {
+            'requests': 0,
+            'retries': 0,
+            'failures': 0,
+            'stale_served': 0,
+            'short_circuited': 0,
+            'cache_hits': 0,
+            'revalidations': 0,
+            'prefetches': 0,
+        }
+        self.in_flight = {'sync': 0, 'async': 0}
+        self.peak_in_flight = {'sync': 0, 'async': 0}
+        self._counters_lock = threading.Lock()
+        self._background = {}
+        self._client = None
+        self._async_client = None
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> 'QuoteSourceClient':
+        """
+        Create a client configured from the QUOTE_SOURCE_* settings.
+
+        :return: The configured client.
+        :rtype: QuoteSourceClient
+        """
+        return cls(
+            timeout=httpx.Timeout(
+                settings.QUOTE_SOURCE_READ_TIMEOUT,
+                connect=settings.QUOTE_SOURCE_CONNECT_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.QUOTE_SOURCE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.QUOTE_SOURCE_MAX_KEEPALIVE,
+            ),
+            retries=settings.QUOTE_SOURCE_RETRIES,
+            backoff=settings.QUOTE_SOURCE_BACKOFF,
+            breaker=CircuitBreaker(settings.QUOTE_SOURCE_BREAKER_THRESHOLD, settings.QUOTE_SOURCE_BREAKER_RESET),
+            stale_ttl=settings.QUOTE_SOURCE_STALE_TTL,
+            cache_ttl=settings.QUOTE_SOURCE_CACHE_TTL,
+            revalidate_ttl=settings.QUOTE_SOURCE_REVALIDATE_TTL,
+        )
+
+    @property
+    def client(self) -> httpx.Client:
+        """
+        Return the pooled sync client, creating it on first use.
+
+        :return: The sync HTTP client.
+        :rtype: httpx.Client
+        """
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(timeout=self.timeout, limits=self.limits, transport=self.transport)
+            return self._client
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Return the event loop of the async client, starting it in a daemon thread on first use.
+
+        :return: The event loop.
+        :rtype: asyncio.AbstractEventLoop
+        """
+        with self._lock:
+            self._start_loop()
+            return self._loop
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        Return the pooled async client, creating it on first use; it may only be used on 'loop'.
+
+        :return: The async HTTP client.
+        :rtype: httpx.AsyncClient
+        """
+        with self._lock:
+            self._start_loop()
+            return self._async_client
+
+    def _start_loop(self) -> None:
+        """Create the event loop and the async client and run the loop in a daemon thread, unless it is running."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._async_client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, transport=self.transport)
+            self._thread = threading.Thread(target=self._loop.run_forever, name='quote-source', daemon=True)
+            self._thread.start()
+
+    async def asend(self, url: str, params: dict = None) -> httpx.Response:
+        """
+        Send a GET request with the async client, on the loop of the client.
+
+        :param url: The URL to fetch.
+        :type url: str
+        :param params: The query parameters of the request. Defaults to None.
+        :type params: dict, optional
+        :return: The response, with its body read.
+        :rtype: httpx.Response
+        """
+        coroutine = self.async_client.get(url, params=params)
+        if asyncio.get_running_loop() is self.loop:
+            return await coroutine
+        return await asyncio.wrap_future(self.submit(coroutine))
+
+    def submit(self, coroutine: Coroutine) -> concurrent.futures.Future:
+        """
+        Run a coroutine on the loop of the client, from any thread.
+
+        The coroutine runs in an empty context, since the context of a request holds its metrics and the executor that
+        asgiref runs its sync code in, which other loops must not use.
+
+        :param coroutine: The coroutine to run.
+        :type coroutine: Coroutine
+        :return: A future of the result of the coroutine.
+        :rtype: concurrent.futures.Future
+        """
+        return contextvars.Context().run(asyncio.run_coroutine_threadsafe, coroutine, self.loop)
+
+    def close(self) -> None:
+        """Cancel the background fetches, close the HTTP clients and stop the loop of the async client."""
+        with self._lock:
+            client, self._client = self._client, None
+            async_client, self._async_client = self._async_client, None
+            loop, self._loop = self._loop, None
+            thread, self._thread = self._thread, None
+            background, self._background = list(self._background.values()), {}
+        if client is not None:
+            client.close()
+        if loop is None:
+            return
+        for future in background:
+            future.cancel()
+        asyncio.run_coroutine_threadsafe(async_client.aclose(), loop).result(CLOSE_TIMEOUT)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(CLOSE_TIMEOUT)
+        if not thread.is_alive():
+            loop.close()
+
+    def get_json(self, url: str, params: dict = None) -> dict | list:
+        """
+        Fetch a JSON document from the external API.
+
+        Failed attempts are retried with backoff until the read timeout has passed since the first one, so a request
+        thread is never held for more than the read timeout plus the duration of the last attempt.
+
+        :param url: The URL to fetch.
+        :type url: str
+        :param params: The query parameters of the request. Defaults to None.
+        :type params: dict, optional
+        :return: The decoded JSON response, or the last good response if the external API is unavailable.
+        :rtype: dict | list
+        :raises QuoteSourceError: If the external API is unavailable and no stale response is cached.
+        """
+        key = self.stale_key(url, params)
+        if not self.breaker.allow():
+            self.count('short_circuited')
+            return self.serve_stale(key, cache.get(key), url)
+        deadline = time.monotonic() + self.timeout.read
+        for attempt in range(self.retries + 1):
+            self.count('requests')
+            try:
+                with track('http'), self.sending('sync'):
+                    response = self.client.get(url, params=params)
+            except httpx.TransportError as error:
+                logger.warning('Quote source request to %s failed: %r', url, error)
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    try:
+                        return self.handle_response(key, response)
+                    except QuoteSourceError as error:
+                        logger.warning('%s', error)
+                        break
+                logger.warning('Quote source request to %s returned %s', url, response.status_code)
+            delay = self.delay(attempt)
+            if attempt == self.retries or time.monotonic() + delay >= deadline:
+                break
+            self.count('retries')
+            time.sleep(delay)
+        self.record_failure()
+        return self.serve_stale(key, cache.get(key), url)
+
+    async def aget_json(self, url: str, params: dict = None) -> dict | list:
+        """
+        Fetch a JSON document from the external API without blocking the event loop.
+
+        Failed attempts are retried within the same deadline as 'get_json()'.
+
+        :param url: The URL to fetch.
+        :type url: str
+        :param params: The query parameters of the request. Defaults to None.
+        :type params: dict, optional
+        :return: The decoded JSON response, or the last good response if the external API is unavailable.
+        :rtype: dict | list
+        :raises QuoteSourceError: If the external API is unavailable and no stale response is cached.
+        """
+        key = self.stale_key(url, params)
+        if not self.breaker.allow():
+            self.count('short_circuited')
+            return self.serve_stale(key, await cache.aget(key), url)
+        deadline = time.monotonic() + self.timeout.read
+        for attempt in range(self.retries + 1):
+            self.count('requests')
+            try:
+                with track('http'), self.sending('async'):
+                    response = await self.asend(url, params)
+            except httpx.TransportError as error:
+                logger.warning('Quote source request to %s failed: %r', url, error)
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    try:
+                        return await self.ahandle_response(key, response)
+                    except QuoteSourceError as error:
+                        logger.warning('%s', error)
+                        break
+                logger.warning('Quote source request to %s returned %s', url, response.status_code)
+            delay = self.delay(attempt)
+            if attempt == self.retries or time.monotonic() + delay >= deadline:
+                break
+            self.count('retries')
+            await asyncio.sleep(delay)
+        self.record_failure()
+        return self.serve_stale(key, await cache.aget(key), url)
+
+    @staticmethod
+    def decode(response: httpx.Response) -> dict | list:
+        """
+        Decode the JSON body of a response.
+
+        :param response: The upstream response.
+        :type response: httpx.Response
+        :return: The decoded JSON response.
+        :rtype: dict | list
+        :raises QuoteSourceError: If the response is an error or its body is not JSON.
+        """
+        try:
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPStatusError, ValueError) as error:
+            raise QuoteSourceError(f'Invalid quote source response from {response.url}: {error}') from error
+
+    def handle_response(self, key: str, response: httpx.Response) -> dict | list:
+        """
+        Decode a successful response and keep it as the stale fallback of its URL.
+
+        :param key: The cache key of the stale fallback.
+        :type key: str
+        :param response: The upstream response.
+        :type response: httpx.Response
+        :return: The decoded JSON response.
+        :rtype: dict | list
+        :raises QuoteSourceError: If the response is an error or its body is not JSON.
+        """
+        data = self.decode(response)
+        self.breaker.record_success()
+        cache.set(key, (data, time.time()), self.stale_ttl)
+        return data
+
+    async def ahandle_response(self, key: str, response: httpx.Response) -> dict | list:
+        """
+        Decode a successful response and keep it as the stale fallback of its URL, asynchronously.
+
+        :param key: The cache key of the stale fallback.
+        :type key: str
+        :param response: The upstream response.
+        :type response: httpx.Response
+        :return: The decoded JSON response.
+        :rtype: dict | list
+        :raises QuoteSourceError: If the response is an error or its body is not JSON.
+        """
+        data = self.decode(response)
+        self.breaker.record_success()
+        await cache.aset(key, (data, time.time()), self.stale_ttl)
+        return data
+
+    def record_failure(self) -> None:
+        """Count a request whose every attempt failed."""
+        self.count('failures')
+        self.breaker.record_failure()
+
+    def serve_stale(self, key: str, entry: tuple | None, url: str) -> dict | list:
+        """
+        Return the stale fallback of a URL.
+
+        :param key: The cache key of the stale fallback.
+        :type key: str
+        :param entry: The cached response and the time it was fetched, or None if there is none.
+        :type entry: tuple | None
+        :param url: The requested URL, used in the error message.
+        :type url: str
+        :return: The stale response.
+        :rtype: dict | list
+        :raises QuoteSourceError: If there is no stale response.
+        """
+        if entry is None:
+            raise QuoteSourceError(f'Quote source is unavailable: {url}')
+        logger.info('Serving stale quote source response %s', key)
+        self.count('stale_served')
+        return entry[0]
+
+    async def aget_cached_json(self, url: str, params: dict = None) -> dict | list:
+        """
+        Fetch a JSON document through the response cache.
+
+        A fresh cached response is returned as is. An expired one is still returned during the revalidation window,
+        while a background task refreshes it. Past that window the document is fetched, and the cached response is
+        only used if the external API fails.
+
+        :param url: The URL to fetch.
+        :type url: str
+        :param params: The query parameters of the request. Defaults to None.
+        :type params: dict, optional
+        :return: The decoded JSON response.
+        :rtype: dict | list
+        :raises QuoteSourceError: If the external API is unavailable and no response is cached.
+        """
+        entry = await cache.aget(self.stale_key(url, params))
+        if entry is not None:
+            data, fetched = entry
+            age = time.time() - fetched
+            if age < self.cache_ttl + self.revalidate_ttl:
+                self.count('cache_hits')
+                if age >= self.cache_ttl:
+                    self.count('revalidations')
+                    self.schedule(url, params, self.aget_json(url, params))
+                return data
+        return await self.aget_json(url, params)
+
+    def prefetch(self, url: str, params: dict = None) -> None:
+        """
+        Warm the response cache with a document in the background, unless it is already cached.
+
+        :param url: The URL to fetch.
+        :type url: str
+        :param params: The query parameters of the request. Defaults to None.
+        :type params: dict, optional
+        """
+        if self.schedule(url, params, self.aget_cached_json(url, params)):
+            self.count('prefetches')
+
+    def schedule(self, url: str, params: dict | None, coroutine: Coroutine) -> bool:
+        """
+        Run a fetch in a background task, unless a background fetch of the same URL is already running.
+
+        The task runs on the loop of the client, so it outlives the loop of the request that scheduled it, and in an
+        empty context, so its work is not recorded as part of the current request.
+
+        :param url: The URL to fetch.
+        :type url: str
+        :param params: The query parameters of the request.
+        :type params: dict | None
+        :param coroutine: The fetch to run.
+        :type coroutine: Coroutine
+        :return: True if the fetch was scheduled.
+        :rtype: bool
+        """
+        key = self.stale_key(url, params)
+        loop = self.loop  # started before taking the lock, which starting it takes too
+        with self._lock:
+            if key in self._background:
+                coroutine.close()
+                return False
+            future = contextvars.Context().run(asyncio.run_coroutine_threadsafe, self.run_quietly(coroutine, url), loop)
+            self._background[key] = future
+        future.add_done_callback(lambda _: self._background.pop(key, None))
+        return True
+
+    @staticmethod
+    async def run_quietly(coroutine: Coroutine, url: str) -> None:
+        """
+        Run a background fetch, logging instead of raising when it fails.
+
+        :param coroutine: The fetch to run.
+        :type coroutine: Coroutine
+        :param url: The fetched URL, used in the log message.
+        :type url: str
+        """
+        try:
+            await coroutine
+        except QuoteSourceError:
+            logger.warning('Background refresh of %s failed', url)
+        except Exception:
+            logger.exception('Background refresh of %s failed', url)
+
+    def count(self, name: str) -> None:
+        """
+        Increment a request counter; requests of several threads and of the loop of the client update them at once.
+
+        :param name: The name of the counter.
+        :type name: str
+        """
+        with self._counters_lock:
+            self.counters[name] += 1
+
+    @contextlib.contextmanager
+    def sending(self, kind: str) -> Iterator[None]:
+        """
+        Count a request as in flight on the sync or async client while it is sent, and keep the highest count seen.
+
+        :param kind: The client sending the request, 'sync' or 'async'.
+        :type kind: str
+        :return: A context manager around the request.
+        :rtype: Iterator[None]
+        """
+        with self._counters_lock:
+            self.in_flight[kind] += 1
+            self.peak_in_flight[kind] = max(self.peak_in_flight[kind], self.in_flight[kind])
+        try:
+            yield
+        finally:
+            with self._counters_lock:
+                self.in_flight[kind] -= 1
+
+    def delay(self, attempt: int) -> float:
+        """
+        Compute the backoff delay before the next attempt, with full jitter.
+
+        :param attempt: The zero-based number of the failed attempt.
+        :type attempt: int
+        :return: The delay, in seconds.
+        :rtype: float
+        """
+        return random.uniform(0, self.backoff * 2 ** attempt)  # noqa: S311
+
+    @classmethod
+    def stale_key(cls, url: str, params: dict = None) -> str:
+        """
+        Build the cache key of the response to a request, from its canonical URL.
+
+        :param url: The requested URL.
+        :type url: str
+        :param params: The query parameters of the request. Defaults to None.
+        :type params: dict, optional
+        :return: The cache key.
+        :rtype: str
+        """
+        request_url = canonical_url(url, params)
+        return f'{cls.stale_key_prefix}:{hashlib.sha256(request_url.encode()).hexdigest()}'
+
+    def stats(self) -> dict:
+        """
+        Collect the request counters, the breaker state and the connection pool usage.
+
+        The pool usage is the number of requests in flight on each client, and the highest number seen since the
+        process started: a peak that reaches 'max_connections' means requests queued for a connection.
+
+        :return: A dictionary of statistics, suitable for sizing the connection pool.
+        :rtype: dict
+        """
+        with self._counters_lock:
+            counters = dict(self.counters)
+            pools = [
+                {'kind': kind, 'in_flight': self.in_flight[kind], 'peak_in_flight': self.peak_in_flight[kind]}
+                for kind in self.in_flight
+            ]
+        return {
+            **counters,
+            'breaker': self.breaker.snapshot(),
+            'limits': {
+                'max_connections': self.limits.max_connections,
+                'max_keepalive_connections': self.limits.max_keepalive_connections,
+            },
+            'pools': pools,
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> QuoteSourceClient:
+    """
+    Return the process-wide quote source client, which is closed when the process exits.
+
+    :return: The shared client.
+    :rtype: QuoteSourceClient
+    """
+    global _client  # noqa: WPS420
+    with _client_lock:
+        if _client is None:
+            _client = QuoteSourceClient.from_settings()
+            atexit.register(_client.close)
+        return _client
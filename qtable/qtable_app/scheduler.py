@@ -0,0 +1,47 @@
+"""
+This module provides an optional in-process scheduler that prefetches the upcoming quotes of the day.
+
+Functions:
+    - start_scheduler(): Starts a daemon thread that calls 'prefetch_quotes_of_day()' periodically.
+
+Settings:
+    - QUOTE_OF_DAY_SCHEDULER: Enables the scheduler when the application is loaded. Defaults to False.
+    - QUOTE_OF_DAY_PREFETCH_DAYS: The number of days after today to prefetch.
+    - QUOTE_OF_DAY_PREFETCH_INTERVAL: The number of seconds between two runs.
+
+Usage:
+    The scheduler is started from 'QtableAppConfig.ready()'. It is meant for deployments without cron; when several
+    workers run it, the per-day cache locks keep them from creating the same quote twice.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .quote_of_day import prefetch_quotes_of_day
+
+logger = logging.getLogger(__name__)
+
+_started = threading.Event()
+
+
+def start_scheduler() -> None:
+    """Start the prefetch thread, once per process."""
+    if _started.is_set():
+        return
+    _started.set()
+    threading.Thread(target=_run, name='quote-of-day-scheduler', daemon=True).start()
+
+
+def _run() -> None:
+    """Prefetch the upcoming quotes of the day forever, sleeping between runs."""
+    while True:  # noqa: WPS457
+        try:
+            prefetch_quotes_of_day(settings.QUOTE_OF_DAY_PREFETCH_DAYS)
+        except Exception:
+            logger.exception('Prefetching the quote of the day failed')
+        finally:
+            close_old_connections()
+        time.sleep(settings.QUOTE_OF_DAY_PREFETCH_INTERVAL)
@@ -0,0 +1,62 @@
+"""
+This module implements the full-text search over the quotes of the day.
+
+Functions:
+    - search_quotes(): Returns the first quotes matching a text query and/or an author, best matches first.
+
+Usage:
+    QuoteSearchView calls 'search_quotes(text, author, limit)' with the 'q' and 'author' GET parameters and renders
+    the returned list.
+
+Note:
+    On PostgreSQL the text is matched with 'websearch_to_tsquery' against 'QuoteOfDay.search_vector' (a GIN-indexed
+    tsvector maintained by a trigger) and ranked with 'ts_rank'. Authors are matched with trigram word similarity on a
+    GIN 'gin_trgm_ops' index, which tolerates typos; when a text query finds nothing, it is retried as a fuzzy author
+    match. The ranked query is evaluated once, sliced to the limit, and only an empty result runs the fallback, so a
+    search that finds quotes costs a single query. Other database backends, used only for local development, fall
+    back to case-insensitive containment.
+    Quotes prefetched for the coming days are never returned before their day.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F
+
+from .models import QuoteOfDay, published
+
+SEARCH_CONFIG = 'english'
+
+
+def search_quotes(text: str = '', author: str = '', limit: int = 20) -> list[QuoteOfDay]:
+    """
+    Return the first quotes of the day matching a text query and/or an author.
+
+    :param text: The text query, in web search syntax (quoted phrases, 'or', '-word'). Defaults to ''.
+    :type text: str
+    :param author: The author to match, fuzzily. Defaults to ''.
+    :type author: str
+    :param limit: The maximum number of quotes to return. Defaults to 20.
+    :type limit: int
+    :return: The matching quotes whose day has come, best matches first.
+    :rtype: list[QuoteOfDay]
+    """
+    quotes = QuoteOfDay.objects.filter(published()).defer('search_vector')
+    if connection.vendor != 'postgresql':
+        if text:
+            quotes = quotes.filter(quote__icontains=text)
+        if author:
+            quotes = quotes.filter(author__icontains=author)
+        return list(quotes.order_by('-date', '-id')[:limit])
+    ordering = []
+    if author:
+        quotes = quotes.filter(author__trigram_word_similar=author).annotate(
+            author_similarity=TrigramWordSimilarity(author, 'author'),
+        )
+        ordering.append('-author_similarity')
+    if text:
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        matches = quotes.filter(search_vector=query).annotate(rank=SearchRank(F('search_vector'), query))
+        results = list(matches.order_by('-rank', *ordering, '-date')[:limit])
+        if results or author:
+            return results
+        return search_quotes(author=text, limit=limit)
+    return list(quotes.order_by(*ordering, '-date')[:limit])
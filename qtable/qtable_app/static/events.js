@@ -0,0 +1,32 @@
+/*
+ * Live updates over Server-Sent Events: the new quote of the day and the favorites changed in other tabs.
+ * Load it with <script src="events.js" data-url="{% url 'qtable_app:events' %}" defer>.
+ */
+(() => {
+  if (!window.EventSource) {
+    return;
+  }
+  const source = new EventSource(document.currentScript.dataset.url);
+
+  source.addEventListener('quote_changed', (event) => {
+    const quote = JSON.parse(event.data);
+    const current = document.querySelector('[data-quote-of-day]');
+    if (current && String(quote.id) !== current.dataset.quoteOfDay) {
+      window.location.reload();
+    }
+  });
+
+  source.addEventListener('favorite_changed', (event) => {
+    const change = JSON.parse(event.data);
+    if (change.id === undefined) {
+      // A bulk change: the page is out of date if it shows any star.
+      if (document.querySelector('[data-favorite]')) {
+        window.location.reload();
+      }
+      return;
+    }
+    document.querySelectorAll(`[data-favorite="${change.id}"] use`).forEach((use) => {
+      use.setAttribute('href', change.favorite ? '#star-fill' : '#star');
+    });
+  });
+})();
@@ -0,0 +1,32 @@
+"""
+This module defines template filters for rendering the favorite state of quotes.
+
+Filters:
+    - is_favorite: Tests whether a quote of the day is in a set of favorite quote IDs.
+
+Usage:
+    Load the library with '{% load favorites %}' and test '{% if quote|is_favorite:favorite_ids %}', where
+    'favorite_ids' comes from 'qtable_app.favorites.get_favorite_ids()'.
+"""
+from django import template
+
+from qtable_app.models import QuoteOfDay
+
+register = template.Library()
+
+
+@register.filter
+def is_favorite(quote: object, favorite_ids: frozenset[int] | None) -> bool:
+    """
+    Test whether a quote is one of the favorites, in constant time.
+
+    Only quotes of the day can be favorites, so mirrored quotes and raw API results are never matched.
+
+    :param quote: The quote to test.
+    :type quote: object
+    :param favorite_ids: The favorite quote IDs, or an empty value for anonymous users.
+    :type favorite_ids: frozenset[int] | None
+    :return: True if the quote is a favorite.
+    :rtype: bool
+    """
+    return bool(favorite_ids) and isinstance(quote, QuoteOfDay) and quote.pk in favorite_ids
@@ -1,3 +1,1155 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import json
+import re
+import threading
+import time
+from collections.abc import Callable
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import addModuleCleanup, mock, skipUnless
 
-# Create your tests here.
+import fakeredis
+import httpx
+from django.apps.registry import Apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from benchmarks.stub_upstream import StubUpstream
+
+from . import scheduler
+from .events import QUOTES as QUOTES_CHANNEL
+from .events import Subscription, broker, format_event, publish, user_channel
+from .favorites import Favorite, bulk_set_favorites, reconcile_favorites_count
+from .leaderboard import get_leaderboard
+from .models import Quote, QuoteOfDay
+from .pagination import CursorPage
+from .quote_of_day import _resolve, aget_quote_of_day, cache_key, lock_key
+from .quote_source import (
+    MAX_LIMITS,
+    QUOTES,
+    RANDOM_QUOTES,
+    CircuitBreaker,
+    QuoteRequest,
+    QuoteSourceClient,
+    QuoteSourceError,
+)
+from .views import EventStreamView, FavoritesBulkView
+
+
+def setUpModule() -> None:  # noqa: N802
+    """Serve static files without the manifest of 'collectstatic', which the tests do not run."""
+    storages = override_settings(STORAGES={
+        **settings.STORAGES,
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    storages.enable()
+    addModuleCleanup(storages.disable)
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 5) -> None:
+    """
+    Wait until a condition holds, for background work running in another thread.
+
+    :param condition: A function returning True once the condition holds.
+    :type condition: Callable[[], bool]
+    :param timeout: The number of seconds to wait. Defaults to 5.
+    :type timeout: float
+    :raises AssertionError: If the condition does not hold in time.
+    """
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('The condition did not hold in time')
+        time.sleep(0.01)
+
+
+class UpstreamMixin:
+    """A mixin of test cases with a stub of the quotes API and a fresh quote source client."""
+
+    def setUp(self) -> None:
+        """Start the stub API and point a new quote source client at it."""
+        super().setUp()
+        cache.clear()
+        self.stub = StubUpstream().start()
+        self.addCleanup(self.stub.stop)
+        self.enterContext(override_settings(
+            QUOTE_SOURCE_BASE_URL=self.stub.url,
+            QUOTE_SOURCE_RETRIES=0,
+            QUOTE_SOURCE_BACKOFF=0,
+        ))
+        self.client_under_test = QuoteSourceClient.from_settings()
+        self.addCleanup(self.client_under_test.close)
+        self.enterContext(mock.patch('qtable_app.quote_source._client', self.client_under_test))
+
+
+class UpstreamTestCase(UpstreamMixin, TestCase):
+    """A test case with a stub of the quotes API and a fresh quote source client."""
+
+
+class QuoteSourceClientTests(UpstreamTestCase):
+    """Tests of the error handling and background work of the quote source client."""
+
+    def test_client_error_counts_as_failure(self) -> None:
+        """A 4xx response raises QuoteSourceError and counts as a failure of the circuit breaker."""
+        with self.assertRaises(QuoteSourceError), self.assertLogs('qtable_app.quote_source', 'WARNING'):
+            self.client_under_test.get_json(f'{self.stub.url}/unknown')
+        self.assertEqual(self.client_under_test.breaker.failures, 1)
+
+    def test_invalid_json_serves_stale_response(self) -> None:
+        """A response that is not JSON falls back to the last good response."""
+        quote_request = QuoteRequest(QUOTES, page=3)
+        fresh = self.client_under_test.get_json(quote_request.endpoint, quote_request.params)
+        with mock.patch.object(httpx.Response, 'json', side_effect=ValueError('Expecting value')):
+            with self.assertLogs('qtable_app.quote_source', 'WARNING'):
+                stale = self.client_under_test.get_json(quote_request.endpoint, quote_request.params)
+        self.assertEqual(stale, fresh)
+        self.assertEqual(self.client_under_test.counters['stale_served'], 1)
+
+    def test_prefetch_outlives_request_loop(self) -> None:
+        """The next page prefetched by a request is served from the cache, although the request loop has ended."""
+        self.client.get(reverse('qtable_app:quotes', args=[1]))
+        wait_for(lambda: not self.client_under_test._background)
+        requests = self.stub.requests
+        response = self.client.get(reverse('qtable_app:quotes', args=[2]))
+        wait_for(lambda: not self.client_under_test._background)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stub.requests - requests, 1)  # only the prefetch of page 3
+
+    def test_stats_of_concurrent_requests(self) -> None:
+        """Requests of several threads are all counted, and the pool usage comes back to zero once they are done."""
+        quote_request = QuoteRequest(QUOTES)
+        args = (quote_request.endpoint, quote_request.params)
+        threads = [threading.Thread(target=self.client_under_test.get_json, args=args) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = self.client_under_test.stats()
+        self.assertEqual(stats['requests'], 8)
+        self.assertEqual(stats['breaker'], {'state': 'closed', 'failures': 0})
+        sync_pool = next(pool for pool in stats['pools'] if pool['kind'] == 'sync')
+        self.assertEqual(sync_pool['in_flight'], 0)
+        self.assertIn(sync_pool['peak_in_flight'], range(1, 9))
+
+    def test_retries_stop_at_the_read_timeout(self) -> None:
+        """Failed attempts are retried until the next backoff would end after the read timeout."""
+        self.stub.failure_rate = 1
+        self.client_under_test.retries = 5
+        self.client_under_test.timeout = httpx.Timeout(0.5)
+        for delay, attempts in ((0.01, 6), (1, 1)):
+            with self.subTest(delay=delay), mock.patch.object(self.client_under_test, 'delay', return_value=delay):
+                requests = self.client_under_test.counters['requests']
+                with self.assertRaises(QuoteSourceError), self.assertLogs('qtable_app.quote_source', 'WARNING'):
+                    self.client_under_test.get_json(f'{self.stub.url}{QUOTES}')
+                self.assertEqual(self.client_under_test.counters['requests'] - requests, attempts)
+                self.client_under_test.breaker.record_success()
+
+    def test_unavailable_upstream_renders_503(self) -> None:
+        """Pages that need the external API answer with a 503 when it fails and nothing is cached."""
+        self.stub.failure_rate = 1
+        for url in (reverse('qtable_app:index'), reverse('qtable_app:quotes', args=[1])):
+            with self.assertLogs('qtable_app.quote_source', 'WARNING'):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 503)
+            self.assertIn('Retry-After', response)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'qtable.cache.TieredCache', 'OPTIONS': {'L1': 'local', 'L2': 'shared'}},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'qtable-l1', 'TIMEOUT': 5},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/0',
+        'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+    },
+})
+class RedisCacheTests(TestCase):
+    """Tests of the tiered cache and the sessions against Redis, emulated in process by fakeredis."""
+
+    def setUp(self) -> None:
+        """Empty both cache tiers."""
+        cache.clear()
+
+    def test_tiered_cache_reads_through_to_redis(self) -> None:
+        """A value written by one worker is read from Redis by another, whose in-process tier is empty."""
+        cache.set('answer', 42)
+        caches['local'].clear()  # another worker
+        self.assertEqual(caches['shared'].get('answer'), 42)
+        self.assertEqual(cache.get('answer'), 42)
+        self.assertEqual(caches['local'].get('answer'), 42)
+
+    def test_add_locks_across_workers(self) -> None:
+        """'add' and 'incr' go to Redis alone, so a lock taken by one worker holds for the others."""
+        self.assertTrue(cache.add('lock', 1))
+        caches['local'].clear()  # another worker
+        self.assertFalse(cache.add('lock', 1))
+        self.assertEqual(cache.incr('lock'), 2)
+        self.assertIsNone(caches['local'].get('lock'))
+
+    def test_session_in_redis(self) -> None:
+        """A logged-in session is kept in Redis and authenticates the next request."""
+        user = User.objects.create_user('reader')
+        self.client.force_login(user)
+        session_key = self.client.session.session_key
+        self.assertTrue(caches['shared'].has_key(f'django.contrib.sessions.cached_db{session_key}'))
+        response = self.client.get(reverse('qtable_app:favorites'))
+        self.assertEqual(response.status_code, 200)
+
+
+class FutureQuoteTests(TestCase):
+    """Tests that the quotes prefetched for the coming days stay hidden until their day."""
+
+    def setUp(self) -> None:
+        """Create the quote of today and the one prefetched for tomorrow, and log in."""
+        cache.clear()
+        today = timezone.localdate()
+        self.today = QuoteOfDay.objects.create(
+            quote='A quote for today.', author='Seneca', day=today, favorites_count=1,
+        )
+        self.tomorrow = QuoteOfDay.objects.create(
+            quote='A quote for tomorrow.', author='Seneca', day=today + timedelta(days=1), favorites_count=2,
+        )
+        self.client.force_login(User.objects.create_user('reader'))
+
+    def test_search_skips_future_quotes(self) -> None:
+        """The search only finds the quotes whose day has come."""
+        response = self.client.get(reverse('qtable_app:search'), {'author': 'Seneca'})
+        self.assertEqual(list(response.context['quotes']), [self.today])
+
+    def test_leaderboard_skips_future_quotes(self) -> None:
+        """The leaderboard only ranks the quotes whose day has come."""
+        self.assertEqual([row['id'] for row in get_leaderboard()], [self.today.pk])
+
+    def test_future_quote_cannot_be_favorited(self) -> None:
+        """Toggling a quote whose day has not come answers with a 404, and bulk changes report it as unknown."""
+        for method in (self.client.get, self.client.post):
+            response = method(reverse('qtable_app:add_favorite', args=[self.tomorrow.pk]))
+            self.assertEqual(response.status_code, 404)
+        response = self.client.post(
+            reverse('qtable_app:favorites_bulk'),
+            json.dumps({'add': [self.today.pk, self.tomorrow.pk]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json(), {'added': 1, 'removed': 0, 'unknown': [self.tomorrow.pk]})
+        self.assertFalse(self.tomorrow.users.exists())
+
+
+@override_settings(
+    QUERY_BUDGETS_STRICT=True,
+    CACHES={
+        alias: {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://localhost:6379/1',
+            'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+        }
+        for alias in ('default', 'shared')
+    },
+)
+class QueryBudgetTests(UpstreamMixin, TransactionTestCase):
+    """
+    Tests of the number of queries of every budgeted view, with strict budgets and a shared cache as in production.
+
+    Every request starts with empty caches, so it counts the session and user queries too. The transaction test case
+    runs the transactions of the views as in production, instead of as savepoints of a test transaction.
+    """
+
+    def setUp(self) -> None:
+        """Create the quotes of the past days, mirrored quotes and a logged-in user."""
+        super().setUp()
+        today = timezone.localdate()
+        self.quotes = QuoteOfDay.objects.bulk_create([
+            QuoteOfDay(quote=f'Quote number {index}.', author='Seneca', day=today - timedelta(days=index))
+            for index in range(1, 11)
+        ])
+        Quote.objects.bulk_create([
+            Quote(external_id=f'q{index}', content=f'Mirrored quote {index}.', author='Seneca', date_modified=today)
+            for index in range(30)
+        ])
+        self.client.force_login(User.objects.create_user('reader'))
+        self.begin = int(connection.vendor == 'sqlite')  # Django only sends an explicit BEGIN to SQLite
+
+    def queries(self, method: str, url: str, cold: bool = True, **kwargs) -> int:
+        """
+        Send a request and return the number of queries the instrumentation middleware counted for its budget.
+
+        :param method: The name of the test client method, e.g. 'get'.
+        :type method: str
+        :param url: The URL of the request.
+        :type url: str
+        :param cold: Whether to empty the caches first. Defaults to True.
+        :type cold: bool
+        :param kwargs: The other arguments of the test client method.
+        :type kwargs: dict
+        :return: The number of queries.
+        :rtype: int
+        """
+        if cold:
+            cache.clear()
+        response = getattr(self.client, method)(url, **kwargs)
+        response.close()
+        self.assertLess(response.status_code, 400)
+        count = re.search(r'\bdb;dur=[\d.]+;desc="(\d+)"', response['Server-Timing'])
+        return int(count.group(1)) if count else 0
+
+    def test_index(self) -> None:
+        """The home page creates the quote of the day once, then reads it and the favorites from the cache."""
+        url = reverse('qtable_app:index')
+        self.assertEqual(self.queries('get', url), 7 + self.begin)
+        self.assertEqual(self.queries('get', url, cold=False), 0)
+        self.assertEqual(self.queries('get', url), 4)
+        self.client.logout()
+        self.assertEqual(self.queries('get', url), 1)
+
+    def test_quotes(self) -> None:
+        """A page of the quote list reads the session, the user, the mirror version and the page."""
+        self.assertEqual(self.queries('get', reverse('qtable_app:quotes', args=[1])), 4)
+
+    def test_favorites(self) -> None:
+        """The favorites page reads the session, the user, one keyset page and the favorite IDs."""
+        self.assertEqual(self.queries('get', reverse('qtable_app:favorites')), 4)
+
+    def test_toggle(self) -> None:
+        """A toggle locks the quote, checks and writes the favorite and updates the count in one transaction."""
+        url = reverse('qtable_app:add_favorite', args=[self.quotes[0].pk])
+        self.assertEqual(self.queries('post', url), 6 + self.begin)
+
+    def test_bulk(self) -> None:
+        """A bulk change takes the same number of queries whatever the number of IDs."""
+        payload = json.dumps({'add': [quote.pk for quote in self.quotes]})
+        url = reverse('qtable_app:favorites_bulk')
+        self.assertEqual(self.queries('post', url, data=payload, content_type='application/json'), 6 + self.begin)
+
+    def test_search(self) -> None:
+        """A search reads the session, the user, the favorite IDs and the matches."""
+        self.assertEqual(self.queries('get', reverse('qtable_app:search'), data={'q': 'number'}), 4)
+
+    def test_leaderboard(self) -> None:
+        """The leaderboard reads the session, the user and the ranking."""
+        self.assertEqual(self.queries('get', reverse('qtable_app:leaderboard')), 3)
+
+    def test_events(self) -> None:
+        """The event stream only reads the session and the user before streaming."""
+        self.assertEqual(self.queries('get', reverse('qtable_app:events')), 2)
+
+
+@override_settings(METRICS_TOKEN='scraper-token')
+class MetricsViewTests(TestCase):
+    """Tests of the Prometheus endpoint."""
+
+    def test_metrics_need_the_token(self) -> None:
+        """The scraper reads the metrics at '/metrics/' with its bearer token; other clients are refused."""
+        url = reverse('qtable_app:metrics')
+        self.assertEqual(url, '/metrics/')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer scraper-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+
+class QuoteMirrorTests(UpstreamTestCase):
+    """Tests of the local mirror of the quotes corpus."""
+
+    def setUp(self) -> None:
+        """Shrink the corpus of the stub API to a few pages."""
+        super().setUp()
+        self.stub.corpus = 45
+
+    def test_sync_fills_mirror(self) -> None:
+        """The sync command copies the whole corpus, and a second run updates the quotes in place."""
+        out = StringIO()
+        call_command('sync_quotes', stdout=out)
+        self.assertIn('Synced 45 quotes.', out.getvalue())
+        call_command('sync_quotes', stdout=StringIO())
+        self.assertEqual(Quote.objects.count(), 45)
+        self.assertEqual(Quote.objects.get(external_id=f'stub{7:028d}').author, 'Author 7')
+
+    def test_list_is_served_from_mirror(self) -> None:
+        """Once the mirror is synced, the quote list does not call the external API."""
+        call_command('sync_quotes', stdout=StringIO())
+        requests = self.stub.requests
+        response = self.client.get(reverse('qtable_app:quotes', args=[3]))
+        self.assertEqual(len(response.context['quotes']['results']), 5)
+        self.assertFalse(response.context['quotes']['has_next'])
+        self.assertEqual(self.client.get(reverse('qtable_app:quotes', args=[4])).status_code, 404)
+        self.assertEqual(self.stub.requests, requests)
+
+
+class HttpCacheTests(UpstreamTestCase):
+    """Tests of the validators and the Cache-Control of the home page and the quote list."""
+
+    def test_index_not_modified(self) -> None:
+        """The home page answers a matching If-None-Match with a 304, publicly for anonymous users only."""
+        url = reverse('qtable_app:index')
+        response = self.client.get(url)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.client.force_login(User.objects.create_user('reader'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_index_etag_follows_favorite(self) -> None:
+        """Favoriting the quote of the day changes the ETag of the home page, so the star is not served stale."""
+        self.client.force_login(User.objects.create_user('reader'))
+        url = reverse('qtable_app:index')
+        etag = self.client.get(url)['ETag']
+        self.client.post(reverse('qtable_app:add_favorite', args=[QuoteOfDay.objects.get().pk]))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_quotes_etag_follows_mirror(self) -> None:
+        """The quote list is validated by the version of the mirror, which a sync changes."""
+        call_command('sync_quotes', stdout=StringIO())
+        url = reverse('qtable_app:quotes', args=[1])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        call_command('sync_quotes', '--full', stdout=StringIO())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class FavoriteToggleTests(TestCase):
+    """Tests of setting and toggling a favorite."""
+
+    def setUp(self) -> None:
+        """Create a quote of the day and log in."""
+        cache.clear()
+        self.quote = QuoteOfDay.objects.create(quote='A quote.', author='Seneca', day=timezone.localdate())
+        self.client.force_login(User.objects.create_user('reader'))
+        self.url = reverse('qtable_app:add_favorite', args=[self.quote.pk])
+
+    def test_explicit_state_is_idempotent(self) -> None:
+        """Repeating a request with a 'state' leaves the favorite and its count as the first one set them."""
+        for _ in range(2):
+            response = self.client.post(self.url, {'state': 'true'})
+            self.assertEqual(response.json(), {'id': self.quote.pk, 'favorite': True, 'count': 1})
+        for _ in range(2):
+            response = self.client.post(self.url, {'state': 'false'})
+            self.assertEqual(response.json(), {'id': self.quote.pk, 'favorite': False, 'count': 0})
+        self.quote.refresh_from_db()
+        self.assertEqual(self.quote.favorites_count, 0)
+
+    def test_post_without_state_toggles(self) -> None:
+        """Without a 'state', every request flips the favorite."""
+        self.assertTrue(self.client.post(self.url).json()['favorite'])
+        self.assertFalse(self.client.post(self.url).json()['favorite'])
+
+    def test_get_toggles_and_redirects(self) -> None:
+        """The link of a star toggles the favorite and goes back to the page it came from."""
+        response = self.client.get(self.url, {'next': reverse('qtable_app:favorites')})
+        self.assertRedirects(response, reverse('qtable_app:favorites'))
+        self.assertTrue(self.quote.users.exists())
+
+
+class KeysetPaginationTests(TestCase):
+    """Tests of the keyset pagination of the favorites page."""
+
+    def setUp(self) -> None:
+        """Create favorites sharing dates, so pages break ties on the primary key, and log in."""
+        cache.clear()
+        user = User.objects.create_user('reader')
+        now = timezone.now()
+        self.quotes = QuoteOfDay.objects.bulk_create([
+            QuoteOfDay(quote=f'Quote number {index}.', author='Seneca', date=now - timedelta(days=index // 3))
+            for index in range(10)
+        ])
+        user.favorites.add(*self.quotes)
+        self.client.force_login(user)
+        self.url = reverse('qtable_app:favorites')
+
+    def page(self, cursor: str | None = None) -> CursorPage:
+        """
+        Request a page of favorites.
+
+        :param cursor: The cursor of the page, or None for the first page.
+        :type cursor: str | None
+        :return: The page.
+        :rtype: CursorPage
+        """
+        return self.client.get(self.url, {'cursor': cursor} if cursor else {}).context['page_obj']
+
+    def test_pages_cover_favorites_once(self) -> None:
+        """Following the next cursors lists every favorite once, newest first, in pages of the page size."""
+        pages = [self.page()]
+        while pages[-1].has_next:
+            pages.append(self.page(pages[-1].next_cursor))
+        self.assertEqual([len(page) for page in pages], [4, 4, 2])
+        expected = sorted(self.quotes, key=lambda quote: (quote.date, quote.pk), reverse=True)
+        self.assertEqual([quote for page in pages for quote in page], expected)
+        self.assertFalse(pages[0].has_previous)
+
+    def test_previous_cursor(self) -> None:
+        """The previous cursor of a page leads back to the page before it."""
+        first = self.page()
+        second = self.page(first.next_cursor)
+        self.assertEqual(list(self.page(second.previous_cursor)), list(first))
+
+    def test_invalid_cursor_serves_first_page(self) -> None:
+        """A cursor that was tampered with falls back to the first page."""
+        first = self.page()
+        self.assertEqual(list(self.page(first.next_cursor[:-1] + 'x')), list(first))
+        self.assertEqual(list(self.page('not-a-cursor')), list(first))
+
+
+class QuoteOfDayTests(TestCase):
+    """Tests of the single-flight resolution of the quote of the day."""
+
+    def setUp(self) -> None:
+        """Empty the cache and count the calls to a slow external API."""
+        cache.clear()
+        self.fetch = mock.AsyncMock(side_effect=self.slow_quote)
+        self.day = timezone.localdate()
+
+    @staticmethod
+    async def slow_quote() -> dict:
+        """
+        Return a quote after a delay, so concurrent requests overlap.
+
+        :return: The quote.
+        :rtype: dict
+        """
+        await asyncio.sleep(0.05)
+        return {'content': 'A quote.', 'author': 'Seneca'}
+
+    async def test_concurrent_requests_fetch_once(self) -> None:
+        """Concurrent requests on a cold cache share one upstream fetch and one row."""
+        quotes = await asyncio.gather(*[aget_quote_of_day(self.fetch) for _ in range(10)])
+        self.assertEqual(self.fetch.await_count, 1)
+        self.assertEqual(len({quote.pk for quote in quotes}), 1)
+        self.assertEqual(await QuoteOfDay.objects.filter(day=self.day).acount(), 1)
+        self.assertEqual((await cache.aget(cache_key(self.day))).pk, quotes[0].pk)
+        self.assertIsNone(await cache.aget(lock_key(self.day)))
+
+    @mock.patch('qtable_app.quote_of_day.POLL_INTERVAL', 0.01)
+    async def test_lock_coalesces_workers(self) -> None:
+        """Workers that do not share a process wait for the one holding the lock instead of fetching too."""
+        quotes = await asyncio.gather(*[_resolve(self.day, self.fetch) for _ in range(5)])  # one call per worker
+        self.assertEqual(self.fetch.await_count, 1)
+        self.assertEqual(len({quote.pk for quote in quotes}), 1)
+        self.assertEqual(await QuoteOfDay.objects.filter(day=self.day).acount(), 1)
+
+    @mock.patch('qtable_app.quote_of_day.POLL_INTERVAL', 0.01)
+    async def test_dead_lock_holder(self) -> None:
+        """A worker that died holding the lock delays the others until the lock expires, without blocking them."""
+        await cache.aadd(lock_key(self.day), 1, 1)  # the dead worker never releases it
+        quote = await aget_quote_of_day(self.fetch)
+        self.assertEqual(self.fetch.await_count, 1)
+        self.assertEqual(quote.day, self.day)
+        self.assertIsNone(await cache.aget(lock_key(self.day)))
+
+    @mock.patch('qtable_app.quote_of_day.POLL_INTERVAL', 0.01)
+    async def test_lock_holder_dies_after_creating(self) -> None:
+        """A quote created by a worker that died before caching it is read from the database, not fetched again."""
+        await cache.aadd(lock_key(self.day), 1, 60)
+        created = await QuoteOfDay.objects.acreate(quote='A quote.', author='Seneca', day=self.day)
+        quote = await aget_quote_of_day(self.fetch)
+        self.assertEqual(quote.pk, created.pk)
+        self.fetch.assert_not_awaited()
+        self.assertEqual((await cache.aget(cache_key(self.day))).pk, created.pk)
+
+
+class ResponseCacheTests(SimpleTestCase):
+    """Tests of the response cache of the quote source client, against a stubbed transport."""
+
+    def setUp(self) -> None:
+        """Create a client whose responses are fresh for a minute and revalidated for another one."""
+        cache.clear()
+        self.status = 200
+        self.sent = 0
+        self.released = threading.Event()
+        self.released.set()
+        self.quote_client = QuoteSourceClient(
+            timeout=httpx.Timeout(5),
+            limits=httpx.Limits(),
+            retries=0,
+            backoff=0,
+            breaker=CircuitBreaker(threshold=5, reset_timeout=30),
+            stale_ttl=3600,
+            cache_ttl=60,
+            revalidate_ttl=60,
+            transport=httpx.MockTransport(self.respond),
+        )
+        self.addCleanup(self.quote_client.close)
+        self.quote_request = QuoteRequest(QUOTES, page=2)
+
+    def respond(self, request: httpx.Request) -> httpx.Response:
+        """
+        Answer a request once released, with the number of requests sent so far as the version of the page.
+
+        :param request: The request.
+        :type request: httpx.Request
+        :return: The response.
+        :rtype: httpx.Response
+        """
+        self.released.wait(5)
+        self.sent += 1
+        return httpx.Response(self.status, json={'page': 2, 'version': self.sent})
+
+    async def get(self) -> dict:
+        """
+        Fetch the page through the response cache.
+
+        :return: The page.
+        :rtype: dict
+        """
+        return await self.quote_client.aget_cached_json(self.quote_request.endpoint, self.quote_request.params)
+
+    def age(self, seconds: float) -> None:
+        """
+        Make the cached page older.
+
+        :param seconds: The number of seconds to add to its age.
+        :type seconds: float
+        """
+        data, fetched = cache.get(self.quote_request.cache_key)
+        cache.set(self.quote_request.cache_key, (data, fetched - seconds))
+
+    async def test_fresh_hit(self) -> None:
+        """A fresh page is served from the cache without a request."""
+        self.assertEqual((await self.get())['version'], 1)
+        self.assertEqual((await self.get())['version'], 1)
+        self.assertEqual(self.sent, 1)
+        self.assertEqual(self.quote_client.counters['cache_hits'], 1)
+
+    async def test_stale_hit_revalidates_once(self) -> None:
+        """An expired page is served at once while a single background request refreshes it."""
+        await self.get()
+        self.age(90)
+        self.released.clear()  # keep the revalidation in flight
+        self.assertEqual([(await self.get())['version'] for _ in range(3)], [1, 1, 1])
+        self.released.set()
+        wait_for(lambda: not self.quote_client._background)
+        self.assertEqual(self.sent, 2)
+        self.assertEqual((await self.get())['version'], 2)
+        self.assertEqual(self.sent, 2)
+
+    async def test_prefetches_coalesce(self) -> None:
+        """Prefetching a page that is already being fetched in the background does not fetch it again."""
+        self.released.clear()
+        for _ in range(3):
+            self.quote_client.prefetch(self.quote_request.endpoint, self.quote_request.params)
+        self.released.set()
+        wait_for(lambda: not self.quote_client._background)
+        self.assertEqual(self.sent, 1)
+        self.assertEqual(self.quote_client.counters['prefetches'], 1)
+        self.assertEqual((await self.get())['version'], 1)
+
+    async def test_failure_serves_stale(self) -> None:
+        """Past the revalidation window the page is fetched again, and the cached copy is served if that fails."""
+        await self.get()
+        self.age(600)
+        self.status = 503
+        with self.assertLogs('qtable_app.quote_source', 'WARNING'):
+            self.assertEqual((await self.get())['version'], 1)
+        self.assertEqual(self.sent, 2)
+        self.assertEqual(self.quote_client.counters['stale_served'], 1)
+        cache.clear()
+        with self.assertRaises(QuoteSourceError), self.assertLogs('qtable_app.quote_source', 'WARNING'):
+            await self.get()
+
+
+class QuoteRequestTests(SimpleTestCase):
+    """Tests of building requests to the external API."""
+
+    def test_invalid_params(self) -> None:
+        """Parameters the endpoint does not accept are rejected when the request is built."""
+        invalid = [
+            {'path': '/authors'},
+            {'path': QUOTES, 'page': 0},
+            {'path': RANDOM_QUOTES, 'page': 2},
+            {'path': QUOTES, 'limit': 0},
+            {'path': RANDOM_QUOTES, 'limit': MAX_LIMITS[RANDOM_QUOTES] + 1},
+            {'path': QUOTES, 'sort_by': 'length'},
+            {'path': RANDOM_QUOTES, 'sort_by': 'author'},
+            {'path': QUOTES, 'order': 'up'},
+        ]
+        for params in invalid:
+            with self.subTest(**params), self.assertRaises(ValueError):
+                QuoteRequest(**params)
+
+    def test_equivalent_requests_share_cache_key(self) -> None:
+        """Requests for the same document share a URL and a cache key, whatever the order or defaults of the params."""
+        request = QuoteRequest(QUOTES, page=2, tags=['love', 'wisdom'], sort_by='author', order='asc')
+        same = QuoteRequest(QUOTES, order='asc', sort_by='author', tags=[' wisdom', 'love', 'love'], page=2)
+        self.assertEqual(same.url, request.url)
+        self.assertEqual(same.cache_key, request.cache_key)
+        self.assertEqual(QuoteRequest(QUOTES, page=1, limit=20).cache_key, QuoteRequest(QUOTES).cache_key)
+        self.assertNotEqual(QuoteRequest(QUOTES, page=3).cache_key, request.cache_key)
+        self.assertEqual(
+            QuoteSourceClient.stale_key(request.endpoint, dict(reversed(request.params.items()))),
+            request.cache_key,
+        )
+        self.assertEqual(
+            request.url,
+            f'{settings.QUOTE_SOURCE_BASE_URL}{QUOTES}?order=asc&page=2&sortBy=author&tags=love%2Cwisdom',
+        )
+
+    def test_next_page(self) -> None:
+        """The next page keeps every other parameter and leaves the original request unchanged."""
+        request = QuoteRequest(QUOTES, limit=50, author='seneca')
+        next_request = request.next_page()
+        self.assertEqual(next_request.params, {'author': 'seneca', 'limit': 50, 'page': 2})
+        self.assertEqual(next_request.next_page().page, 3)
+        self.assertIsNone(request.page)
+
+
+class QuoteListUpstreamTests(UpstreamTestCase):
+    """Tests of the quote list while the mirror is empty and pages come from the external API."""
+
+    def test_last_page_prefetches_nothing(self) -> None:
+        """A page prefetches the next one, except the last page, which has none."""
+        self.stub.corpus = 45
+        response = self.client.get(reverse('qtable_app:quotes', args=[2]))
+        wait_for(lambda: not self.client_under_test._background)
+        self.assertTrue(response.context['quotes']['has_next'])
+        self.assertEqual(self.client_under_test.counters['prefetches'], 1)
+        requests = self.stub.requests
+        response = self.client.get(reverse('qtable_app:quotes', args=[3]))  # prefetched
+        wait_for(lambda: not self.client_under_test._background)
+        self.assertFalse(response.context['quotes']['has_next'])
+        self.assertEqual(len(response.context['quotes']['results']), 5)
+        self.assertEqual(self.client_under_test.counters['prefetches'], 1)
+        self.assertEqual(self.stub.requests, requests)
+
+
+class EventLoopMixin:
+    """A mixin of test cases reading event subscriptions on an event loop of their own."""
+
+    def setUp(self) -> None:
+        """Create the event loop of the subscriptions."""
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def subscribe(self, *channels: str) -> Subscription:
+        """
+        Subscribe to channels from the event loop of the test.
+
+        :param channels: The channels to subscribe to.
+        :type channels: str
+        :return: The subscription.
+        :rtype: Subscription
+        """
+        async def subscribe() -> Subscription:
+            return broker.subscribe(*channels)
+
+        subscription = self.loop.run_until_complete(subscribe())
+        self.addCleanup(broker.unsubscribe, subscription)
+        return subscription
+
+    def received(self, subscription: Subscription, timeout: float = 0.05) -> list[str]:
+        """
+        Return the messages a subscription received, waiting a little for the last one.
+
+        :param subscription: The subscription.
+        :type subscription: Subscription
+        :param timeout: The number of seconds to wait for a message. Defaults to 0.05.
+        :type timeout: float
+        :return: The formatted events.
+        :rtype: list[str]
+        """
+        messages = []
+        while (message := self.loop.run_until_complete(subscription.get(timeout))) is not None:
+            messages.append(message)
+        return messages
+
+
+class EventPublishTests(EventLoopMixin, TransactionTestCase):
+    """Tests that events reach the subscriptions once the transaction that published them commits."""
+
+    def test_published_after_commit(self) -> None:
+        """An event published in a transaction is delivered when it commits, and dropped when it rolls back."""
+        subscription = self.subscribe(user_channel(1))
+        with transaction.atomic():
+            publish(user_channel(1), 'favorite_changed', {'id': 7, 'favorite': True, 'count': 1})
+            self.assertEqual(self.received(subscription), [])
+        self.assertEqual(
+            self.received(subscription),
+            [format_event('favorite_changed', {'id': 7, 'favorite': True, 'count': 1})],
+        )
+        with self.assertRaises(ValueError), transaction.atomic():
+            publish(user_channel(1), 'favorite_changed', {'id': 7, 'favorite': False, 'count': 0})
+            raise ValueError('rolled back')
+        self.assertEqual(self.received(subscription), [])
+
+    def test_toggle_notifies_user(self) -> None:
+        """Toggling a favorite notifies the streams of the user, and only theirs."""
+        user = User.objects.create_user('reader')
+        quote = QuoteOfDay.objects.create(quote='A quote.', author='Seneca', day=timezone.localdate())
+        own, other = self.subscribe(user_channel(user.pk)), self.subscribe(user_channel(user.pk + 1))
+        self.client.force_login(user)
+        self.client.post(reverse('qtable_app:add_favorite', args=[quote.pk]))
+        self.assertEqual(
+            self.received(own),
+            [format_event('favorite_changed', {'id': quote.pk, 'favorite': True, 'count': 1})],
+        )
+        self.assertEqual(self.received(other), [])
+
+    @skipUnless(connection.vendor == 'postgresql', 'LISTEN/NOTIFY needs PostgreSQL')
+    @override_settings(EVENTS_PG_NOTIFY=True)
+    def test_pg_notify_after_commit(self) -> None:
+        """With PostgreSQL notifications, an event reaches the listener of the worker once its transaction commits."""
+        subscription = self.subscribe(QUOTES_CHANNEL)
+        listener = broker._listeners[self.loop]
+        self.addCleanup(self.loop.run_until_complete, asyncio.gather(listener, return_exceptions=True))
+        self.addCleanup(listener.cancel)
+        self.received(subscription, timeout=0.5)  # lets the listener connect
+        with transaction.atomic():
+            publish(QUOTES_CHANNEL, 'quote_changed', {'id': 7})
+            self.assertEqual(self.received(subscription, timeout=0.2), [])
+        self.assertEqual(self.received(subscription, timeout=2), [format_event('quote_changed', {'id': 7})])
+
+
+class EventStreamTests(EventLoopMixin, SimpleTestCase):
+    """Tests of the subscription queues and of the Server-Sent Events stream."""
+
+    def test_full_queue_drops_oldest(self) -> None:
+        """A client that does not keep up loses the oldest events, not the latest."""
+        with override_settings(EVENTS_QUEUE_SIZE=2):
+            subscription = self.subscribe(QUOTES_CHANNEL)
+        for index in range(3):
+            broker.deliver(QUOTES_CHANNEL, 'quote_changed', {'id': index})
+        self.assertEqual(
+            self.received(subscription),
+            [format_event('quote_changed', {'id': 1}), format_event('quote_changed', {'id': 2})],
+        )
+
+    def test_format_event(self) -> None:
+        """An event is one 'event:' line and one 'data:' line of JSON, terminated by a blank line."""
+        message = format_event('quote_changed', {'day': date(2024, 1, 2), 'quote': 'One\ntwo'})
+        self.assertEqual(message, 'event: quote_changed\ndata: {"day": "2024-01-02", "quote": "One\\ntwo"}\n\n')
+
+    @override_settings(EVENTS_KEEPALIVE=0.01)
+    def test_stream(self) -> None:
+        """The stream sends the retry delay, the events, keepalive comments and the new day at the rollover."""
+        today = timezone.localdate()
+        stream = EventStreamView().stream([QUOTES_CHANNEL])
+        with mock.patch('django.utils.timezone.localdate', return_value=today) as localdate:
+            self.assertEqual(self.loop.run_until_complete(anext(stream)), 'retry: 5000\n\n')
+            broker.deliver(QUOTES_CHANNEL, 'quote_changed', {'id': 7})
+            self.assertEqual(self.loop.run_until_complete(anext(stream)), format_event('quote_changed', {'id': 7}))
+            self.assertEqual(self.loop.run_until_complete(anext(stream)), ': keepalive\n\n')
+            localdate.return_value = today + timedelta(days=1)
+            self.assertEqual(
+                self.loop.run_until_complete(anext(stream)),
+                format_event('quote_changed', {'day': today + timedelta(days=1)}),
+            )
+        self.loop.run_until_complete(stream.aclose())
+        self.assertNotIn(QUOTES_CHANNEL, broker._subscriptions)
+
+
+class FavoritesCountTests(TestCase):
+    """Tests that the denormalized favorite counts follow every way of changing favorites."""
+
+    def setUp(self) -> None:
+        """Create quotes of past days and users without favorites."""
+        cache.clear()
+        today = timezone.localdate()
+        self.quotes = [
+            QuoteOfDay.objects.create(
+                quote=f'Quote number {index}.', author='Seneca', day=today - timedelta(days=index),
+            )
+            for index in range(3)
+        ]
+        self.users = [User.objects.create_user(f'reader{index}') for index in range(3)]
+
+    def assertCountsMatch(self) -> None:  # noqa: N802
+        """Check that the favorite count of every quote is its number of users."""
+        for quote in self.quotes:
+            quote.refresh_from_db()
+            self.assertEqual(quote.favorites_count, quote.users.count(), quote)
+
+    def test_relation_managers(self) -> None:
+        """Adding, removing and clearing favorites from either side of the relation keeps the counts."""
+        first, second, third = self.quotes
+        first.users.add(*self.users)
+        first.users.add(self.users[0])  # already a favorite
+        self.users[0].favorites.add(second, third)
+        self.assertCountsMatch()
+        first.users.remove(self.users[1])
+        self.users[0].favorites.remove(second)
+        self.users[2].favorites.remove(second)  # not a favorite
+        self.assertCountsMatch()
+        self.users[0].favorites.clear()
+        first.users.clear()
+        self.assertCountsMatch()
+        self.assertEqual([quote.favorites_count for quote in self.quotes], [0, 0, 0])
+
+    def test_bulk_set_favorites(self) -> None:
+        """Bulk changes count only the favorites really added or removed."""
+        ids = [quote.pk for quote in self.quotes]
+        user_id = self.users[0].pk
+        self.assertEqual(bulk_set_favorites(user_id, set(ids), set()), {'added': 3, 'removed': 0, 'unknown': []})
+        self.assertEqual(
+            bulk_set_favorites(user_id, {ids[0]}, {ids[1], ids[2]}),
+            {'added': 0, 'removed': 2, 'unknown': []},
+        )
+        bulk_set_favorites(self.users[1].pk, set(ids), {ids[2]})
+        self.assertCountsMatch()
+        self.assertEqual([quote.favorites_count for quote in self.quotes], [2, 1, 0])
+
+    def test_user_deletion(self) -> None:
+        """Deleting a user removes their favorites from the counts."""
+        for user in self.users[:2]:
+            user.favorites.add(*self.quotes[:2])
+        self.users[0].delete()
+        self.assertCountsMatch()
+        self.assertEqual([quote.favorites_count for quote in self.quotes], [1, 1, 0])
+
+    def test_reconcile_repairs_drift(self) -> None:
+        """The reconcile command recounts the quotes changed behind the counters, and only those."""
+        first, second, third = self.quotes
+        first.users.add(*self.users)
+        second.users.add(self.users[0])
+        Favorite.objects.filter(quoteofday=first, user=self.users[0]).delete()  # sends no 'm2m_changed'
+        QuoteOfDay.objects.filter(pk=third.pk).update(favorites_count=5)
+        out = StringIO()
+        call_command('reconcile_favorites_count', stdout=out)
+        self.assertIn('Fixed the favorite count of 2 quotes.', out.getvalue())
+        self.assertCountsMatch()
+        self.assertEqual(reconcile_favorites_count(), 0)
+
+    def test_leaderboard(self) -> None:
+        """The leaderboard ranks quotes by favorite count, skips unfavorited ones and ranks a month apart."""
+        first, second, third = self.quotes
+        second.users.add(*self.users)
+        first.users.add(self.users[0])
+        QuoteOfDay.objects.filter(pk=first.pk).update(date=timezone.now() - timedelta(days=62))
+        self.assertEqual([row['id'] for row in get_leaderboard()], [second.pk, first.pk])
+        self.assertEqual(get_leaderboard()[0]['favorites_count'], 3)
+        month = timezone.localdate() - timedelta(days=62)
+        self.assertEqual([row['id'] for row in get_leaderboard(month)], [first.pk])
+
+
+class FavoritesBulkTests(TestCase):
+    """Tests of the bulk favorites endpoint and of the favorites export."""
+
+    def setUp(self) -> None:
+        """Create quotes of past days and log in a user who favorited two of them."""
+        cache.clear()
+        today = timezone.localdate()
+        self.quotes = [
+            QuoteOfDay.objects.create(quote='Plain.', author='Seneca', day=today - timedelta(days=2)),
+            QuoteOfDay.objects.create(quote='Commas, and "quotes".', author='Marcus Aurelius', day=today),
+            QuoteOfDay.objects.create(quote='Not a favorite.', author='Epictetus', day=today - timedelta(days=1)),
+        ]
+        self.user = User.objects.create_user('reader')
+        self.user.favorites.add(*self.quotes[:2])
+        User.objects.create_user('other').favorites.add(self.quotes[2])
+        self.client.force_login(self.user)
+
+    def post(self, body: str) -> JsonResponse:
+        """
+        Send a bulk change.
+
+        :param body: The JSON body.
+        :type body: str
+        :return: The response.
+        :rtype: JsonResponse
+        """
+        return self.client.post(reverse('qtable_app:favorites_bulk'), body, content_type='application/json')
+
+    def test_bulk_change(self) -> None:
+        """A bulk change applies the known IDs and reports the unknown ones."""
+        response = self.post(json.dumps({'add': [self.quotes[2].pk, 999999], 'remove': [str(self.quotes[0].pk)]}))
+        self.assertEqual(response.json(), {'added': 1, 'removed': 1, 'unknown': [999999]})
+        self.assertEqual(set(self.user.favorites.all()), {self.quotes[1], self.quotes[2]})
+
+    def test_invalid_body(self) -> None:
+        """Bodies that are not an object of ID lists are rejected with a 400 and change nothing."""
+        for body in ('{"add": [1', '[1, 2]', '{"add": ["one"]}', '{"add": 1}', '{"remove": [null]}'):
+            with self.subTest(body=body):
+                response = self.post(body)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        self.assertEqual(self.user.favorites.count(), 2)
+
+    def test_too_many_ids(self) -> None:
+        """A request with more than 'max_items' IDs is rejected with a 400."""
+        with mock.patch.object(FavoritesBulkView, 'max_items', 2):
+            response = self.post(json.dumps({'add': [self.quotes[2].pk], 'remove': [1, 2]}))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'At most 2 IDs per request.'})
+        self.assertEqual(self.user.favorites.count(), 2)
+
+    async def export(self, export_format: str) -> tuple[StreamingHttpResponse, str]:
+        """
+        Download the favorites export of the user.
+
+        :param export_format: The 'format' GET parameter.
+        :type export_format: str
+        :return: The response and its body.
+        :rtype: tuple[StreamingHttpResponse, str]
+        """
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('qtable_app:favorites_export'), {'format': export_format})
+        self.assertTrue(response.streaming)
+        return response, b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+    async def test_export_jsonl(self) -> None:
+        """The JSON Lines export has one object per favorite of the user, in ID order."""
+        response, body = await self.export('jsonl')
+        self.assertEqual(response['Content-Type'], 'application/jsonl')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="favorites.jsonl"')
+        self.assertEqual(
+            [json.loads(line) for line in body.splitlines()],
+            [
+                {'id': quote.pk, 'day': quote.day.isoformat(), 'author': quote.author, 'quote': quote.quote}
+                for quote in self.quotes[:2]
+            ],
+        )
+
+    async def test_export_csv(self) -> None:
+        """The CSV export has a header row and one quoted row per favorite of the user."""
+        response, body = await self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="favorites.csv"')
+        first, second = self.quotes[:2]
+        self.assertEqual(body, (
+            'id,day,author,quote\r\n'
+            f'{first.pk},{first.day},Seneca,Plain.\r\n'
+            f'{second.pk},{second.day},Marcus Aurelius,"Commas, and ""quotes""."\r\n'
+        ))
+
+
+class PrefetchQuoteOfDayTests(UpstreamTestCase):
+    """Tests of the prefetch of the upcoming quotes of the day."""
+
+    def prefetch(self, days: int) -> str:
+        """
+        Run the prefetch command.
+
+        :param days: The number of days after today to prefetch.
+        :type days: int
+        :return: The output of the command.
+        :rtype: str
+        """
+        out = StringIO()
+        call_command('prefetch_quote_of_day', '--days', str(days), stdout=out)
+        return out.getvalue()
+
+    def test_prefetch_is_idempotent(self) -> None:
+        """The quotes of today and of the following days are created in batches once, and cached until their day."""
+        today = timezone.localdate()
+        existing = QuoteOfDay.objects.create(quote='A quote.', author='Seneca', day=today)
+        days = MAX_LIMITS[RANDOM_QUOTES] + 5
+        self.assertIn(f'Prefetched {days} quotes of the day.', self.prefetch(days))
+        self.assertEqual(self.stub.requests, 2)
+        self.assertEqual(
+            sorted(QuoteOfDay.objects.values_list('day', flat=True)),
+            [today + timedelta(days=offset) for offset in range(days + 1)],
+        )
+        self.assertEqual(cache.get(cache_key(today)), existing)
+        tomorrow = cache.get(cache_key(today + timedelta(days=1)))
+        self.assertEqual(timezone.localtime(tomorrow.date).date(), tomorrow.day)
+        self.assertIn('Prefetched 0 quotes of the day.', self.prefetch(days))
+        self.assertEqual(self.stub.requests, 2)
+        self.assertEqual(QuoteOfDay.objects.count(), days + 1)
+
+    def test_prefetch_falls_back_to_mirror(self) -> None:
+        """While the external API is unavailable, the quotes are taken from the local quote mirror."""
+        Quote.objects.create(
+            external_id='q1', content='Mirrored quote.', author='Seneca', date_modified=date(2024, 1, 1),
+        )
+        self.stub.failure_rate = 1
+        with self.assertLogs('qtable_app.quote_of_day', 'WARNING'), self.assertLogs('qtable_app.quote_source'):
+            self.assertIn('Prefetched 1 quotes of the day.', self.prefetch(1))
+        self.assertEqual(list(QuoteOfDay.objects.values_list('quote', flat=True)), ['Mirrored quote.'])
+
+    def test_locked_days_are_skipped(self) -> None:
+        """A day whose lock another worker holds is left to that worker."""
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        cache.add(lock_key(tomorrow), 1)
+        self.assertIn('Prefetched 1 quotes of the day.', self.prefetch(1))
+        self.assertFalse(QuoteOfDay.objects.filter(day=tomorrow).exists())
+
+
+class SchedulerTests(SimpleTestCase):
+    """Tests of the in-process prefetch scheduler."""
+
+    def test_started_once(self) -> None:
+        """The scheduler thread is started once per process."""
+        started = mock.patch.object(scheduler, '_started', threading.Event())
+        with started, mock.patch.object(threading, 'Thread') as thread:
+            scheduler.start_scheduler()
+            scheduler.start_scheduler()
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once_with()
+
+    def test_failures_do_not_stop_the_scheduler(self) -> None:
+        """A failed prefetch is logged, and the next run happens after the interval."""
+        class Stop(Exception):  # noqa: N818
+            """Ends the loop of the scheduler."""
+
+        prefetch = mock.patch.object(scheduler, 'prefetch_quotes_of_day', side_effect=[QuoteSourceError('down'), []])
+        sleep = mock.patch.object(scheduler.time, 'sleep', side_effect=[None, Stop])
+        with prefetch as prefetch_quotes, sleep, mock.patch.object(scheduler, 'close_old_connections'):
+            with self.assertLogs('qtable_app.scheduler', 'ERROR'), self.assertRaises(Stop):
+                scheduler._run()
+        self.assertEqual(prefetch_quotes.call_count, 2)
+
+
+class DayMigrationTests(TransactionTestCase):
+    """Tests of the migration adding the unique 'QuoteOfDay.day' column to existing quotes."""
+
+    migrate_from = [('qtable_app', '0004_quoteofday_date_default')]
+    migrate_to = [('qtable_app', '0005_quoteofday_day')]
+
+    def setUp(self) -> None:
+        """Roll the database back to before the migration, and forward to the latest state after the test."""
+        executor = MigrationExecutor(connection)
+        latest = executor.loader.graph.leaf_nodes('qtable_app')
+        executor.migrate(self.migrate_from)
+        self.addCleanup(lambda: MigrationExecutor(connection).migrate(latest))
+
+    def migrate(self, targets: list[tuple[str, str]]) -> Apps:
+        """
+        Migrate the database.
+
+        :param targets: The migrations to migrate to.
+        :type targets: list[tuple[str, str]]
+        :return: The models in the state of the targets.
+        :rtype: Apps
+        """
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_backfill_day(self) -> None:
+        """Every existing quote gets the day of its date, in batches, except later quotes of an already seen day."""
+        old_quote = self.migrate(self.migrate_from).get_model('qtable_app', 'QuoteOfDay')
+        created = [
+            old_quote.objects.create(quote=f'Quote {index}.', author='Seneca', date=timezone.make_aware(moment))
+            for index, moment in enumerate([
+                datetime(2024, 1, 1, 9),
+                datetime(2024, 1, 2, 9),
+                datetime(2024, 1, 1, 18),  # a second quote on the first day
+                datetime(2024, 1, 3, 9),
+                datetime(2024, 1, 4, 23, 30),
+            ])
+        ]
+        migration = importlib.import_module('qtable_app.migrations.0005_quoteofday_day')
+        with mock.patch.object(migration, 'BATCH_SIZE', 2):
+            new_quote = self.migrate(self.migrate_to).get_model('qtable_app', 'QuoteOfDay')
+        days = dict(new_quote.objects.values_list('pk', 'day'))
+        self.assertEqual(
+            [days[quote.pk] for quote in created],
+            [date(2024, 1, 1), date(2024, 1, 2), None, date(2024, 1, 3), date(2024, 1, 4)],
+        )
+        with self.assertRaises(IntegrityError):
+            new_quote.objects.create(quote='Duplicate.', author='Seneca', day=date(2024, 1, 2))
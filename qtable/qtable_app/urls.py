@@ -3,18 +3,35 @@ This module defines URL patterns related to the 'qtable_app' within the Django a
 
 URL Patterns:
     - '': Maps to the IndexView class, serving as the main landing page of the application.
-    - 'quotes/<int:page>/': Maps to the QuotesListView class, displaying a paginated list of quotes from the external
-        API.
+    - 'quotes/<int:page>/': Maps to the QuotesListView class, displaying a paginated list of quotes from the local
+        quote mirror.
     - 'favorites/': Maps to the FavoritesListView class, displaying a list of favorite quotes for the authenticated
         user.
     - '<int:pk>/': Maps to the FavoriteSetView class, allowing users to toggle the favorite status for a specific quote
-        of the day.
+        of the day, either with a GET and a redirect, or with a POST returning JSON for AJAX use.
+    - 'favorites/bulk/': Maps to the FavoritesBulkView class, adding and removing many favorites in one request.
+    - 'favorites/export/': Maps to the FavoritesExportView class, streaming the favorites as JSON Lines or CSV.
+    - 'search/': Maps to the QuoteSearchView class, searching the quotes of the day by text and by author.
+    - 'popular/' and 'popular/<int:year>/<int:month>/': Map to the LeaderboardView class, ranking the quotes of the day
+        by their number of favorites, all-time or per month.
+    - 'events/': Maps to the EventStreamView class, streaming the quote of the day and favorite changes as Server-Sent
+        Events.
+    - 'stats/quote-source/': Maps to the QuoteSourceStatsView class, reporting the quote source client statistics to
+        staff users.
+    - 'metrics/': Maps to the MetricsView class, exposing the request metrics to Prometheus.
 
 Views:
     - IndexView: Represents the main landing page of the application, displaying the quote of the day.
-    - QuotesListView: Displays a paginated list of quotes fetched from an external API.
+    - QuotesListView: Displays a paginated list of quotes mirrored from an external API.
     - FavoritesListView: Displays a list of favorite quotes for the authenticated user.
     - FavoriteSetView: Allows users to add or remove a specific quote from their favorites.
+    - FavoritesBulkView: Applies a batch of favorite additions and removals in a single transaction.
+    - FavoritesExportView: Streams the favorites of the authenticated user for export.
+    - QuoteSearchView: Searches the quotes of the day with ranked full-text search and fuzzy author matching.
+    - LeaderboardView: Ranks the quotes of the day by their denormalized favorite count.
+    - EventStreamView: Pushes 'quote_changed' and 'favorite_changed' events to open pages over one idle connection.
+    - QuoteSourceStatsView: Reports the request counters and connection pool usage of the quote source client.
+    - MetricsView: Exposes the request counts, latencies and query counts of every view in the Prometheus format.
 
 Usage:
     The URL configuration ensures that users can navigate to appropriate endpoints within the 'qtable_app', including
@@ -29,7 +46,19 @@ Note:
 
 from django.urls import path
 
-from .views import FavoriteSetView, FavoritesListView, IndexView, QuotesListView
+from .views import (
+    EventStreamView,
+    FavoriteSetView,
+    FavoritesBulkView,
+    FavoritesExportView,
+    FavoritesListView,
+    IndexView,
+    LeaderboardView,
+    MetricsView,
+    QuoteSearchView,
+    QuoteSourceStatsView,
+    QuotesListView,
+)
 
 app_name = 'qtable_app'
 
@@ -37,5 +66,13 @@ urlpatterns = [
     path('', IndexView.as_view(), name='index'),
     path('quotes/<int:page>/', QuotesListView.as_view(), name='quotes'),
     path('favorites/', FavoritesListView.as_view(), name='favorites'),
+    path('favorites/bulk/', FavoritesBulkView.as_view(), name='favorites_bulk'),
+    path('favorites/export/', FavoritesExportView.as_view(), name='favorites_export'),
     path('<int:pk>/', FavoriteSetView.as_view(), name='add_favorite'),
+    path('search/', QuoteSearchView.as_view(), name='search'),
+    path('popular/', LeaderboardView.as_view(), name='leaderboard'),
+    path('popular/<int:year>/<int:month>/', LeaderboardView.as_view(), name='leaderboard_month'),
+    path('events/', EventStreamView.as_view(), name='events'),
+    path('stats/quote-source/', QuoteSourceStatsView.as_view(), name='quote_source_stats'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
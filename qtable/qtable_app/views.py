@@ -2,79 +2,211 @@
 This module contains Django views related to handling quotes from an external API and managing user favorites.
 
 Classes:
-    - BaseQuoteView: A base view class to fetch quotes from a specified URL.
+    - AsyncLoginRequiredMixin: A mixin that resolves the user with the async auth API and requires authentication.
+    - BaseQuoteView: A base async view class to fetch quotes from an endpoint of the external API.
     - IndexView: A view class to display the quote of the day.
-    - QuotesListView: A view class to display a list of quotes from the external API.
+    - QuotesListView: A view class to display a list of quotes from the local quote mirror.
     - FavoritesListView: A view class to display a list of favorite quotes for the authenticated user.
     - FavoriteSetView: A view class to toggle the favorite status for a specific quote of the day.
+    - FavoritesBulkView: A view class to add and remove many favorites in one request.
+    - FavoritesExportView: A view class to stream the favorites of the authenticated user as JSON Lines or CSV.
+    - QuoteSearchView: A view class to search the quotes of the day by text and by author.
+    - LeaderboardView: A view class to rank the quotes of the day by their number of favorites, all-time or per month.
+    - EventStreamView: A view class to stream the quote of the day and favorite changes with Server-Sent Events.
+    - QuoteSourceStatsView: A view class to report the connection pool statistics of the quote source client.
+    - MetricsView: A view class to expose the request metrics of the process in the Prometheus text format.
 
 Attributes:
-    - url: The URL from which quotes are fetched, specified in each respective view class.
+    - endpoint: The endpoint of the external API from which quotes are fetched, specified in each respective view class.
 
 Methods:
-    - get_response(): Fetches a response from the specified URL, optionally paginating through results.
-    - IndexView.get(): Renders the template for the quote of the day, fetching it from an API if not available.
-    - QuotesListView.get(): Renders a template displaying a list of quotes from an external API.
+    - BaseQuoteView.dispatch(): Resolves the user with the async auth API before calling the async handler, and
+        answers with a 503 page when the external API is unavailable and nothing is cached.
+    - BaseQuoteView.build_request(): Builds a QuoteRequest for the endpoint of the view from typed query parameters.
+    - get_response(): Fetches the response to a QuoteRequest through the pooled async quote source client, going
+        through its response cache unless the response is random.
+    - IndexView.get(): Renders the template for the quote of the day, resolved once per day and served from the cache.
+    - IndexView.render_page(): Renders the quote of the day template.
+    - IndexView.get_random_quote(): Fetches a random quote from the API when the quote of the day must be created,
+        falling back to the local quote mirror while the API is unavailable.
+    - QuotesListView.get(): Renders a template displaying a list of quotes from the local quote mirror.
+    - QuotesListView.render_page(): Builds the context of a page of quotes and renders it.
+    - QuotesListView.get_page(): Returns a page of mirrored quotes, falling back to the external API until the mirror
+        is populated by the 'sync_quotes' management command.
     - FavoritesListView.get_queryset(): Returns a queryset of favorite quotes for the authenticated user.
-    - FavoritesListView.get_context_data(): Provides context data for rendering the favorites list view.
+    - FavoritesListView.get_context_data(): Provides context data for rendering the favorites list view, paginated
+        with a cursor instead of page numbers.
     - FavoriteSetView.get(): Toggles the favorite status of a specific quote for the authenticated user.
+    - FavoriteSetView.post(): Sets or toggles the favorite status of a quote and returns the new state as JSON.
+    - FavoritesBulkView.post(): Applies a JSON batch of favorite IDs to add and remove in a single transaction.
+    - FavoritesExportView.get(): Streams the favorites of the authenticated user without loading them all in memory.
+    - QuoteSearchView.get(): Renders the ranked full-text and fuzzy author matches of the search parameters.
+    - LeaderboardView.get(): Renders the cached most favorited quotes of all time or of a month.
+    - EventStreamView.get(): Streams the events of the quotes channel and of the user channel until the client leaves.
+    - QuoteSourceStatsView.get(): Returns the quote source client statistics as JSON to staff users.
+    - MetricsView.get(): Returns the aggregated request metrics to Prometheus or to staff users.
 
 Usage:
     This module provides the necessary views to display quotes, manage user favorites, and toggle favorite status.
     It integrates with an external API ('https://api.quotable.io/') to fetch quotes and allows users to mark quotes as
     favorites.
     The views are designed to handle user authentication, providing a personalized experience based on user preferences.
+    IndexView and QuotesListView answer conditional requests: their strong ETags combine the quote version with the
+    user and favorite state, so repeat visits get a 304 without rendering, and anonymous pages are publicly cacheable.
+    Anonymous users are also served from a server-side page cache keyed by the path and the ETag.
+    Views declare a 'query_budget', the number of database queries a request may run, including the session and user
+    lookups; InstrumentationMiddleware reports requests over budget.
+    The favorite state of quotes is rendered from a cached set of favorite quote IDs ('favorite_ids'), so a page never
+    loads the favorite rows themselves. Mirrored quotes cannot be favorites, so the quotes list does not need it.
 
 Note:
     The 'LoginRequiredMixin' is used to ensure that only authenticated users can access certain views, such as managing
     favorites.
+    IndexView, QuotesListView and FavoriteSetView are async views: they use the async quote source client and the async
+    ORM, so under an ASGI server a request waiting on the external API does not hold a worker thread.
+    Querysets are evaluated in the views, because templates are rendered synchronously and must not touch the database.
+    EventStreamView keeps one idle connection per open page instead of the page polling IndexView; it needs the ASGI
+    server, as a WSGI worker would be held by every stream.
 """
 
-from datetime import date
+import csv
+import json
+from collections.abc import AsyncIterator
+from datetime import date, timedelta
+from functools import partial
 
-import httpx
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.contrib.auth.models import User
+from django.conf import settings
+from django.contrib.auth.mixins import AccessMixin, LoginRequiredMixin, UserPassesTestMixin
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import QuerySet
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
-from django.shortcuts import get_object_or_404, redirect, render
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseForbidden,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import redirect, render
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 from django.views.generic import ListView, View
 
-from .models import QuoteOfDay
+from .events import QUOTES as QUOTES_CHANNEL
+from .events import broker, format_event, quote_payload, user_channel
+from .favorites import aget_favorite_ids, aset_favorite, bulk_set_favorites, get_favorite_ids
+from .http_cache import (
+    PUBLIC_MAX_AGE,
+    acached_page,
+    aget_quotes_version,
+    make_etag,
+    not_modified,
+    patch_conditional_headers,
+)
+from .instrumentation import registry, track
+from .leaderboard import get_leaderboard
+from .models import Quote, QuoteOfDay
+from .pagination import KeysetPaginator
+from .quote_of_day import aget_quote_of_day, seconds_until_rollover
+from .quote_of_day import cache_key as quote_of_day_key
+from .quote_source import QUOTES, RANDOM_QUOTES, QuoteRequest, QuoteSourceError, get_client
+from .search import search_quotes
+
+
+class AsyncLoginRequiredMixin(AccessMixin):
+    """Verify that the current user is authenticated, resolving it with the async auth API."""
+
+    async def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        """
+        Resolve the user and redirect anonymous users to the login page.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :param args: Positional arguments of the URL pattern.
+        :type args: tuple
+        :param kwargs: Keyword arguments of the URL pattern.
+        :type kwargs: dict
+        :return: The response of the handler, or a redirect to the login page.
+        :rtype: HttpResponse
+        """
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super().dispatch(request, *args, **kwargs)
 
 
 class BaseQuoteView(View):
     """A base view class for retrieving quotes from a given URL."""
 
-    url = None
+    endpoint = None
+    unavailable_template_name = 'qtable_app/unavailable.html'
 
-    def get_response(self, page: int = None) -> dict | list:
+    async def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
         """
-        Retrieve a response from the given URL.
+        Resolve the user with the async auth API, so the templates never load it synchronously.
 
-        :param page: The page number to retrieve. Defaults to None.
-        :type page: int, optional
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :param args: Positional arguments of the URL pattern.
+        :type args: tuple
+        :param kwargs: Keyword arguments of the URL pattern.
+        :type kwargs: dict
+        :return: The response of the handler, or a 503 response if the external API is unavailable.
+        :rtype: HttpResponse
+        """
+        request.user = await request.auser()
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except QuoteSourceError:
+            response = render(request, self.unavailable_template_name, {'title': 'Unavailable'}, status=503)
+            response['Retry-After'] = int(settings.QUOTE_SOURCE_BREAKER_RESET)
+            return response
+
+    def build_request(self, **params) -> QuoteRequest:
+        """
+        Build a request to the endpoint of the view.
+
+        :param params: The query parameters, as keyword arguments of QuoteRequest.
+        :type params: dict
+        :return: The request.
+        :rtype: QuoteRequest
+        :raises ValueError: If a parameter is out of range.
+        """
+        return QuoteRequest(self.endpoint, **params)
+
+    async def get_response(self, quote_request: QuoteRequest) -> dict | list:
+        """
+        Retrieve the response to a request from the external API.
 
-        :return: The JSON response from the URL.
+        :param quote_request: The request to send.
+        :type quote_request: QuoteRequest
+
+        :return: The JSON response.
         :rtype: dict | list
         """
-        if page:
-            self.url = f'{self.url}?page={page}'
-        response = httpx.get(self.url)
-        return response.json()
+        client = get_client()
+        with track('upstream'):
+            if quote_request.cacheable:
+                return await client.aget_cached_json(quote_request.endpoint, quote_request.params)
+            return await client.aget_json(quote_request.endpoint, quote_request.params)
 
 
 class IndexView(BaseQuoteView):
     """A view class for displaying the quote of the day."""
 
     template_name = 'qtable_app/index.html'
-    url = 'https://api.quotable.io/quotes/random'
+    endpoint = RANDOM_QUOTES
+    query_budget = 8  # includes creating the quote of the day once per day
 
-    def get(self, request: HttpRequest, page: int = None) -> HttpResponse:
+    async def get(self, request: HttpRequest, page: int = None) -> HttpResponse:
         """
         Retrieve the quote of the day and renders it along with additional context data.
 
+        Conditional requests are answered with a 304 while the quote and the user's favorite state are unchanged.
+
         :param request: The HTTP request object.
         :type request: HttpRequest
         :param page: The page number.
@@ -82,28 +214,75 @@ class IndexView(BaseQuoteView):
         :return: The HTTP response containing the rendered template.
         :rtype: HttpResponse
         """
-        quote_of_day = QuoteOfDay.objects.filter(date__date=date.today()).first()
-        if not quote_of_day:
-            response = self.get_response()[0]
-            quote_of_day = QuoteOfDay(quote=response.get('content'), author=response.get('author'))
-            quote_of_day.save()
+        quote_of_day = await aget_quote_of_day(self.get_random_quote)
+        favorite_ids = await aget_favorite_ids(request.user)
+        etag = make_etag(
+            'index',
+            quote_of_day.pk,
+            quote_of_day.updated.timestamp(),
+            request.user.pk,
+            quote_of_day.pk in favorite_ids,
+        )
+        max_age = seconds_until_rollover(quote_of_day.day or timezone.localdate())
+        response = not_modified(request, etag, quote_of_day.updated)
+        if response is None:
+            render_page = partial(self.render_page, request, quote_of_day, favorite_ids)
+            response = await acached_page(request, etag, max_age, render_page)
+        return patch_conditional_headers(request, response, etag, quote_of_day.updated, max_age)
+
+    async def render_page(self, request: HttpRequest, quote: QuoteOfDay, favorite_ids: frozenset) -> HttpResponse:
+        """
+        Render the quote of the day template.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :param quote: The quote of the day.
+        :type quote: QuoteOfDay
+        :param favorite_ids: The IDs of the quotes the user has favorited.
+        :type favorite_ids: frozenset
+        :return: The HTTP response containing the rendered template.
+        :rtype: HttpResponse
+        """
         context = {
             'title': 'Quote of the Day',
-            'quote': quote_of_day,
-            'favorites': request.user.favorites.all() if request.user.is_authenticated else None,
+            'quote': quote,
+            'favorite_ids': favorite_ids,
         }
         return render(request, self.template_name, context)
 
+    async def get_random_quote(self) -> dict:
+        """
+        Retrieve a random quote from the external API, or from the local quote mirror if the API is unavailable.
+
+        :return: The quote, with the 'content' and 'author' keys.
+        :rtype: dict
+        :raises QuoteSourceError: If the API is unavailable and the mirror is empty.
+        """
+        try:
+            quotes = await self.get_response(self.build_request())
+            if not quotes:
+                raise QuoteSourceError('The quote source returned no quote')
+        except QuoteSourceError:
+            quote = await Quote.objects.order_by('?').values('content', 'author').afirst()
+            if quote is None:
+                raise
+            return quote
+        return quotes[0]
+
 
 class QuotesListView(BaseQuoteView):
     """A view class for displaying a list of quotes."""
 
     template_name = 'qtable_app/quotes_list.html'
-    url = 'https://api.quotable.io/quotes'
+    endpoint = QUOTES
+    paginate_by = 20
+    query_budget = 4
 
-    def get(self, request: HttpRequest, page: int = None) -> HttpResponse:
+    async def get(self, request: HttpRequest, page: int = None) -> HttpResponse:
         """
-        Render a template displaying a list of quotes from an external API.
+        Render a template displaying a page of quotes from the local quote mirror.
+
+        Once the mirror is populated, the page is validated by the mirror version, so unchanged pages get a 304.
 
         :param request: The HTTP request object.
         :type request: HttpRequest
@@ -112,20 +291,72 @@ class QuotesListView(BaseQuoteView):
         :return: The HTTP response object containing the rendered template.
         :rtype: HttpResponse
         """
+        page = page or 1
+        version = await aget_quotes_version()
+        etag = make_etag('quotes', page, version.timestamp(), request.user.pk) if version else None
+        if etag is None:
+            return await self.render_page(request, page)
+        response = not_modified(request, etag, version)
+        if response is None:
+            response = await acached_page(request, etag, PUBLIC_MAX_AGE, partial(self.render_page, request, page))
+        return patch_conditional_headers(request, response, etag, version)
+
+    async def render_page(self, request: HttpRequest, page: int) -> HttpResponse:
+        """
+        Build the context of a page of quotes and render it.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :param page: The page number to render.
+        :type page: int
+        :return: The HTTP response object containing the rendered template.
+        :rtype: HttpResponse
+        """
         context = {
             'title': 'Quotes List',
-            'quotes': self.get_response(page),
-            'favorites': request.user.favorites.all() if request.user.is_authenticated else None,
+            'quotes': await self.get_page(page),
         }
         return render(request, self.template_name, context)
 
+    async def get_page(self, page: int) -> dict:
+        """
+        Retrieve a page of quotes from the local mirror, falling back to the external API until it is synced.
+
+        Upstream pages go through the response cache of the quote source client, and the next page is prefetched in
+        the background, so browsing the list does not wait on the external API after the first visitor.
+        One row more than the page size is selected, so the next page can be detected without a count query.
+
+        :param page: The page number to retrieve.
+        :type page: int
+        :return: A dictionary with the 'results', 'page' and 'has_next' keys.
+        :rtype: dict
+        :raises Http404: If the page is out of range.
+        """
+        offset = (page - 1) * self.paginate_by
+        quotes = [quote async for quote in Quote.objects.order_by('pk')[offset:offset + self.paginate_by + 1]]
+        if quotes:
+            return {'results': quotes[:self.paginate_by], 'page': page, 'has_next': len(quotes) > self.paginate_by}
+        if await Quote.objects.aexists():
+            raise Http404('Page not found')
+        quote_request = self.build_request(page=page, limit=self.paginate_by)
+        response = await self.get_response(quote_request)
+        has_next = response.get('page', page) < response.get('totalPages', 0)
+        if has_next:
+            next_request = quote_request.next_page()
+            get_client().prefetch(next_request.endpoint, next_request.params)
+        return {
+            'results': response.get('results', []),
+            'page': response.get('page', page),
+            'has_next': has_next,
+        }
+
 
 class FavoritesListView(LoginRequiredMixin, ListView):
     """View for displaying a list of favorite users for the current user."""
 
     template_name = 'qtable_app/favorites.html'
-    url = 'https://api.quotable.io/quotes'
-    paginate_by = 4
+    page_size = 4
+    query_budget = 4
 
     def get_queryset(self) -> QuerySet:
         """
@@ -135,44 +366,324 @@ class FavoritesListView(LoginRequiredMixin, ListView):
         :return: A queryset of User objects representing the favorite users of the current user.
         :rtype: QuerySet[User]
         """
-        return self.request.user.favorites.all()
+        return QuoteOfDay.objects.filter(users=self.request.user)
 
     def get_context_data(self, **kwargs) -> dict:
         """
         Retrieve and returns the context data for the view.
 
+        The favorites are paginated by keyset on ('date', 'id') with the opaque 'cursor' GET parameter, so every page
+        is a single query without COUNT or OFFSET. The key lives on the quote, not on the through table, so a page
+        walks the quotes by date and probes the unique (quote, user) index of the through table for each one: it
+        costs the page size divided by the share of quotes the user favorited, or the user's favorites when the
+        database joins and sorts them instead, which one quote per day keeps small either way.
+
         :param kwargs: Additional keyword arguments.
         :type kwargs: dict
 
         :return: A dictionary containing the context data for the view.
         :rtype: dict
         """
-        context = super().get_context_data(**kwargs)
+        page = KeysetPaginator(self.object_list, self.page_size).page(self.request.GET.get('cursor'))
+        context = super().get_context_data(object_list=page.object_list, **kwargs)
+        context['page_obj'] = page
+        context['is_paginated'] = page.has_other_pages
         context['title'] = 'Favorites'
-        context['favorites'] = self.request.user.favorites.all()
+        context['favorite_ids'] = get_favorite_ids(self.request.user)
         return context
 
 
-class FavoriteSetView(LoginRequiredMixin, View):
+class FavoriteSetView(AsyncLoginRequiredMixin, View):
     """View for toggling favorite status for a specific quote of the day."""
 
-    def get(self, request: HttpRequest, pk: int) -> HttpResponseRedirect:
+    query_budget = 7  # includes the explicit BEGIN of the transaction on SQLite
+
+    async def get(self, request: HttpRequest, pk: int) -> HttpResponseRedirect:
         """
-        Retrieve a specific quote of the day and toggles its favorite status for the authenticated user.
+        Toggle the favorite status of a specific quote for the authenticated user and redirect back.
 
         :param request: The HTTP request object.
         :type request: HttpRequest
-        :param pk: The primary key of the quote of the day to retrieve.
+        :param pk: The primary key of the quote of the day to toggle.
         :type pk: int
         :return: A redirect response to the next URL specified in the request's GET parameters.
         :rtype: HttpResponseRedirect
         """
-        user = get_object_or_404(User, pk=request.user.pk)
-        favorite = get_object_or_404(QuoteOfDay, pk=pk)
-        if favorite in user.favorites.all():
-            user.favorites.remove(favorite)
-        else:
-            user.favorites.add(favorite)
-        user.save()
+        await aset_favorite(request.user.pk, pk)
         next_url = request.GET.get('next', reverse('qtable_app:index'))
         return redirect(next_url)
+
+    async def post(self, request: HttpRequest, pk: int) -> JsonResponse:
+        """
+        Set or toggle the favorite status of a specific quote for the authenticated user, for AJAX use.
+
+        An optional 'state' form field ('true' or 'false') sets the status explicitly, which makes repeated requests
+        idempotent; without it the status is toggled.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :param pk: The primary key of the quote of the day to update.
+        :type pk: int
+        :return: A JSON response with the new 'favorite' state and the 'count' of users who favorited the quote.
+        :rtype: JsonResponse
+        """
+        state = request.POST.get('state')
+        favorite, count = await aset_favorite(request.user.pk, pk, None if state is None else state == 'true')
+        return JsonResponse({'id': pk, 'favorite': favorite, 'count': count})
+
+
+class FavoritesBulkView(LoginRequiredMixin, View):
+    """View for adding and removing many favorites of the current user at once."""
+
+    max_items = 10000
+    query_budget = 8
+
+    def post(self, request: HttpRequest) -> JsonResponse:
+        """
+        Apply a batch of favorite changes sent as a JSON body like '{"add": [1, 2], "remove": [3]}'.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :return: A JSON response with the 'added' and 'removed' counts and the 'unknown' quote IDs, or a 400 response
+            if the body is invalid.
+        :rtype: JsonResponse
+        """
+        try:
+            payload = json.loads(request.body)
+            add_ids = {int(quote_id) for quote_id in payload.get('add', [])}
+            remove_ids = {int(quote_id) for quote_id in payload.get('remove', [])}
+        except (AttributeError, TypeError, ValueError):
+            return JsonResponse({'error': 'Expected a JSON object with "add" and "remove" lists of IDs.'}, status=400)
+        if len(add_ids) + len(remove_ids) > self.max_items:
+            return JsonResponse({'error': f'At most {self.max_items} IDs per request.'}, status=400)
+        return JsonResponse(bulk_set_favorites(request.user.pk, add_ids, remove_ids))
+
+
+class FavoritesExportView(AsyncLoginRequiredMixin, View):
+    """View for streaming the favorite quotes of the current user as JSON Lines or CSV."""
+
+    fields = ('id', 'day', 'author', 'quote')
+    chunk_size = 2000
+
+    async def get(self, request: HttpRequest) -> StreamingHttpResponse:
+        """
+        Stream the favorites of the current user in the format given by the 'format' GET parameter.
+
+        The rows are read with a server-side iterator and the response is an async stream, so the ASGI server sends
+        each chunk as it is read instead of buffering the whole export.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :return: A streaming response with one quote per line, as JSON Lines ('jsonl', the default) or CSV ('csv').
+        :rtype: StreamingHttpResponse
+        """
+        rows = QuoteOfDay.objects.filter(users=request.user).order_by('pk').values(*self.fields)
+        if request.GET.get('format') == 'csv':
+            content_type, extension = 'text/csv', 'csv'
+        else:
+            content_type, extension = 'application/jsonl', 'jsonl'
+        response = StreamingHttpResponse(self.stream(rows, extension), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="favorites.{extension}"'
+        return response
+
+    async def stream(self, rows: QuerySet, extension: str) -> AsyncIterator[str]:
+        """
+        Yield the rows as lines of the export format.
+
+        :param rows: The queryset of favorite rows, as dictionaries of the exported fields.
+        :type rows: QuerySet
+        :param extension: The export format, 'jsonl' or 'csv'.
+        :type extension: str
+        :return: An async iterator over the lines of the export.
+        :rtype: AsyncIterator[str]
+        """
+        writer = csv.writer(Echo())
+        if extension == 'csv':
+            yield writer.writerow(self.fields)
+        async for row in rows.aiterator(chunk_size=self.chunk_size):
+            if extension == 'csv':
+                yield writer.writerow(row.values())
+            else:
+                yield f'{json.dumps(row, cls=DjangoJSONEncoder)}\n'
+
+
+class Echo:
+    """A file-like object that returns what is written to it, so 'csv.writer' can produce lines for streaming."""
+
+    def write(self, value: str) -> str:
+        """
+        Return the written value.
+
+        :param value: The value to write.
+        :type value: str
+        :return: The same value.
+        :rtype: str
+        """
+        return value
+
+
+class QuoteSearchView(View):
+    """View for searching the quotes of the day by text and by author."""
+
+    template_name = 'qtable_app/search.html'
+    max_results = 20
+    query_budget = 6
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        """
+        Render the best matches of the 'q' (text) and 'author' GET parameters.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :return: The HTTP response containing the rendered template.
+        :rtype: HttpResponse
+        """
+        text = request.GET.get('q', '').strip()
+        author = request.GET.get('author', '').strip()
+        context = {
+            'title': 'Search',
+            'q': text,
+            'author': author,
+            'quotes': search_quotes(text, author, self.max_results) if text or author else [],
+            'favorite_ids': get_favorite_ids(request.user),
+        }
+        return render(request, self.template_name, context)
+
+
+class LeaderboardView(View):
+    """View for ranking the quotes of the day by the number of users who favorited them."""
+
+    template_name = 'qtable_app/leaderboard.html'
+    query_budget = 3
+
+    def get(self, request: HttpRequest, year: int = None, month: int = None) -> HttpResponse:
+        """
+        Render the most favorited quotes of all time, or of a month when 'year' and 'month' are given.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :param year: The year of the month to rank. Defaults to None.
+        :type year: int, optional
+        :param month: The month to rank, from 1 to 12. Defaults to None.
+        :type month: int, optional
+        :return: The HTTP response containing the rendered template.
+        :rtype: HttpResponse
+        :raises Http404: If the month does not exist or is in the future.
+        """
+        current_month = timezone.localdate().replace(day=1)
+        selected = None
+        if year is not None:
+            try:
+                selected = date(year, month, 1)
+            except ValueError:
+                raise Http404('Month not found')
+            if selected > current_month:
+                raise Http404('Month not found')
+        following = (selected + timedelta(days=31)).replace(day=1) if selected else None
+        context = {
+            'title': 'Popular',
+            'month': selected,
+            'current_month': current_month,
+            'previous_month': ((selected or current_month) - timedelta(days=1)).replace(day=1),
+            'next_month': following if following and following <= current_month else None,
+            'quotes': get_leaderboard(selected),
+        }
+        return render(request, self.template_name, context)
+
+
+class EventStreamView(View):
+    """View streaming live events to the browser with Server-Sent Events."""
+
+    query_budget = 2
+    retry = 5000  # milliseconds before the browser reconnects
+
+    async def get(self, request: HttpRequest) -> StreamingHttpResponse:
+        """
+        Stream the 'quote_changed' events, and the 'favorite_changed' events of the user if they are logged in.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :return: An endless 'text/event-stream' response.
+        :rtype: StreamingHttpResponse
+        """
+        user = await request.auser()
+        channels = [QUOTES_CHANNEL, user_channel(user.pk)] if user.is_authenticated else [QUOTES_CHANNEL]
+        response = StreamingHttpResponse(self.stream(channels), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, channels: list[str]) -> AsyncIterator[str]:
+        """
+        Yield the events of the channels as they are published, until the client disconnects.
+
+        A comment is sent every EVENTS_KEEPALIVE seconds without events, so proxies keep the connection open, and a
+        'quote_changed' event is sent when the day rolls over.
+
+        :param channels: The channels to subscribe to.
+        :type channels: list[str]
+        :return: An async iterator over the Server-Sent Events messages.
+        :rtype: AsyncIterator[str]
+        """
+        subscription = broker.subscribe(*channels)
+        try:
+            yield f'retry: {self.retry}\n\n'
+            day = timezone.localdate()
+            while True:  # noqa: WPS457
+                message = await subscription.get(min(settings.EVENTS_KEEPALIVE, seconds_until_rollover(day)))
+                if message is not None:
+                    yield message
+                elif timezone.localdate() != day:
+                    day = timezone.localdate()
+                    quote = await cache.aget(quote_of_day_key(day))
+                    yield format_event('quote_changed', quote_payload(quote) if quote else {'day': day})
+                else:
+                    yield ': keepalive\n\n'
+        finally:
+            broker.unsubscribe(subscription)
+
+
+class QuoteSourceStatsView(UserPassesTestMixin, View):
+    """View for reporting the request counters and connection pool usage of the quote source client."""
+
+    def test_func(self) -> bool:
+        """
+        Allow only staff users to see the statistics.
+
+        :return: True if the current user is a staff member.
+        :rtype: bool
+        """
+        return self.request.user.is_staff
+
+    def get(self, request: HttpRequest) -> JsonResponse:
+        """
+        Return the statistics of the process-wide quote source client.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :return: A JSON response with the client statistics.
+        :rtype: JsonResponse
+        """
+        return JsonResponse(get_client().stats())
+
+
+class MetricsView(View):
+    """View for exposing the request metrics of the process to Prometheus."""
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        """
+        Return the aggregated request metrics in the Prometheus text format.
+
+        When the METRICS_TOKEN setting is set, the scraper authenticates with an 'Authorization: Bearer <token>'
+        header; staff users can always see the metrics.
+
+        :param request: The HTTP request object.
+        :type request: HttpRequest
+        :return: The metrics document, or a 403 response.
+        :rtype: HttpResponse
+        """
+        token = settings.METRICS_TOKEN
+        authorized = token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+        if not authorized and not request.user.is_staff:
+            return HttpResponseForbidden()
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self) -> None:
+        """Connect the signal handlers that keep the cached users up to date."""
+        from django.contrib.auth import get_user_model  # noqa: WPS433
+
+        from .backends import forget_logged_out_user, forget_user  # noqa: WPS433
+
+        user_model = get_user_model()
+        post_save.connect(forget_user, sender=user_model)
+        post_delete.connect(forget_user, sender=user_model)
+        user_logged_out.connect(forget_logged_out_user)
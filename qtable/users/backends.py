@@ -0,0 +1,104 @@
+"""
+This module provides an authentication backend that loads the user of a session from the cache instead of the database.
+
+Classes:
+    - CachedModelBackend: A ModelBackend whose 'get_user()' reads the cache before the database.
+
+Functions:
+    - cache_key(): Returns the cache key of a user.
+    - forget_user(): Deletes a cached user when it is saved or deleted.
+    - forget_logged_out_user(): Deletes the cached user on logout.
+
+Settings:
+    - AUTHENTICATION_BACKENDS: Set to ['users.backends.CachedModelBackend'].
+    - USER_CACHE_TIMEOUT: The number of seconds a user is cached for.
+    - SESSION_CACHE_ALIAS: The cache alias of the sessions, which the users are cached in too.
+
+Usage:
+    AuthenticationMiddleware calls 'get_user()' with the id stored in the session on every request that reads
+    'request.user'. Logging in, logging out and changing a user work as usual; the users app connects the signal
+    handlers below, so the cache never serves a user that changed since it was cached.
+
+Note:
+    Every save of a user deletes its cache entry, 'update_last_login()' included, so the password hash the session is
+    verified against is always current. Updates that bypass 'save()', such as 'QuerySet.update()', are not seen until
+    the entry expires. The users are cached in the shared cache rather than in the per-process tier of the default
+    alias, so that the entry deleted by one worker is gone for all of them. When that cache is process-local after all
+    (local memory, the default with DEBUG), a worker cannot evict the copies held by the others, and a deactivated user
+    or a changed password would keep working there; the backend then reads every user from the database instead.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.base_user import AbstractBaseUser
+from django.core.cache import caches
+from django.http import HttpRequest
+
+from qtable.cache import is_process_local
+
+
+def cache_key(user_id: int | str) -> str:
+    """
+    Return the cache key of a user.
+
+    :param user_id: The primary key of the user.
+    :type user_id: int | str
+    :return: The cache key.
+    :rtype: str
+    """
+    return f'user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """Authenticate against the user model, and load the user of a session from the cache when possible."""
+
+    def get_user(self, user_id: int | str) -> AbstractBaseUser | None:
+        """
+        Return the active user with the given primary key, from the cache or with one query.
+
+        The cache is bypassed when it is process-local, since other workers could not evict its entries.
+
+        :param user_id: The primary key of the user, as stored in the session.
+        :type user_id: int | str
+        :return: The user, or None if it does not exist or cannot authenticate.
+        :rtype: AbstractBaseUser | None
+        """
+        cache = caches[settings.SESSION_CACHE_ALIAS]
+        if is_process_local(cache):
+            return super().get_user(user_id)
+        user = cache.get(cache_key(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(cache_key(user_id), user, settings.USER_CACHE_TIMEOUT)
+        return user
+
+
+def forget_user(sender: type, instance: AbstractBaseUser, **kwargs) -> None:
+    """
+    Delete the cached copy of a user that was saved or deleted.
+
+    :param sender: The user model.
+    :type sender: type
+    :param instance: The user.
+    :type instance: AbstractBaseUser
+    :param kwargs: The other arguments of the signal.
+    :type kwargs: dict
+    """
+    caches[settings.SESSION_CACHE_ALIAS].delete(cache_key(instance.pk))
+
+
+def forget_logged_out_user(sender: type, request: HttpRequest, user: AbstractBaseUser | None, **kwargs) -> None:
+    """
+    Delete the cached copy of a user that logged out.
+
+    :param sender: The user model.
+    :type sender: type
+    :param request: The logout request.
+    :type request: HttpRequest
+    :param user: The user, or None if the request was not authenticated.
+    :type user: AbstractBaseUser | None
+    :param kwargs: The other arguments of the signal.
+    :type kwargs: dict
+    """
+    if user is not None:
+        caches[settings.SESSION_CACHE_ALIAS].delete(cache_key(user.pk))
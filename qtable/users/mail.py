@@ -0,0 +1,165 @@
+"""
+This module delivers the emails of QTable through a database outbox instead of inside the request that sends them.
+
+Classes:
+    - OutboxEmailBackend: A Django email backend that stores every message in the outbox.
+
+Functions:
+    - claim_batch(): Claims a batch of due emails for the current worker.
+    - deliver_batch(): Sends a batch of emails over a single connection of the delivery backend and records the results.
+    - postpone(): Pushes back the next attempt of emails that could not be sent because the server was unreachable.
+    - purge_sent(): Deletes the delivered emails older than a given age.
+
+Settings:
+    - EMAIL_BACKEND: Set to 'users.mail.OutboxEmailBackend' to queue emails; the default.
+    - OUTBOX_EMAIL_BACKEND: The backend the worker delivers with, the SMTP backend by default.
+    - OUTBOX_BATCH_SIZE: The number of emails sent per connection.
+    - OUTBOX_MAX_ATTEMPTS / OUTBOX_RETRY_DELAY: The number of attempts before an email is given up on, and the base
+        delay between attempts, in seconds, doubled after every failure.
+
+Usage:
+    Views send mail as usual, e.g. 'django_email_verification.send_email(user, thread=False)'; the message is stored
+    with a single INSERT and the request does not wait on the SMTP server. The 'send_outbox' management command runs
+    as a separate worker process and calls 'claim_batch()' and 'deliver_batch()' in a loop.
+
+Note:
+    A claimed email has its 'next_attempt' pushed back by CLAIM_TIMEOUT, so a second worker does not pick it up, and
+    an email claimed by a worker that died is retried once the claim expires. On PostgreSQL the claim also skips the
+    rows locked by another worker. Delivery is therefore at least once: an email may be sent twice if a worker dies
+    between sending it and recording it.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import EmailMessage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """An email backend that queues messages in the outbox for the 'send_outbox' worker."""
+
+    def send_messages(self, email_messages: list[EmailMessage]) -> int:
+        """
+        Store the messages in the outbox.
+
+        :param email_messages: The messages to send.
+        :type email_messages: list[EmailMessage]
+        :return: The number of messages queued; 0 if they could not be queued and 'fail_silently' is set.
+        :rtype: int
+        :raises ValueError: If a message has attachments, which the outbox does not store, unless 'fail_silently' is
+            set.
+        """
+        try:
+            emails = [OutgoingEmail.from_message(message) for message in email_messages if message.recipients()]
+            OutgoingEmail.objects.bulk_create(emails)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            logger.exception('Could not queue %s emails', len(email_messages))
+            return 0
+        return len(emails)
+
+
+def claim_batch(size: int) -> list[OutgoingEmail]:
+    """
+    Claim the next due emails, so no other worker sends them until the claim expires.
+
+    :param size: The maximum number of emails to claim.
+    :type size: int
+    :return: The claimed emails.
+    :rtype: list[OutgoingEmail]
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(OutgoingEmail.objects.pending(now).select_for_update(skip_locked=True)[:size])
+        OutgoingEmail.objects.filter(pk__in=[email.pk for email in emails]).update(next_attempt=now + CLAIM_TIMEOUT)
+    return emails
+
+
+def deliver_batch(emails: list[OutgoingEmail], max_attempts: int, retry_delay: float) -> tuple[int, int]:
+    """
+    Send emails over a single connection of the delivery backend and record the outcome of every attempt.
+
+    A failed email is retried after an exponential delay, and given up on after 'max_attempts' attempts. A broken
+    connection is reopened for the next email of the batch; if the server cannot be reached, the rest of the batch is
+    postponed without counting an attempt, so an outage of the server does not use up the attempts of every email.
+
+    :param emails: The claimed emails.
+    :type emails: list[OutgoingEmail]
+    :param max_attempts: The number of attempts after which an email is given up on.
+    :type max_attempts: int
+    :param retry_delay: The delay before the second attempt, in seconds, doubled after every failure.
+    :type retry_delay: float
+    :return: The number of emails sent and the number of emails that failed.
+    :rtype: tuple[int, int]
+    """
+    sent = failed = 0
+    connection = get_connection(settings.OUTBOX_EMAIL_BACKEND, fail_silently=False)
+    try:
+        for index, email in enumerate(emails):
+            try:
+                connection.open()
+            except Exception as error:  # noqa: BLE001 - the whole batch waits for the server
+                logger.warning('Could not connect to the email server: %r', error)
+                postpone(emails[index:], repr(error), retry_delay)
+                failed += len(emails) - index
+                break
+            email.attempts += 1
+            try:
+                connection.send_messages([email.to_message()])
+            except Exception as error:  # noqa: BLE001 - any failure is recorded and retried
+                logger.warning('Sending email %s failed (attempt %s): %r', email.pk, email.attempts, error)
+                failed += 1
+                email.last_error = repr(error)
+                if email.attempts >= max_attempts:
+                    email.failed = timezone.now()
+                else:
+                    email.next_attempt = timezone.now() + timedelta(seconds=retry_delay * 2 ** (email.attempts - 1))
+                connection.close()
+            else:
+                sent += 1
+                email.sent = timezone.now()
+    finally:
+        connection.close()
+        OutgoingEmail.objects.bulk_update(emails, ['attempts', 'last_error', 'next_attempt', 'sent', 'failed'])
+    return sent, failed
+
+
+def postpone(emails: list[OutgoingEmail], error: str, delay: float) -> None:
+    """
+    Postpone the next attempt of emails that could not be sent, without counting an attempt.
+
+    :param emails: The emails to postpone.
+    :type emails: list[OutgoingEmail]
+    :param error: The error that prevented sending them.
+    :type error: str
+    :param delay: The number of seconds to wait.
+    :type delay: float
+    """
+    next_attempt = timezone.now() + timedelta(seconds=delay)
+    for email in emails:
+        email.last_error = error
+        email.next_attempt = next_attempt
+
+
+def purge_sent(older_than: timedelta) -> int:
+    """
+    Delete the delivered emails older than a given age.
+
+    :param older_than: The age after which a delivered email is deleted.
+    :type older_than: timedelta
+    :return: The number of emails deleted.
+    :rtype: int
+    """
+    deleted, _ = OutgoingEmail.objects.filter(sent__lt=timezone.now() - older_than).delete()
+    return deleted
@@ -0,0 +1,83 @@
+"""
+This module defines the 'send_outbox' management command, the worker that delivers the emails queued in the outbox.
+
+Classes:
+    - Command: Claims batches of due emails and sends each batch over a single connection, with retries.
+
+Options:
+    - --once: Delivers the due emails and exits, instead of polling the outbox.
+    - --batch-size: The number of emails sent per connection. Defaults to the OUTBOX_BATCH_SIZE setting.
+    - --interval: The number of seconds to wait when the outbox is empty. Defaults to the OUTBOX_POLL_INTERVAL setting.
+
+Usage:
+    Run 'python manage.py send_outbox' as a long-running worker process next to the web server (see the Procfile), or
+    'python manage.py send_outbox --once' from cron. Several workers may run at once.
+    To try it locally, run a debugging SMTP server with 'python -m aiosmtpd -n -l localhost:1025' and start the worker
+    with EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_USE_SSL=false EMAIL_HOST_PASSWORD='' (an empty password skips the
+    SMTP login); every delivered email is printed by the server.
+
+Note:
+    Delivered emails are kept for OUTBOX_KEEP_DAYS days, then purged by the worker once an hour.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from users.mail import claim_batch, deliver_batch, purge_sent
+
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    """Deliver the emails queued in the outbox."""
+
+    help = 'Send the emails queued in the outbox.'
+
+    def add_arguments(self, parser) -> None:
+        """
+        Register the command line options.
+
+        :param parser: The argument parser of the command.
+        :type parser: CommandParser
+        """
+        parser.add_argument('--once', action='store_true', help='Send the due emails and exit.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.OUTBOX_BATCH_SIZE,
+            help='The number of emails sent per connection.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.OUTBOX_POLL_INTERVAL,
+            help='The number of seconds to wait when the outbox is empty.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        """
+        Send batches of due emails until the outbox is empty, then wait for new ones unless '--once' is given.
+
+        :param args: Positional arguments.
+        :type args: tuple
+        :param options: The parsed command line options.
+        :type options: dict
+        """
+        purged_at = None
+        while True:
+            close_old_connections()
+            if purged_at is None or time.monotonic() - purged_at >= PURGE_INTERVAL:
+                purge_sent(timedelta(days=settings.OUTBOX_KEEP_DAYS))
+                purged_at = time.monotonic()
+            emails = claim_batch(options['batch_size'])
+            if emails:
+                sent, failed = deliver_batch(emails, settings.OUTBOX_MAX_ATTEMPTS, settings.OUTBOX_RETRY_DELAY)
+                self.stdout.write(f'Sent {sent} emails, {failed} failed.')
+            if len(emails) < options['batch_size']:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS('The outbox is empty.'))
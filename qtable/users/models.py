@@ -1,3 +1,139 @@
-from django.db import models
+"""
+This module defines the outbox that stores outgoing emails until the 'send_outbox' worker delivers them.
 
-# Create your models here.
+Models:
+    - OutgoingEmail: Represents an email queued by OutboxEmailBackend, with its delivery state.
+
+Fields:
+    - subject, body, from_email: Represent the subject, the plain text body and the sender of the email.
+    - to, cc, bcc, reply_to: Represent the recipient lists of the email.
+    - headers: Represents the extra headers of the email.
+    - alternatives: Represents the alternative bodies of the email, as [content, mimetype] pairs (e.g. the HTML body).
+    - created: Represents the date the email was queued.
+    - next_attempt: Represents the earliest date of the next delivery attempt, pushed back after every failure and
+        while a worker holds the email.
+    - attempts: Represents the number of delivery attempts made so far.
+    - last_error: Represents the error of the last failed attempt.
+    - sent: Represents the date the email was delivered, or None while it is pending.
+    - failed: Represents the date the worker gave up on the email, or None while it is pending.
+
+Usage:
+    Emails are not created directly: any code sending mail through Django ('send_mail()', 'EmailMessage.send()') goes
+    through OutboxEmailBackend, which stores an OutgoingEmail per message. The 'send_outbox' management command claims
+    the pending ones and delivers them.
+
+Note:
+    The pending emails are indexed by 'next_attempt' with a partial index, so the worker's polling query stays cheap
+    however many delivered emails are kept.
+"""
+from datetime import datetime
+
+from django.core.mail import EmailMultiAlternatives
+from django.db.models import (
+    CharField,
+    DateTimeField,
+    Index,
+    JSONField,
+    Model,
+    PositiveSmallIntegerField,
+    Q,
+    QuerySet,
+    TextField,
+)
+from django.utils import timezone
+
+
+class OutgoingEmailQuerySet(QuerySet):
+    """A queryset of outgoing emails."""
+
+    def pending(self, now: datetime = None) -> QuerySet:
+        """
+        Filter the emails that are due for a delivery attempt.
+
+        :param now: The current date. Defaults to now.
+        :type now: datetime, optional
+        :return: The due emails, oldest attempt first.
+        :rtype: QuerySet[OutgoingEmail]
+        """
+        now = now or timezone.now()
+        return self.filter(sent=None, failed=None, next_attempt__lte=now).order_by('next_attempt')
+
+
+class OutgoingEmail(Model):
+    """Represents an email waiting in the outbox, or the record of its delivery."""
+
+    subject = TextField()
+    body = TextField()
+    from_email = CharField(max_length=254)
+    to = JSONField(default=list)
+    cc = JSONField(default=list)
+    bcc = JSONField(default=list)
+    reply_to = JSONField(default=list)
+    headers = JSONField(default=dict)
+    alternatives = JSONField(default=list)
+    created = DateTimeField(default=timezone.now)
+    next_attempt = DateTimeField(default=timezone.now)
+    attempts = PositiveSmallIntegerField(default=0)
+    last_error = TextField(blank=True)
+    sent = DateTimeField(null=True)
+    failed = DateTimeField(null=True)
+
+    objects = OutgoingEmailQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            Index(fields=['next_attempt'], condition=Q(sent=None, failed=None), name='users_outbox_pending_idx'),
+        ]
+
+    def __str__(self) -> str:
+        """
+        Return the subject and the recipients of the email.
+
+        :return: A short description of the email.
+        :rtype: str
+        """
+        return f'{self.subject} -> {", ".join(self.to)}'
+
+    @classmethod
+    def from_message(cls, message: EmailMultiAlternatives) -> 'OutgoingEmail':
+        """
+        Build an unsaved outgoing email from an email message.
+
+        :param message: The email message, optionally with alternative bodies.
+        :type message: EmailMultiAlternatives
+        :return: The unsaved outgoing email.
+        :rtype: OutgoingEmail
+        :raises ValueError: If the message has attachments, which the outbox does not store.
+        """
+        if message.attachments:
+            raise ValueError('The outbox does not store attachments')
+        return cls(
+            subject=message.subject,
+            body=message.body,
+            from_email=message.from_email,
+            to=list(message.to),
+            cc=list(message.cc),
+            bcc=list(message.bcc),
+            reply_to=list(message.reply_to),
+            headers=dict(message.extra_headers),
+            alternatives=[list(alternative) for alternative in getattr(message, 'alternatives', [])],
+        )
+
+    def to_message(self) -> EmailMultiAlternatives:
+        """
+        Rebuild the email message to deliver.
+
+        :return: The email message.
+        :rtype: EmailMultiAlternatives
+        """
+        return EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.to,
+            cc=self.cc,
+            bcc=self.bcc,
+            reply_to=self.reply_to,
+            headers=self.headers,
+            alternatives=[tuple(alternative) for alternative in self.alternatives],
+        )
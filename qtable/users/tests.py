@@ -1,3 +1,132 @@
-from django.test import TestCase
+import socket
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from .backends import CachedModelBackend, cache_key
+from .mail import claim_batch, deliver_batch
+from .models import OutgoingEmail
+
+REDIS_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/0',
+        'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+    },
+}
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+
+class CachedModelBackendTests(TestCase):
+    """Tests of the cached user of a session."""
+
+    def setUp(self) -> None:
+        """Create a user."""
+        self.user = User.objects.create_user('reader')
+        self.backend = CachedModelBackend()
+
+    @override_settings(CACHES=REDIS_CACHES)
+    def test_shared_cache_serves_user(self) -> None:
+        """A user is read from a shared cache until it is saved again."""
+        caches['shared'].clear()
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.get_user(self.user.pk), self.user)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(caches['shared'].get(cache_key(self.user.pk)))
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_process_local_cache_is_bypassed(self) -> None:
+        """With a local-memory cache, which other workers cannot evict, the user is read from the database."""
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.backend.get_user(self.user.pk), self.user)
+        self.assertIsNone(caches['shared'].get(cache_key(self.user.pk)))
+
+
+def free_port() -> int:
+    """
+    Return a local TCP port that nothing listens on.
+
+    :return: The port.
+    :rtype: int
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@override_settings(
+    EMAIL_BACKEND='users.mail.OutboxEmailBackend',
+    OUTBOX_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class OutboxTests(TestCase):
+    """Tests of the email outbox and its delivery worker."""
+
+    def send(self, **kwargs) -> int:
+        """
+        Send a test email through the outbox backend.
+
+        :param kwargs: The options of 'send_mail()', e.g. 'fail_silently'.
+        :type kwargs: dict
+        :return: The number of emails queued.
+        :rtype: int
+        """
+        return mail.send_mail('Confirm your email', 'Hello', 'qtable@example.com', ['reader@example.com'], **kwargs)
+
+    def test_send_queues_without_delivering(self) -> None:
+        """Sending stores the email in the outbox, and the worker delivers it once."""
+        self.assertEqual(self.send(), 1)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(deliver_batch(claim_batch(10), max_attempts=5, retry_delay=60), (1, 0))
+        self.assertEqual([message.subject for message in mail.outbox], ['Confirm your email'])
+        self.assertEqual(claim_batch(10), [])
+        self.assertIsNotNone(OutgoingEmail.objects.get().sent)
+
+    def test_attachments_honor_fail_silently(self) -> None:
+        """A message with an attachment, which the outbox does not store, raises unless 'fail_silently' is set."""
+        def message() -> mail.EmailMessage:  # a message keeps the connection of its first send
+            attached = mail.EmailMessage('Export', 'Attached', 'qtable@example.com', ['reader@example.com'])
+            attached.attach('favorites.csv', 'id,quote\n', 'text/csv')
+            return attached
+
+        with self.assertRaises(ValueError):
+            message().send()
+        with self.assertLogs('users.mail', 'ERROR'):
+            self.assertEqual(message().send(fail_silently=True), 0)
+        self.assertFalse(OutgoingEmail.objects.exists())
+
+    def test_failed_delivery_is_retried(self) -> None:
+        """A message the server rejects is retried later, and given up on after the last attempt."""
+        self.send()
+        rejected = mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError)
+        with rejected, self.assertLogs('users.mail', 'WARNING'):
+            self.assertEqual(deliver_batch(claim_batch(10), max_attempts=2, retry_delay=0), (0, 1))
+            email = OutgoingEmail.objects.get()
+            self.assertEqual((email.attempts, email.failed), (1, None))
+            self.assertEqual(deliver_batch(claim_batch(10), max_attempts=2, retry_delay=0), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 2)
+        self.assertIsNotNone(email.failed)
+        self.assertEqual(claim_batch(10), [])
+
+    @override_settings(OUTBOX_EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST='127.0.0.1')
+    def test_unreachable_smtp_server_postpones(self) -> None:
+        """When the SMTP server cannot be reached, the batch is postponed without using up an attempt."""
+        self.send()
+        with override_settings(EMAIL_PORT=free_port()), self.assertLogs('users.mail', 'WARNING'):
+            self.assertEqual(deliver_batch(claim_batch(10), max_attempts=5, retry_delay=60), (0, 1))
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.attempts, 0)
+        self.assertIn('ConnectionRefusedError', email.last_error)
+        self.assertEqual(claim_batch(10), [])
@@ -3,7 +3,7 @@ This module contains views and functions related to user registration and email
 
 The module includes the following:
 
-- `RegisterView`: A view for the registration of new users.
+- `RegisterView`: A view for the registration of new users, whose verification email is queued in the outbox.
 - `confirm_email`: A function to render the confirmation email page for a specific user.
 
 Dependencies:
@@ -46,7 +46,8 @@ class RegisterView(CreateView):
         user.is_active = False
         self.success_url = reverse_lazy('users:confirm_email', kwargs={'pk': user.id})
         return_val = super().form_valid(form)
-        send_email(user)
+        # Queued in the outbox by the email backend, so the request never waits on the SMTP server.
+        send_email(user, thread=False)
         return return_val
 
 